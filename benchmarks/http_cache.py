@@ -0,0 +1,102 @@
+"""Bytes transferred and time taken recrawling a local site through CachingClient.
+
+The mock server serves pages with ETags and answers 304 Not Modified to
+matching If-None-Match headers, changing a fraction of pages between crawls.
+
+    python benchmarks/http_cache.py --pages 500 --page-kb 50 --changed 0.1
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from aiohttp import web
+
+from scrapio.requests.cache import CachingClient, HttpCache
+from scrapio.requests.default_client import DefaultClient
+
+
+class MockSite:
+    def __init__(self, pages: int, page_size: int):
+        self.versions = [0] * pages
+        self.page_size = page_size
+        self.bytes_sent = 0
+
+    def body(self, index: int) -> bytes:
+        paragraph = "<p>Page {} version {} lorem ipsum dolor sit amet.</p>".format(
+            index, self.versions[index]
+        )
+        repeats = self.page_size // len(paragraph) + 1
+        return "<html><body>{}</body></html>".format(paragraph * repeats).encode()
+
+    async def handle(self, request):
+        index = int(request.match_info["index"])
+        etag = '"{}-{}"'.format(index, self.versions[index])
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        body = self.body(index)
+        self.bytes_sent += len(body)
+        return web.Response(body=body, content_type="text/html", headers={"ETag": etag})
+
+
+async def crawl(client, base_url: str, pages: int, concurrency: int = 50):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(index):
+        async with semaphore:
+            await client.get_request("{}/page/{}".format(base_url, index), None)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[fetch(i) for i in range(pages)])
+    return time.perf_counter() - start
+
+
+async def run(args, cache_path: str):
+    site = MockSite(args.pages, args.page_kb * 1024)
+    app = web.Application()
+    app.router.add_get("/page/{index}", site.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    server = web.TCPSite(runner, "127.0.0.1", 0)
+    await server.start()
+    base_url = "http://127.0.0.1:{}".format(server._server.sockets[0].getsockname()[1])
+
+    client = CachingClient(DefaultClient(), HttpCache(cache_path))
+    print(
+        "{:<8}{:>12}{:>10}{:>14}{:>12}".format(
+            "crawl", "sent KB", "304s", "saved KB", "seconds"
+        )
+    )
+    for crawl_number in range(2):
+        site.bytes_sent = 0
+        before = dict(client.stats)
+        elapsed = await crawl(client, base_url, args.pages)
+        print(
+            "{:<8}{:>12.0f}{:>10}{:>14.0f}{:>12.2f}".format(
+                crawl_number + 1,
+                site.bytes_sent / 1024,
+                client.stats["not_modified"] - before["not_modified"],
+                (client.stats["bytes_saved"] - before["bytes_saved"]) / 1024,
+                elapsed,
+            )
+        )
+        for index in random.sample(range(args.pages), int(args.pages * args.changed)):
+            site.versions[index] += 1
+    await client.close()
+    await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=500)
+    parser.add_argument("--page-kb", type=int, default=50)
+    parser.add_argument("--changed", type=float, default=0.1)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(args, os.path.join(directory, "cache.db")))
+
+
+if __name__ == "__main__":
+    main()
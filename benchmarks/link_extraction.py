@@ -0,0 +1,93 @@
+"""Peak RSS and time per MB of link_extractor versus StreamingLinkExtractor.
+
+Each extractor runs in a fresh process so the peak RSS it reports is not
+inflated by the other runs.
+
+    python benchmarks/link_extraction.py --size-mb 8 --chunk-kb 64
+"""
+import argparse
+import multiprocessing
+import resource
+import sys
+import time
+
+from scrapio.parsing.links import link_extractor, StreamingLinkExtractor
+from scrapio.requests.response import Response
+from scrapio.structures.filtering import URLFilter
+
+
+HOST = "bench.example.com"
+BASE_URL = "http://{}/listing".format(HOST)
+
+
+def make_page(size: int) -> bytes:
+    page = bytearray(b"<html><head><title>Listing</title></head><body><ul>")
+    index = 0
+    while len(page) < size:
+        page += (
+            '<li><a href="/item/{0}?ref=listing#reviews">Item {0}</a>'
+            "<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do "
+            "eiusmod tempor incididunt ut labore.</p></li>".format(index)
+        ).encode("utf-8")
+        index += 1
+    page += b"</ul></body></html>"
+    return bytes(page)
+
+
+def peak_rss_kb() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def run_dom(page: bytes, chunk: int, url_filter: URLFilter) -> int:
+    response = Response()
+    response.url = BASE_URL
+    response.body = page.decode("utf-8", errors="ignore")
+    _, links = link_extractor(response, url_filter, True)
+    return len(links)
+
+
+def run_streaming(page: bytes, chunk: int, url_filter: URLFilter) -> int:
+    extractor = StreamingLinkExtractor(url_filter, True)
+    extractor.begin(BASE_URL)
+    view = memoryview(page)
+    for offset in range(0, len(page), chunk):
+        extractor.feed(view[offset : offset + chunk].tobytes())
+    return len(extractor.close())
+
+
+def measure(name: str, size: int, chunk: int, results) -> None:
+    url_filter = URLFilter([HOST], None, False)
+    page = make_page(size)
+    baseline = peak_rss_kb()
+    start = time.perf_counter()
+    links = {"dom": run_dom, "streaming": run_streaming}[name](page, chunk, url_filter)
+    elapsed = time.perf_counter() - start
+    results.put((name, links, elapsed, peak_rss_kb() - baseline))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=float, default=8)
+    parser.add_argument("--chunk-kb", type=int, default=64)
+    args = parser.parse_args()
+    size = int(args.size_mb * 1024 * 1024)
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    print(
+        "{:<10}{:>8}{:>12}{:>18}".format("extractor", "links", "ms/MB", "peak RSS +KB")
+    )
+    for name in ("dom", "streaming"):
+        process = context.Process(
+            target=measure, args=(name, size, args.chunk_kb * 1024, results)
+        )
+        process.start()
+        name, links, elapsed, rss = results.get()
+        process.join()
+        per_mb = elapsed * 1000 / args.size_mb
+        print("{:<10}{:>8}{:>12.1f}{:>18}".format(name, links, per_mb, rss))
+
+
+if __name__ == "__main__":
+    main()
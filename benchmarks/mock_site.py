@@ -0,0 +1,194 @@
+"""Synthetic site for benchmarking crawls without touching the network.
+
+Pages are generated from a seed, so every run with the same options serves
+exactly the same pages, links, latencies and errors. Each host is served on
+its own port of 127.0.0.1, from a separate process so that the server's CPU
+time is not counted against the crawler.
+
+    python benchmarks/mock_site.py --pages 5000 --fan-out 8 --hosts 4 --latency 0.02
+"""
+import argparse
+import asyncio
+import multiprocessing
+import random
+from typing import List
+
+from aiohttp import web
+
+
+class MockSite:
+    """Serves pages /p/0 to /p/{pages - 1}, spread across hosts.
+
+    Page n links to its fan_out children n * fan_out + 1 onwards, so every
+    page can be reached from the first page of each host, and to fan_out
+    further pages picked at random. Pages are padded to about page_size
+    bytes, answered after latency plus up to jitter seconds, and a share of
+    error_rate of them fail with a 500.
+    """
+
+    def __init__(
+        self,
+        pages: int = 1000,
+        fan_out: int = 10,
+        page_size: int = 20000,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        hosts: int = 1,
+        port: int = 8800,
+        seed: int = 0,
+    ):
+        self.pages = pages
+        self.fan_out = fan_out
+        self.page_size = page_size
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.hosts = hosts
+        self.port = port
+        self.seed = seed
+        self._process = None
+
+    def host(self, page: int) -> str:
+        return "127.0.0.1:{}".format(self.port + page % self.hosts)
+
+    def url(self, page: int) -> str:
+        return "http://{}/p/{}".format(self.host(page), page)
+
+    def seeds(self) -> List[str]:
+        return [self.url(page) for page in range(min(self.hosts, self.pages))]
+
+    def _rng(self, page: int) -> random.Random:
+        return random.Random(self.seed * 1000003 + page)
+
+    def fails(self, page: int) -> bool:
+        return self._rng(page).random() < self.error_rate
+
+    def reachable(self) -> int:
+        """Pages a crawl from seeds() can find, as failed pages have no links."""
+        found, stack = set(), list(range(min(self.hosts, self.pages)))
+        while stack:
+            page = stack.pop()
+            if page in found:
+                continue
+            found.add(page)
+            if not self.fails(page):
+                stack.extend(self.links(page))
+        return len(found)
+
+    def links(self, page: int) -> List[int]:
+        rng = self._rng(page)
+        rng.random()
+        first = page * self.fan_out + 1
+        children = range(first, min(first + self.fan_out, self.pages))
+        others = [rng.randrange(self.pages) for _ in range(self.fan_out)]
+        return list(children) + others
+
+    def render(self, page: int) -> bytes:
+        links = "".join(
+            '<li><a href="{}">Page {}</a></li>'.format(self.url(link), link)
+            for link in self.links(page)
+        )
+        head = "<html><head><title>Page {}</title></head><body><ul>{}</ul>".format(
+            page, links
+        )
+        filler = "<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p>"
+        padding = max(0, self.page_size - len(head)) // len(filler) + 1
+        return (head + filler * padding + "</body></html>").encode("utf-8")
+
+    async def _page(self, request: web.Request) -> web.Response:
+        page = int(request.match_info["n"])
+        if page >= self.pages:
+            raise web.HTTPNotFound()
+        rng = self._rng(page)
+        failed = rng.random() < self.error_rate
+        delay = self.latency + rng.uniform(0, self.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        if failed:
+            raise web.HTTPInternalServerError()
+        return web.Response(body=self.render(page), content_type="text/html")
+
+    async def _robots(self, request: web.Request) -> web.Response:
+        return web.Response(text="User-agent: *\nAllow: /\n")
+
+    def serve(self, ready=None) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        app = web.Application()
+        app.router.add_get("/p/{n}", self._page)
+        app.router.add_get("/robots.txt", self._robots)
+        runner = web.AppRunner(app, access_log=None)
+        loop.run_until_complete(runner.setup())
+        for offset in range(self.hosts):
+            site = web.TCPSite(runner, "127.0.0.1", self.port + offset, backlog=1024)
+            loop.run_until_complete(site.start())
+        if ready is not None:
+            ready.set()
+        loop.run_forever()
+
+    def start(self) -> None:
+        context = multiprocessing.get_context("spawn")
+        ready = context.Event()
+        self._process = context.Process(target=self.serve, args=(ready,), daemon=True)
+        self._process.start()
+        if not ready.wait(30):
+            self.stop()
+            raise RuntimeError("Mock site did not start")
+
+    def stop(self) -> None:
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join()
+            self._process = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_process"] = None
+        return state
+
+    def __enter__(self) -> "MockSite":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def add_site_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--fan-out", type=int, default=10)
+    parser.add_argument("--page-size", type=int, default=20000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--hosts", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def site_from_arguments(args: argparse.Namespace) -> MockSite:
+    return MockSite(
+        pages=args.pages,
+        fan_out=args.fan_out,
+        page_size=args.page_size,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        hosts=args.hosts,
+        port=args.port,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_site_arguments(parser)
+    site = site_from_arguments(parser.parse_args())
+    for url in site.seeds():
+        print("Serving {}".format(url))
+    site.serve()
+
+
+if __name__ == "__main__":
+    main()
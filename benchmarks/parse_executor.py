@@ -0,0 +1,86 @@
+"""Pages/sec of link extraction plus parse_result, inline versus ParseExecutor.
+
+    python benchmarks/parse_executor.py --pages 2000 --links 300
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import lxml.html as lh
+
+from scrapio.parsing.executor import ParseExecutor
+from scrapio.parsing.links import link_extractor
+from scrapio.requests.response import Response
+from scrapio.structures.filtering import URLFilter
+
+
+HOST = "bench.example.com"
+
+
+def make_page(index: int, links: int) -> str:
+    anchors = "".join(
+        '<li><a href="/page/{0}/{1}?sort=asc#top">Item {1}</a><p>Lorem ipsum '
+        "dolor sit amet, consectetur adipiscing elit.</p></li>".format(index, i)
+        for i in range(links)
+    )
+    return (
+        "<html><head><title>Page {}</title></head><body><h1>Listing</h1>"
+        "<ul>{}</ul></body></html>".format(index, anchors)
+    )
+
+
+def make_response(body: str, index: int) -> Response:
+    response = Response()
+    response.url = "http://{}/page/{}".format(HOST, index)
+    response.status = 200
+    response.headers = {"Content-Type": "text/html"}
+    response.body = body
+    return response
+
+
+def parse_title(response: Response) -> dict:
+    dom = lh.fromstring(response.body)
+    return {"url": response.url, "title": dom.findtext(".//title")}
+
+
+def run_inline(responses, url_filter: URLFilter) -> float:
+    start = time.perf_counter()
+    for response in responses:
+        link_extractor(response, url_filter, True)
+        parse_title(response)
+    return len(responses) / (time.perf_counter() - start)
+
+
+async def run_executor(responses, url_filter: URLFilter, mode: str, workers: int):
+    executor = ParseExecutor(parse_title, url_filter, True, mode=mode, workers=workers)
+    # Warm the pool so process start-up is not part of the measurement.
+    await asyncio.gather(*[executor.parse(r) for r in responses[:workers]])
+    start = time.perf_counter()
+    await asyncio.gather(*[executor.parse(r) for r in responses])
+    elapsed = time.perf_counter() - start
+    executor.shutdown()
+    return len(responses) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--links", type=int, default=200)
+    args = parser.parse_args()
+
+    url_filter = URLFilter([HOST], None, False)
+    responses = [make_response(make_page(i, args.links), i) for i in range(args.pages)]
+    cores = os.cpu_count() or 1
+    counts = sorted({1, 2, 4, 8, cores} & set(range(1, cores + 1)))
+
+    print("{:<10}{:>8}{:>14}".format("mode", "workers", "pages/sec"))
+    print("{:<10}{:>8}{:>14.1f}".format("inline", 1, run_inline(responses, url_filter)))
+    for mode in ("thread", "process"):
+        for workers in counts:
+            rate = asyncio.run(run_executor(responses, url_filter, mode, workers))
+            print("{:<10}{:>8}{:>14.1f}".format(mode, workers, rate))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""CPU cost and rate accuracy of RateLimiter with thousands of concurrent waiters.
+
+The polling limiter is the implementation RateLimiter replaced, kept here as a
+reference point.
+
+    python benchmarks/rate_limiter.py --waiters 5000 --rate 2000
+"""
+import argparse
+import asyncio
+import time
+
+from scrapio.structures.rate_limiter import RateLimiter
+
+
+class PollingRateLimiter:
+    def __init__(self, reqs_per_second: int):
+        self._rate_limit = reqs_per_second
+        self._start_time = time.time()
+        self._url_count = 0
+
+    async def limited(self, url: str) -> None:
+        elapsed = time.time() - self._start_time
+        while self._url_count / elapsed > self._rate_limit:
+            await asyncio.sleep(0.01)
+            elapsed = time.time() - self._start_time
+        self._url_count += 1
+
+
+async def run(limiter, waiters: int):
+    released = []
+
+    async def wait(index):
+        await limiter.limited("http://bench.example.com/")
+        released.append((index, time.monotonic()))
+
+    start = time.monotonic()
+    cpu = time.process_time()
+    await asyncio.gather(*[wait(i) for i in range(waiters)])
+    cpu = time.process_time() - cpu
+    elapsed = time.monotonic() - start
+    in_order = sum(1 for a, b in zip(released, released[1:]) if a[0] < b[0])
+    first_second = sum(1 for _, t in released if t - start < 0.1)
+    return elapsed, cpu, waiters / elapsed, in_order / max(waiters - 1, 1), first_second
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--waiters", type=int, default=5000)
+    parser.add_argument("--rate", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(
+        "{:<10}{:>10}{:>10}{:>12}{:>10}{:>16}".format(
+            "limiter", "wall s", "cpu s", "achieved/s", "fifo", "first 100ms"
+        )
+    )
+    for name, limiter in (
+        ("polling", PollingRateLimiter(args.rate)),
+        ("gcra", RateLimiter(args.rate)),
+    ):
+        row = asyncio.run(run(limiter, args.waiters))
+        print("{:<10}{:>10.2f}{:>10.2f}{:>12.0f}{:>10.2f}{:>16}".format(name, *row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Memory held by 500 in-flight responses, before and after their text is read.
+
+The legacy conversion is the eager decoding from_aiohttp_response that was
+replaced, which kept both the decoded str and the ClientResponse alive.
+
+    python benchmarks/response_memory.py --concurrency 500 --page-kb 100
+"""
+import argparse
+import asyncio
+import gc
+import time
+import tracemalloc
+
+from aiohttp import ClientSession, TCPConnector, web
+
+from scrapio.requests.response import Response, from_aiohttp_response
+
+
+async def legacy_from_aiohttp_response(client_response) -> Response:
+    resp = Response()
+    resp.url = client_response.url
+    resp.status = client_response.status
+    resp.headers = client_response.headers
+    resp_bytes = await client_response.read()
+    resp.body = resp_bytes.decode("utf-8", errors="ignore")
+    resp.raw_response = client_response
+    return resp
+
+
+async def run(args, name, convert):
+    page = ("<p>Lorem ipsum dolor sit amet, consectetur adipiscing.</p>" * 20).encode()
+    body = (
+        b"<html><body>" + page * (args.page_kb * 1024 // len(page)) + b"</body></html>"
+    )
+
+    async def handle(request):
+        return web.Response(body=body, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    url = "http://127.0.0.1:{}/".format(site._server.sockets[0].getsockname()[1])
+
+    session = ClientSession(connector=TCPConnector(limit=args.concurrency))
+
+    async def fetch():
+        async with session.get(url) as resp:
+            return await convert(resp)
+
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    responses = await asyncio.gather(*[fetch() for _ in range(args.concurrency)])
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0]
+    text_length = sum(len(response.body) for response in responses)
+    gc.collect()
+    held_after_text = tracemalloc.get_traced_memory()[0]
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert text_length == len(body) * args.concurrency
+
+    del responses
+    await session.close()
+    await runner.cleanup()
+    mb = 1024 * 1024
+    print(
+        "{:<10}{:>12.1f}{:>14.1f}{:>12.1f}{:>10.2f}".format(
+            name, held / mb, held_after_text / mb, peak / mb, elapsed
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--page-kb", type=int, default=100)
+    args = parser.parse_args()
+    print(
+        "{:<10}{:>12}{:>14}{:>12}{:>10}".format(
+            "response", "held MB", "after text", "peak MB", "seconds"
+        )
+    )
+    for name, convert in (
+        ("legacy", legacy_from_aiohttp_response),
+        ("lazy", from_aiohttp_response),
+    ):
+        asyncio.run(run(args, name, convert))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,370 @@
+"""End-to-end crawls and component microbenchmarks against a MockSite.
+
+Every benchmark runs in a fresh process, reporting throughput, p50/p99
+latency where it applies, CPU seconds and peak RSS. Results are written as
+JSON with the commit they were measured on, and --compare prints the
+change against an earlier run.
+
+    python benchmarks/suite.py --pages 2000 --hosts 4 --latency 0.01 --output before.json
+    python benchmarks/suite.py --pages 2000 --hosts 4 --latency 0.01 --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import platform
+from queue import Empty
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from mock_site import MockSite, add_site_arguments, site_from_arguments
+
+from scrapio.crawlers import BaseCrawler
+from scrapio.parsing.links import link_extractor
+from scrapio.requests import AbstractClient, DefaultClient
+from scrapio.requests.response import Response
+from scrapio.structures.filtering import URLFilter
+from scrapio.structures.queues import WorkQueue
+from scrapio.url_set.bloom_container import BloomContainer
+from scrapio.url_set.fingerprint_container import FingerprintContainer
+from scrapio.url_set.set_container import SetContainer
+from scrapio.url_set.trie_container import TrieContainer
+from scrapio.utils.urls import URLCanonicalizer
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def latency_ms(latencies: List[float]) -> Dict[str, Optional[float]]:
+    p50, p99 = percentile(latencies, 0.5), percentile(latencies, 0.99)
+    return {
+        "p50_ms": p50 * 1000 if p50 is not None else None,
+        "p99_ms": p99 * 1000 if p99 is not None else None,
+    }
+
+
+class TimingClient(AbstractClient):
+    """Wraps a client, recording how long each page request took.
+
+    robots.txt requests are passed through without being recorded.
+    """
+
+    def __init__(self, client: AbstractClient):
+        self.client = client
+        self.latencies: List[float] = []
+        self.statuses: Dict[int, int] = {}
+
+    async def get_request(self, url, proxy_manager, headers=None):
+        if url.endswith("/robots.txt"):
+            return await self.client.get_request(url, proxy_manager)
+        start = time.perf_counter()
+        response = await self.client.get_request(url, proxy_manager)
+        self.latencies.append(time.perf_counter() - start)
+        status = response.status if response is not None else 0
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        return response
+
+    async def close(self):
+        await self.client.close()
+
+
+class BenchmarkCrawler(BaseCrawler):
+    def parse_result(self, response):
+        return response.status
+
+    async def save_results(self, result):
+        pass
+
+
+def bench_crawl(site: MockSite, args) -> Dict[str, Any]:
+    client = TimingClient(DefaultClient())
+    crawler = BenchmarkCrawler(
+        site.seeds(), client=client, logger_level=50, stream_links=args.stream_links
+    )
+    start = time.perf_counter()
+    crawler.run_crawler(args.workers)
+    elapsed = time.perf_counter() - start
+    pages = client.statuses.get(200, 0)
+    result = {
+        "pages": pages,
+        "expected_pages": site.reachable(),
+        "errors": len(client.latencies) - pages,
+        "seconds": elapsed,
+        "pages_per_sec": pages / elapsed,
+    }
+    result.update(latency_ms(client.latencies))
+    return result
+
+
+def bench_client(site: MockSite, args) -> Dict[str, Any]:
+    urls = [site.url(page) for page in range(site.pages)]
+
+    async def fetch_all():
+        client = TimingClient(DefaultClient())
+        pending = iter(urls)
+
+        async def worker():
+            for url in pending:
+                await client.get_request(url, None)
+
+        await asyncio.gather(*(worker() for _ in range(args.workers)))
+        await client.close()
+        return client
+
+    loop = asyncio.new_event_loop()
+    start = time.perf_counter()
+    client = loop.run_until_complete(fetch_all())
+    elapsed = time.perf_counter() - start
+    loop.close()
+    result = {
+        "pages": len(urls),
+        "errors": len(urls) - client.statuses.get(200, 0),
+        "seconds": elapsed,
+        "pages_per_sec": len(urls) / elapsed,
+    }
+    result.update(latency_ms(client.latencies))
+    return result
+
+
+def bench_link_extractor(site: MockSite, args) -> Dict[str, Any]:
+    # Canonicalizes links as crawlers do by default.
+    url_filter = URLFilter(site.seeds(), None, False, canonicalizer=URLCanonicalizer())
+    pages = [site.render(page) for page in range(min(site.pages, 200))]
+    responses = []
+    for page, body in enumerate(pages):
+        response = Response()
+        response.url = site.url(page)
+        response.body = body
+        responses.append(response)
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        for response in responses:
+            started_at = time.perf_counter()
+            link_extractor(response, url_filter, True)
+            latencies.append(time.perf_counter() - started_at)
+    elapsed = time.perf_counter() - start
+    size = sum(len(body) for body in pages) * args.rounds
+    result = {
+        "pages_per_sec": len(latencies) / elapsed,
+        "mb_per_sec": size / elapsed / 1024**2,
+    }
+    result.update(latency_ms(latencies))
+    return result
+
+
+def bench_work_queue(site: MockSite, args) -> Dict[str, Any]:
+    urls = [
+        "http://{}/p/{}".format(site.host(page), page)
+        for page in range(args.queue_urls)
+    ]
+
+    async def churn():
+        queue = WorkQueue(None, [])
+        for url in urls:
+            await queue.put_url(url)
+        # Every URL is offered again, as crawls find most links more than once.
+        for url in urls:
+            await queue.put_url(url)
+        for _ in urls:
+            queue.task_done(await queue.get_job())
+
+    loop = asyncio.new_event_loop()
+    start = time.perf_counter()
+    loop.run_until_complete(churn())
+    elapsed = time.perf_counter() - start
+    loop.close()
+    return {"urls_per_sec": len(urls) / elapsed, "seconds": elapsed}
+
+
+URL_SETS = {
+    "set": SetContainer,
+    "trie": TrieContainer,
+    "fingerprint": FingerprintContainer,
+    "bloom": BloomContainer,
+}
+
+
+def bench_url_sets(site: MockSite, args) -> Dict[str, Any]:
+    urls = [
+        "http://{}/p/{}?ref=listing".format(site.host(page), page)
+        for page in range(args.queue_urls)
+    ]
+    result = {}
+    for name, factory in URL_SETS.items():
+        container = factory()
+        start = time.perf_counter()
+        for url in urls:
+            container.put(url)
+        for url in urls:
+            url in container
+        result["{}_ops_per_sec".format(name)] = (
+            2 * len(urls) / (time.perf_counter() - start)
+        )
+    return result
+
+
+def bench_put_urls(site: MockSite, args) -> Dict[str, Any]:
+    # Link heavy pages: every page repeats the same navigation links and
+    # links to a window of pages overlapping its neighbours'.
+    nav = ["http://{}/nav/{}".format(site.host(0), link) for link in range(50)]
+    per_page = 150
+    pages = [
+        nav
+        + [
+            "http://{}/p/{}".format(site.host(link), link)
+            for link in range(page * per_page // 2, page * per_page // 2 + per_page)
+        ]
+        for page in range(max(1, args.queue_urls // per_page))
+    ]
+    links = sum(len(page) for page in pages)
+
+    async def put_each(queue):
+        for page in pages:
+            for url in page:
+                await queue.put_url(url, "http://parent/")
+
+    async def put_batches(queue):
+        for page in pages:
+            await queue.put_urls(page, "http://parent/")
+
+    result = {}
+    loop = asyncio.new_event_loop()
+    for name, factory in URL_SETS.items():
+        for mode, fill in (("each", put_each), ("batch", put_batches)):
+            queue = WorkQueue(None, [], seen_url_handler=factory())
+            start = time.perf_counter()
+            loop.run_until_complete(fill(queue))
+            result["{}_{}_per_sec".format(name, mode)] = links / (
+                time.perf_counter() - start
+            )
+    loop.close()
+    return result
+
+
+BENCHMARKS = {
+    "crawl": bench_crawl,
+    "client": bench_client,
+    "link_extractor": bench_link_extractor,
+    "work_queue": bench_work_queue,
+    "url_sets": bench_url_sets,
+    "put_urls": bench_put_urls,
+}
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+def measure(name: str, site: MockSite, args, results) -> None:
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    result = BENCHMARKS[name](site, args)
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    result["cpu_seconds"] = (
+        after.ru_utime - before.ru_utime + after.ru_stime - before.ru_stime
+    )
+    result["peak_rss_mb"] = peak_rss_mb()
+    results.put(result)
+
+
+def commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: Dict[str, Dict[str, Any]], baseline=None) -> None:
+    print(
+        "{:<16}{:<24}{:>14}{:>14}{:>10}".format(
+            "benchmark", "metric", "value", "before", "change"
+        )
+    )
+    for name, metrics in results.items():
+        before = (baseline or {}).get(name, {})
+        for metric, value in metrics.items():
+            if value is None:
+                continue
+            old = before.get(metric)
+            change = (
+                "{:+.1f}%".format((value - old) / old * 100)
+                if isinstance(old, (int, float)) and old
+                else ""
+            )
+            print(
+                "{:<16}{:<24}{:>14.2f}{:>14}{:>10}".format(
+                    name,
+                    metric,
+                    value,
+                    "" if old is None else "{:.2f}".format(old),
+                    change,
+                )
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    add_site_arguments(parser)
+    parser.add_argument("--workers", type=int, default=50)
+    parser.add_argument("--stream-links", action="store_true")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--queue-urls", type=int, default=100000)
+    parser.add_argument(
+        "--only", default=",".join(BENCHMARKS), help="comma separated benchmarks"
+    )
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="JSON file of an earlier run to compare to")
+    args = parser.parse_args()
+    names = [name for name in args.only.split(",") if name]
+    for name in names:
+        if name not in BENCHMARKS:
+            parser.error("unknown benchmark {}".format(name))
+
+    site = site_from_arguments(args)
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    results = {}
+    with site:
+        for name in names:
+            process = context.Process(target=measure, args=(name, site, args, queue))
+            process.start()
+            while name not in results:
+                try:
+                    results[name] = queue.get(timeout=1)
+                except Empty:
+                    if not process.is_alive():
+                        sys.exit("Benchmark {} failed".format(name))
+            process.join()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print_results(results, baseline)
+    if args.output:
+        report = {
+            "commit": commit(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "options": vars(args),
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Links checked per second by URLFilter.can_crawl with many rules and hosts.
+
+The legacy filter is the list scanning implementation URLFilter replaced,
+kept here as a reference point, checked against a plain RobotFileParser.
+
+    python benchmarks/url_filter.py --links 100000 --rules 300 --robots-rules 200
+"""
+import argparse
+import random
+import string
+import time
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+from scrapio.structures.filtering import URLFilter
+from scrapio.structures.robots import RobotsCache
+
+
+class LegacyURLFilter:
+    def __init__(self, net_locations, additional_rules, robots_cache):
+        self._net_locations = net_locations
+        self._additional_rules = additional_rules
+        self._robots_cache = robots_cache
+
+    def can_crawl(self, host: str, url: str) -> bool:
+        if self._additional_rules:
+            value = any(i in url for i in self._additional_rules)
+            if value is True:
+                return False
+        robots_rules = self._robots_cache.get(host)
+        if robots_rules is None and host in self._net_locations:
+            return True
+        if robots_rules:
+            return robots_rules.can_fetch("*", url) and host in self._net_locations
+        return host in self._net_locations
+
+
+def word(rng: random.Random, size: int) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(size))
+
+
+def build(args):
+    rng = random.Random(args.seed)
+    hosts = ["www.{}.com".format(word(rng, 8)) for _ in range(args.hosts)]
+    sections = [word(rng, 6) for _ in range(50)]
+    rules = [
+        "/{}-{}".format(rng.choice(sections), word(rng, 4)) for _ in range(args.rules)
+    ]
+    robots_lines = ["User-agent: *"]
+    for _ in range(args.robots_rules):
+        robots_lines.append(
+            "{}: /{}/{}".format(
+                rng.choice(("Allow", "Disallow")), rng.choice(sections), word(rng, 2)
+            )
+        )
+    # Links repeat across pages, as navigation links do on a real site.
+    paths = [
+        "/{}/{}".format(rng.choice(sections), word(rng, rng.randint(2, 12)))
+        for _ in range(args.links // 10)
+    ]
+    links = []
+    for _ in range(args.links):
+        host = rng.choice(hosts)
+        links.append((host, "http://{}{}".format(host, rng.choice(paths))))
+    return hosts, rules, robots_lines, links
+
+
+def timed(url_filter, links):
+    start = time.perf_counter()
+    decisions = [url_filter.can_crawl(host, url) for host, url in links]
+    return time.perf_counter() - start, decisions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--links", type=int, default=100000)
+    parser.add_argument("--hosts", type=int, default=200)
+    parser.add_argument("--rules", type=int, default=300)
+    parser.add_argument("--robots-rules", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    hosts, rules, robots_lines, links = build(args)
+
+    robots_cache = RobotsCache()
+    legacy_parsers = {}
+    for host in hosts:
+        robots_cache._entries[host] = (
+            "http://{}/robots.txt".format(host),
+            200,
+            "\n".join(robots_lines),
+            time.time(),
+        )
+        legacy_parsers[host] = RobotFileParser()
+        legacy_parsers[host].parse(robots_lines)
+        # Compile ahead of timing, as the legacy parsers were parsed above.
+        robots_cache.get(host)
+
+    legacy = LegacyURLFilter(hosts, rules, legacy_parsers)
+    compiled = URLFilter(hosts, rules, True, robots_cache=robots_cache)
+    legacy_time, legacy_decisions = timed(legacy, links)
+    compiled_time, compiled_decisions = timed(compiled, links)
+    assert legacy_decisions == compiled_decisions
+
+    print("{:<10}{:>10}{:>14}".format("filter", "seconds", "links/s"))
+    for name, elapsed in (("legacy", legacy_time), ("compiled", compiled_time)):
+        print("{:<10}{:>10.2f}{:>14.0f}".format(name, elapsed, len(links) / elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Memory per URL and ops/sec of the url_set containers.
+
+    python benchmarks/url_sets.py --urls 500000
+"""
+import argparse
+import time
+import tracemalloc
+
+from scrapio.url_set.bloom_container import BloomContainer
+from scrapio.url_set.fingerprint_container import FingerprintContainer
+from scrapio.url_set.set_container import SetContainer
+from scrapio.url_set.trie_container import TrieContainer
+
+
+def make_urls(count: int, offset: int = 0):
+    return [
+        "https://shop{}.example.com/category/{}/product-{}?colour=red".format(
+            i % 50, (i // 50) % 400, i + offset
+        )
+        for i in range(count)
+    ]
+
+
+CONTAINERS = {
+    "set": SetContainer,
+    "trie": TrieContainer,
+    "fingerprint64": lambda: FingerprintContainer(fingerprint_bits=64),
+    "fingerprint128": lambda: FingerprintContainer(fingerprint_bits=128),
+    "bloom": lambda: BloomContainer(error_rate=0.001),
+}
+
+
+def measure(factory, urls, misses):
+    # Memory is traced in a separate pass, fed copies of each URL so that
+    # containers which keep the string alive are charged for it.
+    tracemalloc.start()
+    container = factory()
+    for url in urls:
+        container.put(url[:-1] + url[-1])
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del container
+
+    container = factory()
+    start = time.perf_counter()
+    for url in urls:
+        container.put(url)
+    put_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for url in urls:
+        url in container
+    hit_time = time.perf_counter() - start
+    start = time.perf_counter()
+    false_positives = sum(url in container for url in misses)
+    miss_time = time.perf_counter() - start
+    return (
+        memory / len(urls),
+        len(urls) / put_time,
+        len(urls) / hit_time,
+        len(misses) / miss_time,
+        false_positives / len(misses),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--urls", type=int, default=200000)
+    args = parser.parse_args()
+    urls = make_urls(args.urls)
+    misses = make_urls(args.urls // 4, offset=args.urls)
+    average = sum(len(url) for url in urls) / len(urls)
+    print("{} URLs, {:.0f} characters on average".format(len(urls), average))
+    print(
+        "{:<16}{:>10}{:>12}{:>12}{:>12}{:>10}".format(
+            "container", "bytes/url", "put/s", "hit/s", "miss/s", "fp rate"
+        )
+    )
+    for name, factory in CONTAINERS.items():
+        row = measure(factory, urls, misses)
+        print("{:<16}{:>10.1f}{:>12.0f}{:>12.0f}{:>12.0f}{:>10.5f}".format(name, *row))
+
+
+if __name__ == "__main__":
+    main()
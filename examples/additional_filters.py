@@ -1,8 +1,8 @@
 from collections import defaultdict
 
-import aiofiles # external dependency
 import lxml.html as lh
 from scrapio.crawlers import BaseCrawler
+from scrapio.pipeline import CSVSink, ResultPipeline
 
 
 class OurScraper(BaseCrawler):
@@ -20,15 +20,9 @@ class OurScraper(BaseCrawler):
             result['h1'] = h1[0].text_content()
         return result
 
-    async def save_results(self, result):
-        if result:
-            async with aiofiles.open('example_output.csv', 'a') as f:
-                url = result.get('url')
-                title = result.get('title')
-                h1 = result.get('h1')
-                await f.write('"{}","{}","{}"\n'.format(url, title, h1))
-
 
 if __name__ == '__main__':
-    scraper = OurScraper('http://edmundmartin.com', additional_rules=['golang', 'replyto'])
+    pipeline = ResultPipeline(CSVSink('example_output.csv', fieldnames=['url', 'title', 'h1']))
+    scraper = OurScraper('http://edmundmartin.com', additional_rules=['golang', 'replyto'],
+                         result_pipeline=pipeline)
     scraper.run_crawler(10)
\ No newline at end of file
@@ -1,23 +1,58 @@
 import asyncio
 import logging
-from typing import Union, List, Any, Optional
+import time
+from typing import Dict, Union, List, Any, Optional
+from urllib.parse import urlparse
 
 
 from aiohttp import ClientTimeout
 
-from scrapio.parsing.links import link_extractor
+from scrapio.metrics import MetricsRegistry, MetricsServer
+from scrapio.parsing.duplicates import DuplicateDetector, page_fingerprint
+from scrapio.parsing.executor import ParseExecutor
+from scrapio.parsing.links import link_extractor, StreamingLinkExtractor
+from scrapio.pipeline.pipeline import ResultPipeline
 from scrapio.requests.response import Response
+from scrapio.structures.budgets import CrawlBudget
+from scrapio.structures.concurrency import ConcurrencyController
 from scrapio.structures.queues import WorkQueue
 from scrapio.structures.proxies import AbstractProxyManager
-from scrapio.structures.rate_limiter import RateLimiter
+from scrapio.structures.rate_limiter import (
+    AbstractLimiter,
+    BucketLimiter,
+    CompositeLimiter,
+    HostLimiter,
+    RateLimiter,
+)
 from scrapio.structures.filtering import URLFilter
+from scrapio.structures.robots import RobotsCache
+from scrapio.structures.sitemaps import Seeder
 from scrapio.retries.retry import NoOpRetryStrategy
 from scrapio.requests import DefaultClient, AbstractClient
+from scrapio.requests.cache import CachingClient
+from scrapio.requests.dns import CachingResolver, hostname
+from scrapio.utils.urls import URLCanonicalizer, url_host
 
 __all__ = ["BaseCrawler"]
 
 
 class BaseCrawler:
+
+    # Attributes tied to the running event loop, or only used by it, dropped
+    # when the crawler is pickled to ship parse_result to worker processes.
+    _runtime_attributes = (
+        "_client",
+        "_proxy_manager",
+        "_queue",
+        "_rate_limiter",
+        "_parse_executor",
+        "_result_pipeline",
+        "_metrics",
+        "_metrics_server",
+        "_duplicates",
+        "_resolver",
+    )
+
     def __init__(
         self,
         start_url: Union[List[str], str],
@@ -28,44 +63,183 @@ class BaseCrawler:
         **kwargs
     ):
         self._start_url = start_url
+        self._metrics: Optional[MetricsRegistry] = kwargs.get("metrics")
+        self._metrics_server: Optional[MetricsServer] = (
+            MetricsServer(
+                self._metrics,
+                kwargs.get("metrics_host", "127.0.0.1"),
+                kwargs.get("metrics_port"),
+            )
+            if self._metrics is not None and kwargs.get("metrics_port") is not None
+            else None
+        )
 
-        self._client = client if client else DefaultClient()
+        self._client = (
+            client
+            if client
+            else DefaultClient(
+                connector_rules=kwargs.get("connector_rules"),
+                body_rules=kwargs.get("body_rules"),
+                metrics=self._metrics,
+                resolver=kwargs.get("resolver"),
+            )
+        )
+        self._resolver: Optional[CachingResolver] = (
+            None if client else kwargs.get("resolver")
+        )
+        if kwargs.get("http_cache"):
+            self._client = CachingClient(self._client, kwargs.get("http_cache"))
+        self._skip_unchanged: bool = kwargs.get("skip_unchanged", False)
+        self._duplicates: Optional[DuplicateDetector] = kwargs.get("duplicate_detector")
         self._proxy_manager: Union[None, AbstractProxyManager] = (
             kwargs.get("proxy_manager")(**kwargs)
             if kwargs.get("proxy_manager")
             else None
         )
         self._url_filter = self._set_url_filter(start_url, **kwargs)
-        self._queue = WorkQueue(
+        self._queue: WorkQueue = kwargs.get("work_queue") or WorkQueue(
             max_crawl_size,
-            start_url,
+            self._seed_urls(start_url),
             seen_url_handler=kwargs.get("seen_url_handler", None),
+            frontier=kwargs.get("frontier", None),
+            max_depth=kwargs.get("max_depth"),
+            budget=self._set_budget(**kwargs),
+            trap_filter=kwargs.get("trap_filter"),
+        )
+        self._seeder: Optional[Seeder] = kwargs.get("seeder")
+        scorer = getattr(kwargs.get("frontier"), "scorer", None)
+        if (
+            self._seeder is not None
+            and self._seeder.on_lastmod is None
+            and hasattr(scorer, "set_modified")
+        ):
+            # Lets a FreshnessScorer order sitemap URLs by their lastmod.
+            self._seeder.on_lastmod = scorer.set_modified
+        self._checkpoint_interval: Optional[float] = kwargs.get(
+            "checkpoint_interval", 60.0 if kwargs.get("frontier") else None
         )
         logging.basicConfig(level=logger_level, format="%(message)s")
         self._logger = kwargs.get("logger", logging.getLogger("Scraper"))
         self.verbose = verbose
-        self._rate_limiter = (
-            RateLimiter(kwargs.get("rate_limit")) if kwargs.get("rate_limit") else None
-        )
+        self._rate_limiter = self._set_rate_limiter(**kwargs)
+        self._respect_crawl_delay: bool = kwargs.get("respect_crawl_delay", True)
+        if self._url_filter.robots_cache is not None:
+            self._url_filter.robots_cache.on_crawl_delay = self._apply_crawl_delay
         self.retry_handler = kwargs.get("retry_handler", NoOpRetryStrategy())
+        self._parse_executor_mode: Optional[str] = kwargs.get("parse_executor")
+        self._parse_workers: Optional[int] = kwargs.get("parse_workers")
+        self._max_pending_parses: Optional[int] = kwargs.get("max_pending_parses")
+        self._parse_executor: Optional[ParseExecutor] = None
+        self._stream_links: bool = kwargs.get("stream_links", False)
+        self._keep_body: bool = kwargs.get("keep_body", True)
+        self._result_pipeline: Optional[ResultPipeline] = kwargs.get("result_pipeline")
+        self._concurrency: Optional[ConcurrencyController] = kwargs.get("concurrency")
+        if self._concurrency is not None:
+            self._concurrency.backlog = self._queue.qsize
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in self._runtime_attributes:
+            state[name] = None
+        return state
 
     @staticmethod
     def _set_url_filter(start_url, **kwargs) -> URLFilter:
         custom_filter = kwargs.get("custom_filter")
+        robots_cache = RobotsCache(
+            kwargs.get("robots_ttl", 86400.0), kwargs.get("robots_cache_path")
+        )
         if custom_filter and issubclass(custom_filter, URLFilter):
-            return custom_filter(
+            url_filter = custom_filter(
+                start_url,
+                kwargs.get("additional_rules", []),
+                kwargs.get("follow_robots", True),
+                kwargs.get("defragment_urls", True),
+                robots_cache,
+            )
+        else:
+            url_filter = URLFilter(
                 start_url,
                 kwargs.get("additional_rules", []),
                 kwargs.get("follow_robots", True),
                 kwargs.get("defragment_urls", True),
+                robots_cache,
             )
-        return URLFilter(
-            start_url,
-            kwargs.get("additional_rules", []),
-            kwargs.get("follow_robots", True),
-            kwargs.get("defragment_urls", True),
+        url_filter.canonicalizer = kwargs.get(
+            "canonicalizer", URLCanonicalizer(kwargs.get("defragment_urls", True))
+        )
+        return url_filter
+
+    def _seed_urls(self, start_url: Union[List[str], str]) -> List[str]:
+        if isinstance(start_url, str):
+            start_url = [start_url]
+        canonicalizer = self._url_filter.canonicalizer
+        if canonicalizer is None:
+            return list(start_url)
+        return [canonicalizer.canonicalize(url) or url for url in start_url]
+
+    @staticmethod
+    def _set_budget(**kwargs) -> Optional[CrawlBudget]:
+        if (
+            kwargs.get("host_budget") is None
+            and not kwargs.get("host_budgets")
+            and not kwargs.get("path_budgets")
+        ):
+            return None
+        return CrawlBudget(
+            kwargs.get("host_budget"),
+            kwargs.get("host_budgets"),
+            kwargs.get("path_budgets"),
         )
 
+    @staticmethod
+    def _set_rate_limiter(**kwargs) -> Optional[AbstractLimiter]:
+        burst = kwargs.get("rate_limit_burst", 1)
+        limiters = []
+        if kwargs.get("rate_limit"):
+            limiters.append(RateLimiter(kwargs.get("rate_limit"), burst))
+        if kwargs.get("host_rate_limits") or kwargs.get("default_host_rate_limit"):
+            limiters.append(
+                HostLimiter(
+                    kwargs.get("host_rate_limits") or {},
+                    kwargs.get("default_host_rate_limit"),
+                    burst,
+                )
+            )
+        if len(limiters) > 1:
+            return CompositeLimiter(*limiters)
+        return limiters[0] if limiters else None
+
+    def _host_limiter(self) -> Optional[HostLimiter]:
+        limiter = self._rate_limiter
+        if isinstance(limiter, HostLimiter):
+            return limiter
+        if isinstance(limiter, CompositeLimiter):
+            for child in limiter.limiters:
+                if isinstance(child, HostLimiter):
+                    return child
+        host_limiter = HostLimiter({})
+        if limiter is None:
+            self._rate_limiter = host_limiter
+        elif isinstance(limiter, CompositeLimiter):
+            limiter.limiters.append(host_limiter)
+        elif isinstance(limiter, BucketLimiter):
+            self._rate_limiter = CompositeLimiter(limiter, host_limiter)
+        else:
+            return None
+        return host_limiter
+
+    def _apply_crawl_delay(self, host: str, delay: float) -> None:
+        if not self._respect_crawl_delay:
+            return
+        host_limiter = self._host_limiter()
+        if host_limiter is None:
+            self._logger.warning(
+                "Cannot apply Crawl-delay for {} to a custom rate limiter".format(host)
+            )
+            return
+        host_limiter.set_host_rate(host, 1.0 / delay)
+
     @staticmethod
     def _setup_timeout_rules(timeout: Union[float, int], **kwargs) -> ClientTimeout:
         if kwargs.get("client_timeout_rules") and isinstance(
@@ -93,41 +267,226 @@ class BaseCrawler:
     async def save_results(self, result):
         raise NotImplementedError
 
+    def _observe(self, stage: str, host: str, started_at: float) -> float:
+        now = time.perf_counter()
+        self._metrics.observe_stage(stage, host, now - started_at)
+        return now
+
+    def _count(self, name: str, help: str, labelnames=(), labels=(), amount=1):
+        self._metrics.counter(name, help, labelnames).inc(labels, amount)
+
+    def _register_gauges(self) -> None:
+        metrics = self._metrics
+        metrics.gauge(
+            "scrapio_queue_size",
+            "URLs waiting to be crawled.",
+            function=self._queue.qsize,
+        )
+        metrics.gauge(
+            "scrapio_queue_unfinished",
+            "URLs queued or in flight.",
+            function=self._queue.unfinished,
+        )
+        if self._concurrency is not None:
+            metrics.gauge(
+                "scrapio_concurrency_limit",
+                "Requests the concurrency controller currently allows in flight.",
+                function=lambda: self._concurrency.limit,
+            )
+        if self._result_pipeline is not None:
+            metrics.gauge(
+                "scrapio_pipeline_pending",
+                "Results waiting to be written to the sink.",
+                function=lambda: self._result_pipeline.pending,
+            )
+
+    async def _retry(
+        self,
+        url: str,
+        response: Optional[Response] = None,
+        exception: Optional[Exception] = None,
+    ) -> bool:
+        delay = await self.retry_handler.retry_delay(url, response, exception)
+        if delay is None:
+            return False
+        self._logger.info("Retrying URL in %.2f seconds: %s", delay, url)
+        self._queue.retry_later(url, delay)
+        if self._metrics is not None:
+            self._count(
+                "scrapio_retries_total",
+                "Requests scheduled to be retried.",
+                ("host",),
+                (self._metrics.host(urlparse(url).netloc),),
+            )
+        return True
+
     async def _make_requests(self, consumer: int, url: str):
-        err_raised = False
+        host = urlparse(url).netloc
+        metrics = self._metrics
+        if metrics is not None:
+            started_at = time.perf_counter()
         try:
-            self._logger.info("Coroutine: {}, Requesting URL: {}".format(consumer, url))
+            self._logger.info("Coroutine: %s, Requesting URL: %s", consumer, url)
+            blocked = self.retry_handler.blocked_for(host)
+            if blocked > 0:
+                # The host's circuit breaker is open, try again once it closes.
+                self._queue.retry_later(url, blocked)
+                return
+            if not await self._url_filter.allowed_by_robots(
+                url, self._client, self._proxy_manager
+            ):
+                self._logger.info(
+                    "Coroutine: %s, Disallowed by robots.txt: %s", consumer, url
+                )
+                if metrics is not None:
+                    self._count(
+                        "scrapio_robots_disallowed_total",
+                        "URLs skipped because robots.txt disallows them.",
+                        ("host",),
+                        (metrics.host(host),),
+                    )
+                return
+            if metrics is not None:
+                started_at = self._observe("robots", host, started_at)
             if self._rate_limiter:
                 await self._rate_limiter.limited(url)
-            resp = await self._client.get_request(url, self._proxy_manager)
+                if metrics is not None:
+                    started_at = self._observe("rate_limit", host, started_at)
+            if self._concurrency:
+                resp = await self._concurrency.run(url, lambda: self._fetch(url))
+            else:
+                resp = await self._fetch(url)
+            if metrics is not None:
+                self._observe("fetch", host, started_at)
+                self._count(
+                    "scrapio_responses_total",
+                    "Responses received, by host and status.",
+                    ("host", "status"),
+                    (metrics.host(host), str(resp.status) if resp else "none"),
+                )
+            if resp is None or self.retry_handler.is_retryable(resp):
+                if await self._retry(url, resp):
+                    return
+                if resp is None:
+                    self._logger.warning(
+                        "Coroutine: {}, No response for URL: {}".format(consumer, url)
+                    )
+                    return
+            else:
+                await self.retry_handler.on_success(url)
             await asyncio.sleep(0.001)
-            await self._parse_response(consumer, resp)
+            await self._parse_response(consumer, resp, url)
         except Exception as e:
             self._logger.warning(
                 "Coroutine: {}, Encountered exception: {}".format(consumer, e)
             )
-            err_raised = True
-            raise e
+            if metrics is not None:
+                self._count(
+                    "scrapio_errors_total",
+                    "Exceptions raised while crawling a URL.",
+                    ("host", "error"),
+                    (metrics.host(host), type(e).__name__),
+                )
+            # Retries are queued before task_done, so join waits for them.
+            await self._retry(url, exception=e)
         finally:
-            self._queue.task_done()
-            if err_raised is True:
-                should_retry = await self.retry_handler.should_retry(url)
-                if should_retry:
-                    await self._queue.put_url(url)
-
-    async def _parse_response(self, consumer: int, response: Response) -> None:
-        defrag = self._url_filter.defragment
+            self._queue.task_done(url)
+
+    async def _fetch(self, url: str) -> Optional[Response]:
+        if self._stream_links:
+            extractor = StreamingLinkExtractor(
+                self._url_filter, self._url_filter.defragment, self._queue.wants_anchors
+            )
+            return await self._client.stream_request(
+                url, self._proxy_manager, extractor, self._keep_body
+            )
+        return await self._client.get_request(url, self._proxy_manager)
+
+    async def _parse_response(
+        self, consumer: int, response: Response, url: Optional[str] = None
+    ) -> None:
+        metrics = self._metrics
         try:
-            response, links = link_extractor(response, self._url_filter, defrag)
-            parsed_data = self.parse_result(response)
-            await self.save_results(parsed_data)
-            for link in links:
-                await self._queue.put_url(link)
+            if response.content is None and response.links is None:
+                # The body was skipped by the client's BodyRules.
+                self._logger.info(
+                    "Coroutine: %s, No body to parse: %s", consumer, response.url
+                )
+                return
+            if response.not_modified and self._skip_unchanged:
+                await self._queue.put_urls(self._extract_links(response), url)
+                return
+            if metrics is not None:
+                host = urlparse(str(response.url)).netloc
+                started_at = time.perf_counter()
+            if self._duplicates is not None:
+                duplicate_of = await self._check_duplicate(response)
+                if metrics is not None:
+                    started_at = self._observe("dedupe", host, started_at)
+                if duplicate_of is not None:
+                    self._logger.info(
+                        "Coroutine: %s, Near duplicate of %s: %s",
+                        consumer,
+                        duplicate_of,
+                        response.url,
+                    )
+                    if metrics is not None:
+                        self._count(
+                            "scrapio_duplicates_total",
+                            "Pages nearly duplicating a page crawled before.",
+                            ("action",),
+                            ("skipped" if self._duplicates.skip else "flagged",),
+                        )
+                    if self._duplicates.skip:
+                        return
+            if self._parse_executor:
+                links, parsed_data = await self._parse_executor.parse(response)
+                self._prefetch(links)
+            else:
+                links = self._extract_links(response)
+                self._prefetch(links)
+                if metrics is not None:
+                    started_at = self._observe("links", host, started_at)
+                parsed_data = self.parse_result(response)
+            if metrics is not None:
+                started_at = self._observe("parse", host, started_at)
+            if self._result_pipeline is not None:
+                await self._result_pipeline.put(parsed_data)
+            else:
+                await self.save_results(parsed_data)
+            if metrics is not None:
+                started_at = self._observe("save", host, started_at)
+            await self._queue.put_urls(links, url)
+            if metrics is not None:
+                self._observe("enqueue", host, started_at)
+                self._count(
+                    "scrapio_links_total",
+                    "Links found on crawled pages.",
+                    amount=len(links),
+                )
         except Exception as e:
             self._logger.warning(
                 "Coroutine: {}, Encountered exception: {}".format(consumer, e)
             )
 
+    def _prefetch(self, links: List[str]) -> None:
+        # Resolves the hosts of new links long before their URLs are crawled.
+        if self._resolver is None:
+            return
+        for netloc in {url_host(link) for link in links}:
+            self._resolver.prefetch(hostname(netloc))
+
+    def _extract_links(self, response: Response) -> List[str]:
+        if response.links is not None:
+            return response.links
+        _, links = link_extractor(
+            response,
+            self._url_filter,
+            self._url_filter.defragment,
+            self._queue.wants_anchors,
+        )
+        return links
+
     async def _process(self, consumer: int):
         while True:
             try:
@@ -136,19 +495,88 @@ class BaseCrawler:
             except asyncio.CancelledError:
                 return
 
-    async def _crawl(self, workers):
+    def concurrency_stats(self) -> Optional[Dict[str, Any]]:
+        """Current adaptive concurrency limits, when a controller is in use."""
+        if self._concurrency is None:
+            return None
+        return self._concurrency.stats()
+
+    async def _check_duplicate(self, response: Response) -> Optional[str]:
+        detector = self._duplicates
+        if self._parse_executor is None:
+            return detector.check(response)
+        text = response.text
+        if not text:
+            return None
+        fingerprint = await self._parse_executor.run(
+            page_fingerprint, text, detector.shingle_size, detector.min_tokens
+        )
+        return detector.check_fingerprint(response, fingerprint)
+
+    def _start_parse_executor(self) -> None:
+        if self._parse_executor_mode and self._parse_executor is None:
+            self._parse_executor = ParseExecutor(
+                self.parse_result,
+                self._url_filter,
+                self._url_filter.defragment,
+                mode=self._parse_executor_mode,
+                workers=self._parse_workers,
+                max_pending=self._max_pending_parses,
+                anchors=self._queue.wants_anchors,
+            )
+
+    async def _checkpoint(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            self._queue.checkpoint()
+
+    async def _crawl(self, workers, resume: bool = False):
+        if resume and self._queue.restore():
+            self._logger.info(
+                "Resumed crawl with {} queued URLs".format(self._queue.qsize())
+            )
+        self._start_parse_executor()
+        if self._result_pipeline is not None:
+            self._result_pipeline.start()
+        if self._metrics is not None:
+            self._register_gauges()
+        if self._metrics_server is not None:
+            await self._metrics_server.start()
+        if self._concurrency:
+            # workers is the most requests the controller may have in flight.
+            self._concurrency.set_max(workers)
         workers = [asyncio.Task(self._process(i)) for i in range(workers)]
+        if self._checkpoint_interval:
+            workers.append(asyncio.Task(self._checkpoint(self._checkpoint_interval)))
+        if self._seeder is not None:
+            await self._seeder.run(
+                self._queue,
+                self._client,
+                self._url_filter,
+                self._seed_urls(self._start_url),
+                self._proxy_manager,
+            )
         await self._queue.join()
         for worker in workers:
             worker.cancel()
 
     async def _close(self):
+        if self._result_pipeline is not None:
+            await self._result_pipeline.close()
+        if self._metrics_server is not None:
+            await self._metrics_server.stop()
         await self._client.close()
+        self._url_filter.close()
+        self._queue.checkpoint()
+        self._queue.close()
+        if self._parse_executor:
+            self._parse_executor.shutdown()
+            self._parse_executor = None
 
-    def run_crawler(self, workers: int) -> None:
+    def run_crawler(self, workers: int, resume: bool = False) -> None:
         loop = self._get_best_event_loop()
         try:
-            loop.run_until_complete(self._crawl(workers))
+            loop.run_until_complete(self._crawl(workers, resume))
         except KeyboardInterrupt:
             logging.info("Shutting down - received keyboard interrupt")
         finally:
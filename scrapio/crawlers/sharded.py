@@ -0,0 +1,514 @@
+import asyncio
+from bisect import bisect
+from collections import defaultdict
+from functools import lru_cache
+import hashlib
+import json
+import logging
+import multiprocessing
+import socket
+from typing import Dict, Iterable, List, Optional, Tuple, Type, Union
+from urllib.parse import urlparse
+
+from scrapio.crawlers.base_crawler import BaseCrawler
+from scrapio.structures.budgets import CrawlBudget, TrapFilter
+from scrapio.structures.frontier import AbstractFrontier
+from scrapio.structures.queues import WorkQueue
+from scrapio.url_set.abstract_set import AbstractUrlSet
+
+__all__ = ["ShardedCrawler", "ShardRing", "ShardBroker", "run_shard"]
+
+
+# Batches are sent as single JSON lines, well past asyncio's default limit.
+_LINE_LIMIT = 64 * 1024 * 1024
+# Seconds between checks that every shard process is still running.
+_POLL_INTERVAL = 0.5
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big"
+    )
+
+
+class ShardRing:
+    """Consistent hash ring assigning each host to one of shards.
+
+    Every shard owns replicas points on the ring, so hosts spread evenly and
+    adding a shard only moves about 1 / shards of them.
+    """
+
+    __slots__ = ["shards", "_points", "_owners", "shard_for_host"]
+
+    def __init__(self, shards: int, replicas: int = 128):
+        self.shards = shards
+        ring = sorted(
+            (_hash("{}-{}".format(shard, replica)), shard)
+            for shard in range(shards)
+            for replica in range(replicas)
+        )
+        self._points = [point for point, _ in ring]
+        self._owners = [shard for _, shard in ring]
+        self.shard_for_host = lru_cache(maxsize=65536)(self._lookup)
+
+    def _lookup(self, host: str) -> int:
+        index = bisect(self._points, _hash(host.lower()))
+        return self._owners[index % len(self._owners)]
+
+    def shard_for(self, url: str) -> int:
+        return self.shard_for_host(urlparse(url).netloc)
+
+
+async def _send(writer: asyncio.StreamWriter, message: Dict) -> None:
+    writer.write(json.dumps(message).encode("utf-8") + b"\n")
+    await writer.drain()
+
+
+class ShardBroker:
+    """Relays links between shards and detects when the whole crawl is done.
+
+    Shards send batches of links addressed to other shards, and report each
+    time they run out of work along with how many URLs they have received.
+    Every URL passes through the broker, so once every shard has reported
+    being idle after receiving all the URLs sent to it, nothing is left
+    queued or in transit and the shards are told to stop.
+    """
+
+    __slots__ = [
+        "_shards",
+        "_writers",
+        "_handlers",
+        "_pending",
+        "_delivered",
+        "_idle",
+        "_done",
+    ]
+
+    def __init__(self, shards: int):
+        self._shards = shards
+        self._writers: Dict[int, asyncio.StreamWriter] = {}
+        self._handlers: List[asyncio.Task] = []
+        # shard -> (URLs, their depths) waiting for the shard to connect
+        self._pending: Dict[int, Tuple[List[str], List[int]]] = {}
+        self._delivered = [0] * shards
+        # shard -> URLs it had received when it last reported being idle
+        self._idle: Dict[int, int] = {}
+        self._done: Optional[asyncio.Event] = None
+
+    async def _deliver(self, shard: int, urls: List[str], depths: List[int]) -> None:
+        writer = self._writers.get(shard)
+        if writer is None:
+            pending_urls, pending_depths = self._pending.setdefault(shard, ([], []))
+            pending_urls.extend(urls)
+            pending_depths.extend(depths)
+            return
+        self._delivered[shard] += len(urls)
+        await _send(writer, {"urls": urls, "depths": depths})
+
+    async def _check_done(self) -> None:
+        if len(self._idle) < self._shards:
+            return
+        if any(self._idle[shard] != self._delivered[shard] for shard in self._idle):
+            return
+        for writer in self._writers.values():
+            await _send(writer, {"stop": True})
+        self._done.set()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self._handlers.append(asyncio.current_task())
+        hello = json.loads(await reader.readline())
+        shard = hello["shard"]
+        self._writers[shard] = writer
+        pending = self._pending.pop(shard, None)
+        if pending:
+            await self._deliver(shard, *pending)
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            if "urls" in message:
+                urls = message["urls"]
+                await self._deliver(
+                    message["to"], urls, message.get("depths") or [0] * len(urls)
+                )
+            if "idle" in message:
+                self._idle[shard] = message["idle"]
+                await self._check_done()
+
+    @property
+    def finished(self) -> bool:
+        """Whether every shard has been told to stop."""
+        return self._done is not None and self._done.is_set()
+
+    async def serve(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        sock: Optional[socket.socket] = None,
+    ) -> None:
+        """Relays links until every shard has finished."""
+        self._done = asyncio.Event()
+        if sock is not None:
+            server = await asyncio.start_server(
+                self._handle, sock=sock, limit=_LINE_LIMIT
+            )
+        else:
+            server = await asyncio.start_server(
+                self._handle, host, port, limit=_LINE_LIMIT
+            )
+        async with server:
+            await self._done.wait()
+            # Shards hang up once they have stopped.
+            await asyncio.wait(self._handlers, timeout=30)
+            for writer in self._writers.values():
+                writer.close()
+
+
+class _ShardChannel:
+    """A shard's connection to the broker, batching links for other shards."""
+
+    __slots__ = [
+        "_shard",
+        "_address",
+        "_batch_size",
+        "_flush_interval",
+        "_outbox",
+        "_writer",
+        "_received",
+        "queue",
+    ]
+
+    def __init__(
+        self,
+        shard: int,
+        address: Tuple[str, int],
+        batch_size: int,
+        flush_interval: float,
+    ):
+        self._shard = shard
+        self._address = address
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        # shard -> (URLs, their depths) to send it
+        self._outbox: Dict[int, Tuple[List[str], List[int]]] = {}
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._received = 0
+        self.queue: Optional["ShardQueue"] = None
+
+    def forward(self, shard: int, url: str, depth: int = 0) -> None:
+        urls, depths = self._outbox.setdefault(shard, ([], []))
+        urls.append(url)
+        depths.append(depth)
+        if len(urls) >= self._batch_size and self._writer is not None:
+            asyncio.ensure_future(self._flush(shard))
+
+    async def _flush(self, shard: int) -> None:
+        batch = self._outbox.pop(shard, None)
+        if batch:
+            urls, depths = batch
+            await _send(self._writer, {"to": shard, "urls": urls, "depths": depths})
+
+    async def _flush_all(self) -> None:
+        for shard in list(self._outbox):
+            await self._flush(shard)
+
+    async def report_idle(self) -> None:
+        if self._writer is None:
+            return
+        await self._flush_all()
+        if self.queue.is_idle():
+            await _send(self._writer, {"idle": self._received})
+
+    async def _connect(self, attempts: int = 20) -> asyncio.StreamReader:
+        for attempt in range(attempts):
+            try:
+                reader, self._writer = await asyncio.open_connection(
+                    *self._address, limit=_LINE_LIMIT
+                )
+                break
+            except OSError:
+                if attempt == attempts - 1:
+                    raise
+                await asyncio.sleep(0.5)
+        await _send(self._writer, {"shard": self._shard})
+        return reader
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            await self._flush_all()
+
+    async def run(self) -> None:
+        """Receives URLs for this shard until the broker says to stop."""
+        reader = await self._connect()
+        flusher = asyncio.ensure_future(self._flush_periodically())
+        try:
+            await self.report_idle()
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                if message.get("stop"):
+                    break
+                urls = message.get("urls", [])
+                await self.queue.put_local_urls(urls, message.get("depths"))
+                self._received += len(urls)
+                await self.report_idle()
+        finally:
+            flusher.cancel()
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+
+
+class ShardQueue(WorkQueue):
+    """WorkQueue for one shard, forwarding URLs owned by other shards.
+
+    join waits for the broker to signal that every shard has finished rather
+    than for this shard's own queue to empty.
+    """
+
+    __slots__ = ["_shard", "_ring", "_channel"]
+
+    def __init__(
+        self,
+        max_crawl_size: Union[int, None],
+        seed_urls: Union[List[str], str],
+        shard: int,
+        ring: ShardRing,
+        channel: _ShardChannel,
+        seen_url_handler: AbstractUrlSet = None,
+        frontier: Optional[AbstractFrontier] = None,
+        max_depth: Optional[int] = None,
+        budget: Optional[CrawlBudget] = None,
+        trap_filter: Optional[TrapFilter] = None,
+    ):
+        self._shard = shard
+        self._ring = ring
+        self._channel = channel
+        channel.queue = self
+        super().__init__(
+            max_crawl_size,
+            seed_urls,
+            seen_url_handler,
+            frontier,
+            max_depth,
+            budget,
+            trap_filter,
+        )
+
+    async def put_url(self, url, parent: Optional[str] = None):
+        shard = self._ring.shard_for(url)
+        if shard == self._shard:
+            await super().put_url(url, parent)
+        elif url not in self._seen_urls:
+            # Marked as seen so each link is only forwarded once.
+            url = str(url)
+            self._mark_seen(url)
+            self._channel.forward(shard, url, self.link_depth(parent))
+
+    async def put_urls(
+        self,
+        urls: Iterable,
+        parent: Optional[str] = None,
+        depth: Optional[int] = None,
+    ) -> int:
+        local = []
+        forwarded: Dict[str, int] = {}
+        for url in urls:
+            shard = self._ring.shard_for(url)
+            if shard == self._shard:
+                local.append(url)
+            else:
+                forwarded[str(url)] = shard
+        # Marked as seen so each link is only forwarded once. The owning shard
+        # applies max_depth, budgets and trap filtering on arrival.
+        if depth is None:
+            depth = self.link_depth(parent)
+        for url in self._mark_seen_many(list(forwarded)):
+            self._channel.forward(forwarded[url], url, depth)
+        return await super().put_urls(local, parent, depth)
+
+    async def put_local(self, url, depth: int = 0) -> None:
+        await super().put_urls([url], depth=depth)
+
+    async def put_local_urls(
+        self, urls: Iterable, depths: Optional[List[int]] = None
+    ) -> int:
+        """Queues URLs forwarded from other shards at the depths they were
+        found at."""
+        if depths is None:
+            return await super().put_urls(urls)
+        by_depth: Dict[int, List[str]] = defaultdict(list)
+        for url, depth in zip(urls, depths):
+            by_depth[depth].append(url)
+        queued = 0
+        for depth, batch in by_depth.items():
+            queued += await super().put_urls(batch, depth=depth)
+        return queued
+
+    def is_idle(self) -> bool:
+        return self._unfinished == 0
+
+    def task_done(self, url: Optional[str] = None):
+        super().task_done(url)
+        if self._unfinished == 0:
+            asyncio.ensure_future(self._channel.report_idle())
+
+    async def join(self):
+        await self._channel.run()
+
+    def close(self) -> None:
+        super().close()
+        self._channel.close()
+
+
+def _start_urls(start_url: Union[List[str], str]) -> List[str]:
+    return [start_url] if isinstance(start_url, str) else list(start_url)
+
+
+def run_shard(
+    crawler_class: Type[BaseCrawler],
+    shard: int,
+    shards: int,
+    address: Tuple[str, int],
+    start_url: Union[List[str], str],
+    workers: int,
+    max_crawl_size: Optional[int] = None,
+    batch_size: int = 100,
+    flush_interval: float = 0.1,
+    **kwargs
+) -> None:
+    """Runs one shard of a crawl against the broker at address.
+
+    Every shard is given the same start URLs and keeps those whose host it
+    owns, so shards can be started by hand on separate machines. A seeder is
+    only run by the shard owning the first start URL.
+    """
+    ring = ShardRing(shards)
+    if (
+        kwargs.get("seeder") is not None
+        and ring.shard_for(_start_urls(start_url)[0]) != shard
+    ):
+        kwargs = dict(kwargs, seeder=None)
+    channel = _ShardChannel(shard, address, batch_size, flush_interval)
+    queue = ShardQueue(
+        max_crawl_size,
+        [url for url in _start_urls(start_url) if ring.shard_for(url) == shard],
+        shard,
+        ring,
+        channel,
+        seen_url_handler=kwargs.get("seen_url_handler"),
+        frontier=kwargs.get("frontier"),
+        max_depth=kwargs.get("max_depth"),
+        budget=crawler_class._set_budget(**kwargs),
+        trap_filter=kwargs.get("trap_filter"),
+    )
+    crawler = crawler_class(start_url, max_crawl_size, work_queue=queue, **kwargs)
+    crawler.run_crawler(workers)
+
+
+class ShardedCrawler:
+    """Runs a BaseCrawler subclass across several processes.
+
+    Hosts are split between shards by consistent hashing, so each shard
+    keeps its own seen set, rate limits and politeness for the hosts it owns,
+    and links to hosts owned by other shards are forwarded in batches
+    through a ShardBroker served from this process. max_crawl_size and the
+    seen_url_handler apply to each shard separately, save_results is called
+    in the shard's process, and persistent frontiers are not supported as
+    every shard would share the same file. max_depth, budgets and
+    trap_filter are applied by the shard owning each URL, and forwarded
+    links keep the depth they were found at. A seeder's sitemaps and seed
+    files are read once, by the shard owning the first start URL, which
+    forwards the URLs it finds to their shards like any link.
+    """
+
+    def __init__(
+        self,
+        crawler_class: Type[BaseCrawler],
+        start_url: Union[List[str], str],
+        shards: Optional[int] = None,
+        max_crawl_size: Optional[int] = None,
+        batch_size: int = 100,
+        flush_interval: float = 0.1,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        **kwargs
+    ):
+        self._crawler_class = crawler_class
+        self._start_url = start_url
+        self._shards = shards or multiprocessing.cpu_count()
+        self._max_crawl_size = max_crawl_size
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._address = (host, port)
+        self._kwargs = kwargs
+
+    def run_crawler(self, workers: int) -> None:
+        """Starts the shards, each with workers coroutines, and waits for the
+        crawl to finish."""
+        sock = socket.create_server(self._address)
+        address = sock.getsockname()[:2]
+        processes = [
+            multiprocessing.Process(
+                target=run_shard,
+                args=(
+                    self._crawler_class,
+                    shard,
+                    self._shards,
+                    address,
+                    self._start_url,
+                    workers,
+                    self._max_crawl_size,
+                    self._batch_size,
+                    self._flush_interval,
+                ),
+                kwargs=self._kwargs,
+            )
+            for shard in range(self._shards)
+        ]
+        for process in processes:
+            process.start()
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(self._serve(sock, processes))
+        except KeyboardInterrupt:
+            logging.info("Shutting down - received keyboard interrupt")
+        finally:
+            loop.close()
+            for process in processes:
+                process.join()
+
+    async def _serve(
+        self, sock: socket.socket, processes: List[multiprocessing.Process]
+    ) -> None:
+        # The broker only learns of shards through their connections, so the
+        # processes are watched for one exiting before the crawl is done,
+        # which would otherwise leave the broker waiting forever.
+        broker = ShardBroker(self._shards)
+        serving = asyncio.ensure_future(broker.serve(sock=sock))
+        while not serving.done():
+            await asyncio.wait([serving], timeout=_POLL_INTERVAL)
+            if serving.done() or broker.finished:
+                continue
+            for shard, process in enumerate(processes):
+                if process.exitcode is not None:
+                    for other in processes:
+                        if other.is_alive():
+                            other.terminate()
+                    serving.cancel()
+                    try:
+                        await serving
+                    except asyncio.CancelledError:
+                        pass
+                    raise RuntimeError(
+                        "Shard {} exited with code {} before the crawl "
+                        "finished".format(shard, process.exitcode)
+                    )
+        serving.result()
@@ -0,0 +1,12 @@
+from scrapio.metrics.registry import Counter, Gauge, Histogram, MetricsRegistry
+from scrapio.metrics.server import MetricsServer
+from scrapio.metrics.tracing import RequestTracer
+
+__all__ = [
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricsRegistry",
+    "MetricsServer",
+    "RequestTracer",
+]
@@ -0,0 +1,220 @@
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+__all__ = ["Counter", "Gauge", "Histogram", "MetricsRegistry"]
+
+Labels = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(name, _escape(str(value)))
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    __slots__ = ["name", "help", "labelnames", "_values"]
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, object] = {}
+
+    def samples(self) -> List[Tuple[str, Labels, Sequence[str], float]]:
+        return [
+            (self.name, labels, self.labelnames, value)
+            for labels, value in self._values.items()
+        ]
+
+    def snapshot(self) -> Dict[Labels, object]:
+        return dict(self._values)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    __slots__ = []
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+
+class Gauge(_Metric):
+    """A value which can go up and down, either set directly or read from
+    function each time the registry is collected."""
+
+    kind = "gauge"
+
+    __slots__ = ["_function"]
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        function: Optional[Callable[[], float]] = None,
+    ):
+        super().__init__(name, help, labelnames)
+        self._function = function
+
+    def set(self, value: float, labels: Labels = ()) -> None:
+        self._values[labels] = value
+
+    def _collect(self) -> None:
+        if self._function is not None:
+            self._values[()] = self._function()
+
+    def samples(self):
+        self._collect()
+        return super().samples()
+
+    def snapshot(self):
+        self._collect()
+        return super().snapshot()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    __slots__ = ["buckets"]
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        state = self._values.get(labels)
+        if state is None:
+            # Per bucket counts (the last is +Inf), then sum and count.
+            state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    def samples(self):
+        samples = []
+        names = self.labelnames + ("le",)
+        for labels, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                samples.append(
+                    (
+                        self.name + "_bucket",
+                        labels + (_format_value(bound),),
+                        names,
+                        cumulative,
+                    )
+                )
+            samples.append((self.name + "_sum", labels, self.labelnames, total))
+            samples.append((self.name + "_count", labels, self.labelnames, count))
+        return samples
+
+    def snapshot(self):
+        return {
+            labels: {"count": count, "sum": total}
+            for labels, (_, total, count) in self._values.items()
+        }
+
+
+class MetricsRegistry:
+    """Collection of counters, gauges and histograms for a crawl.
+
+    Host label values are capped at max_hosts distinct hosts, after which
+    further hosts are counted under "other" to keep memory bounded.
+    """
+
+    __slots__ = ["_metrics", "_hosts", "max_hosts"]
+
+    def __init__(self, max_hosts: int = 1000):
+        self._metrics: Dict[str, _Metric] = {}
+        self._hosts = set()
+        self.max_hosts = max_hosts
+
+    def _register(self, metric_class, name: str, *args, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = metric_class(name, *args, **kwargs)
+        elif not isinstance(metric, metric_class):
+            raise ValueError("Metric {} is already a {}".format(name, metric.kind))
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, help, labelnames)
+
+    def gauge(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        function: Optional[Callable[[], float]] = None,
+    ) -> Gauge:
+        return self._register(Gauge, name, help, labelnames, function)
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram, name, help, labelnames, buckets)
+
+    def host(self, host: str) -> str:
+        if host in self._hosts:
+            return host
+        if len(self._hosts) >= self.max_hosts:
+            return "other"
+        self._hosts.add(host)
+        return host
+
+    def observe_stage(self, stage: str, host: str, seconds: float) -> None:
+        """Records time spent in one stage of handling a URL on host."""
+        self.histogram(
+            "scrapio_stage_seconds",
+            "Time spent in each stage of handling a URL.",
+            ("stage", "host"),
+        ).observe(seconds, (stage, self.host(host)))
+
+    def snapshot(self) -> Dict[str, Dict[Labels, object]]:
+        """Current values of every metric, keyed by name then label values."""
+        return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append("# HELP {} {}".format(metric.name, metric.help))
+            lines.append("# TYPE {} {}".format(metric.name, metric.kind))
+            for name, labels, labelnames, value in metric.samples():
+                lines.append(
+                    "{}{} {}".format(
+                        name, _format_labels(labelnames, labels), _format_value(value)
+                    )
+                )
+        return "\n".join(lines) + "\n"
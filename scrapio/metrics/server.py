@@ -0,0 +1,43 @@
+from typing import Optional
+
+from aiohttp import web
+
+from scrapio.metrics.registry import MetricsRegistry
+
+__all__ = ["MetricsServer"]
+
+
+class MetricsServer:
+    """Serves a registry at /metrics for Prometheus to scrape."""
+
+    __slots__ = ["registry", "host", "port", "_runner"]
+
+    def __init__(
+        self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 9100
+    ):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _metrics(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text=self.registry.render(), content_type="text/plain", charset="utf-8"
+        )
+
+    async def start(self) -> None:
+        if self._runner is not None:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", self._metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # Port 0 binds any free port, which is recorded here.
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
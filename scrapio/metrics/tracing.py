@@ -0,0 +1,62 @@
+import time
+from urllib.parse import urlparse
+
+from aiohttp import TraceConfig
+
+from scrapio.metrics.registry import MetricsRegistry
+
+__all__ = ["RequestTracer"]
+
+
+class RequestTracer:
+    """Times DNS resolution, connection set up and time to first byte of each
+    request made by a ClientSession, recording them as stages per host."""
+
+    __slots__ = ["registry"]
+
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+
+    def trace_config(self) -> TraceConfig:
+        trace_config = TraceConfig()
+        trace_config.on_request_start.append(self._on_request_start)
+        trace_config.on_dns_resolvehost_start.append(self._on_dns_start)
+        trace_config.on_dns_resolvehost_end.append(self._on_dns_end)
+        trace_config.on_connection_create_start.append(self._on_create_start)
+        trace_config.on_connection_create_end.append(self._on_create_end)
+        trace_config.on_request_end.append(self._on_request_end)
+        trace_config.on_request_exception.append(self._on_request_exception)
+        return trace_config
+
+    async def _on_request_start(self, session, context, params) -> None:
+        context.host = urlparse(str(params.url)).netloc
+        context.started_at = time.perf_counter()
+
+    async def _on_dns_start(self, session, context, params) -> None:
+        context.dns_started_at = time.perf_counter()
+
+    async def _on_dns_end(self, session, context, params) -> None:
+        self.registry.observe_stage(
+            "dns", context.host, time.perf_counter() - context.dns_started_at
+        )
+
+    async def _on_create_start(self, session, context, params) -> None:
+        context.connect_started_at = time.perf_counter()
+
+    async def _on_create_end(self, session, context, params) -> None:
+        self.registry.observe_stage(
+            "connect", context.host, time.perf_counter() - context.connect_started_at
+        )
+
+    async def _on_request_end(self, session, context, params) -> None:
+        # Sent once the response headers have arrived, before the body is read.
+        self.registry.observe_stage(
+            "ttfb", context.host, time.perf_counter() - context.started_at
+        )
+
+    async def _on_request_exception(self, session, context, params) -> None:
+        self.registry.counter(
+            "scrapio_request_errors_total",
+            "Requests which failed before a response arrived.",
+            ("host", "error"),
+        ).inc((self.registry.host(context.host), type(params.exception).__name__))
@@ -0,0 +1,171 @@
+from hashlib import blake2b
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from scrapio.requests.response import Response
+
+__all__ = [
+    "simhash",
+    "page_tokens",
+    "page_fingerprint",
+    "SimHashIndex",
+    "DuplicateDetector",
+]
+
+_MARKUP = re.compile(
+    r"<(script|style|noscript)\b.*?</\1\s*>|<!--.*?-->|<[^>]*>", re.S | re.I
+)
+_WORD = re.compile(r"\w+")
+
+# Each of the 64 bits of a feature hash is spread into its own 32 bit lane of
+# a large integer, so that summing them counts every bit position at once.
+_LANE = 32
+_LANE_MASK = (1 << _LANE) - 1
+_SPREAD = [
+    sum(1 << (bit * _LANE) for bit in range(8) if byte >> bit & 1)
+    for byte in range(256)
+]
+
+
+def page_tokens(text: str) -> List[str]:
+    """Lower cased words of an HTML page's text, leaving out its markup,
+    scripts and styles."""
+    return _WORD.findall(_MARKUP.sub(" ", text).lower())
+
+
+def simhash(features: Iterable[str]) -> int:
+    """64 bit SimHash of features, in which each bit is set when most of the
+    features' hashes have it set, so similar sets give close fingerprints."""
+    total = 0
+    count = 0
+    for feature in features:
+        digest = blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        spread = 0
+        for index, byte in enumerate(digest):
+            spread |= _SPREAD[byte] << (index * 8 * _LANE)
+        total += spread
+        count += 1
+    fingerprint = 0
+    for bit in range(64):
+        if ((total >> (bit * _LANE)) & _LANE_MASK) * 2 > count:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def page_fingerprint(text: str, shingle_size: int, min_tokens: int) -> Optional[int]:
+    """SimHash of the word shingles of an HTML page, or None when it has fewer
+    than min_tokens words."""
+    tokens = page_tokens(text)
+    if len(tokens) < min_tokens:
+        return None
+    return simhash(
+        " ".join(tokens[index : index + shingle_size])
+        for index in range(len(tokens) - shingle_size + 1)
+    )
+
+
+def _distance(first: int, second: int) -> int:
+    return bin(first ^ second).count("1")
+
+
+class SimHashIndex:
+    """Finds fingerprints within max_distance bits of one another.
+
+    Fingerprints are split into max_distance + 1 bands. Two fingerprints
+    differing in at most max_distance bits agree on at least one whole band,
+    so only those sharing a band with a fingerprint are compared with it.
+    """
+
+    __slots__ = ["max_distance", "_bands", "_buckets", "_fingerprints", "_keys"]
+
+    def __init__(self, max_distance: int = 3):
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        width = 64 // bands
+        self._bands: List[Tuple[int, int]] = [
+            (
+                band * width,
+                (1 << (width if band < bands - 1 else 64 - band * width)) - 1,
+            )
+            for band in range(bands)
+        ]
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in range(bands)]
+        self._fingerprints: List[int] = []
+        self._keys: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._fingerprints)
+
+    def find(self, fingerprint: int) -> Optional[str]:
+        """The key of a near duplicate of fingerprint, if one was added."""
+        for (shift, mask), buckets in zip(self._bands, self._buckets):
+            for index in buckets.get((fingerprint >> shift) & mask, ()):
+                if (
+                    _distance(fingerprint, self._fingerprints[index])
+                    <= self.max_distance
+                ):
+                    return self._keys[index]
+        return None
+
+    def add(self, fingerprint: int, key: str) -> None:
+        index = len(self._fingerprints)
+        self._fingerprints.append(fingerprint)
+        self._keys.append(key)
+        for (shift, mask), buckets in zip(self._bands, self._buckets):
+            buckets.setdefault((fingerprint >> shift) & mask, []).append(index)
+
+
+class DuplicateDetector:
+    """Spots pages whose text nearly matches a page crawled before.
+
+    Pages are fingerprinted with a SimHash of their word shingles and looked
+    up in a SimHashIndex. With skip set near duplicates are neither parsed,
+    saved nor have their links followed, otherwise they are only flagged
+    through Response.duplicate_of. Pages with fewer than min_tokens words
+    are never taken for duplicates. Counts are kept in stats.
+
+    Fingerprinting is CPU bound. Crawlers with a parse_executor compute
+    fingerprints in it and pass them to check_fingerprint, otherwise check
+    runs on the event loop.
+    """
+
+    __slots__ = ["skip", "shingle_size", "min_tokens", "_index", "stats"]
+
+    def __init__(
+        self,
+        max_distance: int = 3,
+        skip: bool = True,
+        shingle_size: int = 3,
+        min_tokens: int = 20,
+    ):
+        self.skip = skip
+        self.shingle_size = shingle_size
+        self.min_tokens = min_tokens
+        self._index = SimHashIndex(max_distance)
+        self.stats: Dict[str, int] = {"checked": 0, "duplicates": 0}
+
+    def fingerprint(self, text: str) -> Optional[int]:
+        return page_fingerprint(text, self.shingle_size, self.min_tokens)
+
+    def check(self, response: Response) -> Optional[str]:
+        """Returns the URL of the page response nearly duplicates, recording
+        it as an original otherwise."""
+        text = response.text
+        if not text:
+            return None
+        return self.check_fingerprint(response, self.fingerprint(text))
+
+    def check_fingerprint(
+        self, response: Response, fingerprint: Optional[int]
+    ) -> Optional[str]:
+        """As check, for a fingerprint of response computed elsewhere."""
+        if fingerprint is None:
+            return None
+        self.stats["checked"] += 1
+        original = self._index.find(fingerprint)
+        if original is not None:
+            self.stats["duplicates"] += 1
+            response.duplicate_of = original
+            return original
+        self._index.add(fingerprint, str(response.url))
+        return None
@@ -0,0 +1,150 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+import logging
+import os
+import pickle
+from typing import Any, Callable, List, Optional, Tuple
+
+from multidict import CIMultiDict
+
+from scrapio.parsing.links import link_extractor
+from scrapio.requests.response import Response
+from scrapio.structures.filtering import URLFilter
+
+__all__ = ["ParseExecutor"]
+
+
+_worker_args: Tuple = ()
+
+
+def _init_worker(
+    parse_function: Callable[[Response], Any],
+    url_filter: URLFilter,
+    defrag: bool,
+    anchors: bool,
+) -> None:
+    global _worker_args
+    _worker_args = (parse_function, url_filter, defrag, anchors)
+
+
+def _parse_page(
+    parse_function: Callable[[Response], Any],
+    url_filter: URLFilter,
+    defrag: bool,
+    anchors: bool,
+    url,
+    status: int,
+    headers,
+    body: Optional[bytes],
+    links: Optional[List[str]],
+) -> Tuple[List[str], Any]:
+    response = Response()
+    response.url = url
+    response.status = status
+    response.headers = headers
+    response.content = body
+    response.links = links
+    if links is None:
+        response, links = link_extractor(response, url_filter, defrag, anchors)
+    return links, parse_function(response)
+
+
+def _parse_in_worker(
+    url, status: int, headers, body: Optional[bytes], links: Optional[List[str]]
+) -> Tuple[List[str], Any]:
+    return _parse_page(*_worker_args, url, status, headers, body, links)
+
+
+class ParseExecutor:
+    """Runs link extraction and parse_result off the event loop.
+
+    In process mode the parse function, URL filter and each parsed result must
+    be picklable; when the parse function cannot be pickled, or the platform
+    cannot start a process pool, a thread pool is used instead.
+    """
+
+    __slots__ = ["mode", "_executor", "_job", "_slots"]
+
+    def __init__(
+        self,
+        parse_function: Callable[[Response], Any],
+        url_filter: URLFilter,
+        defrag: bool,
+        mode: str = "process",
+        workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        anchors: bool = False,
+    ):
+        if mode not in ("process", "thread"):
+            raise ValueError("Unknown parse executor mode: {}".format(mode))
+        workers = workers or os.cpu_count() or 1
+        self.mode = mode
+        self._executor: Optional[Executor] = None
+        if mode == "process":
+            self._executor = self._start_process_pool(
+                parse_function, url_filter, defrag, anchors, workers
+            )
+        if self._executor is None:
+            self.mode = "thread"
+            self._executor = ThreadPoolExecutor(max_workers=workers)
+            self._job = partial(
+                _parse_page, parse_function, url_filter, defrag, anchors
+            )
+        else:
+            self._job = _parse_in_worker
+        self._slots = asyncio.Semaphore(max_pending or workers * 2)
+
+    @staticmethod
+    def _start_process_pool(
+        parse_function: Callable[[Response], Any],
+        url_filter: URLFilter,
+        defrag: bool,
+        anchors: bool,
+        workers: int,
+    ) -> Optional[ProcessPoolExecutor]:
+        logger = logging.getLogger("ScrapIO")
+        try:
+            pickle.dumps((parse_function, url_filter))
+        except Exception as e:
+            logger.warning(
+                "Parse function cannot be sent to worker processes, "
+                "falling back to threads: {}".format(e)
+            )
+            return None
+        try:
+            return ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(parse_function, url_filter, defrag, anchors),
+            )
+        except (NotImplementedError, OSError) as e:
+            logger.warning(
+                "Unable to start process pool, falling back to threads: {}".format(e)
+            )
+            return None
+
+    async def run(self, function: Callable[..., Any], *args) -> Any:
+        """Runs a picklable module level function in the pool."""
+        async with self._slots:
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(self._executor, function, *args)
+
+    async def parse(self, response: Response) -> Tuple[List[str], Any]:
+        headers = (
+            CIMultiDict(response.headers) if response.headers is not None else None
+        )
+        async with self._slots:
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(
+                self._executor,
+                self._job,
+                response.url,
+                response.status,
+                headers,
+                response.content,
+                response.links,
+            )
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
@@ -1,25 +1,186 @@
-from typing import List
+from typing import Iterable, List, Optional
 from urllib.parse import urlparse, urljoin, urldefrag
 
 from scrapio.requests.response import Response
+import lxml.etree as etree
 import lxml.html as lh
 
 from scrapio.structures.filtering import URLFilter
 
 
-def link_extractor(
-    response: Response, url_filter: URLFilter, defrag: bool
-) -> (str, List[str]):
-    html = response.body
-    req_url = response.url
-    dom = lh.fromstring(html)
+class Link(str):
+    """A URL found on a page, carrying the text of the anchor linking to it."""
+
+    def __new__(cls, url: str, anchor: str = ""):
+        link = super().__new__(cls, url)
+        link.anchor = anchor
+        return link
+
+    def __reduce__(self):
+        return Link, (str(self), self.anchor)
+
+
+def _anchor_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _resolve_links(
+    base_url: str,
+    hrefs: Iterable[str],
+    url_filter: URLFilter,
+    defrag: bool,
+    anchors: Optional[List[str]] = None,
+) -> List[str]:
     found_urls = []
-    for href in dom.xpath("//a/@href"):
-        url = urljoin(str(req_url), href)
+    canonicalizer = url_filter.canonicalizer
+    if canonicalizer is not None:
+        for index, split in enumerate(canonicalizer.resolve_many(base_url, hrefs)):
+            if split is not None and url_filter.can_crawl(split[1], split[0]):
+                url = split[0]
+                found_urls.append(url if anchors is None else Link(url, anchors[index]))
+        return found_urls
+    for index, href in enumerate(hrefs):
+        url = urljoin(base_url, href)
         if defrag:
             url = urldefrag(url)[0]
         netloc = urlparse(url).netloc
         can_crawl = url_filter.can_crawl(netloc, url)
         if can_crawl:
-            found_urls.append(url)
+            found_urls.append(url if anchors is None else Link(url, anchors[index]))
+    return found_urls
+
+
+def link_extractor(
+    response: Response, url_filter: URLFilter, defrag: bool, anchors: bool = False
+) -> (str, List[str]):
+    """Returns the crawlable links in response, as Link objects carrying
+    their anchor text if anchors is set."""
+    req_url = response.url
+    # lxml decodes the bytes itself, so no str copy of the page is made here.
+    parser = lh.HTMLParser(encoding=response.encoding)
+    dom = lh.fromstring(response.content, parser=parser)
+    if anchors:
+        elements = dom.xpath("//a[@href]")
+        found_urls = _resolve_links(
+            str(req_url),
+            [element.get("href") for element in elements],
+            url_filter,
+            defrag,
+            [_anchor_text(element.text_content()) for element in elements],
+        )
+    else:
+        found_urls = _resolve_links(
+            str(req_url), dom.xpath("//a/@href"), url_filter, defrag
+        )
     return response, found_urls
+
+
+class _HrefTarget:
+    """lxml parser target which records anchor hrefs instead of building a tree.
+
+    With anchors set the text inside each anchor is recorded as well.
+    """
+
+    __slots__ = ["hrefs", "anchors", "_text"]
+
+    def __init__(self, anchors: bool = False):
+        self.hrefs: List[str] = []
+        self.anchors: Optional[List[str]] = [] if anchors else None
+        self._text: Optional[List[str]] = None
+
+    def start(self, tag, attrib):
+        if tag == "a":
+            href = attrib.get("href")
+            if href is not None:
+                self.hrefs.append(href)
+                if self.anchors is not None:
+                    self._text = []
+                    self.anchors.append("")
+
+    def end(self, tag):
+        if tag == "a" and self._text is not None:
+            self.anchors[-1] = _anchor_text("".join(self._text))
+            self._text = None
+
+    def data(self, data):
+        if self._text is not None:
+            self._text.append(data)
+
+    def close(self):
+        pass
+
+
+class StreamingLinkExtractor:
+    """Extracts links from a response body as it arrives, chunk by chunk.
+
+    The body is fed to lxml's HTML feed parser with a target that only records
+    hrefs, so neither a DOM nor a decoded copy of the page is ever built.
+    """
+
+    __slots__ = [
+        "_url_filter",
+        "_defrag",
+        "_anchors",
+        "_base_url",
+        "_parser",
+        "_target",
+        "links",
+    ]
+
+    def __init__(self, url_filter: URLFilter, defrag: bool, anchors: bool = False):
+        self._url_filter = url_filter
+        self._defrag = defrag
+        self._anchors = anchors
+        self._base_url: Optional[str] = None
+        self._parser: Optional[etree.HTMLParser] = None
+        self._target: Optional[_HrefTarget] = None
+        self.links: List[str] = []
+
+    def begin(self, base_url: str, encoding: Optional[str] = None) -> None:
+        self._base_url = base_url
+        self._target = _HrefTarget(self._anchors)
+        self._parser = etree.HTMLParser(
+            target=self._target, encoding=encoding or "utf-8"
+        )
+        self.links = []
+
+    def _drain(self) -> List[str]:
+        target = self._target
+        hrefs = target.hrefs
+        anchors = None
+        if target.anchors is not None:
+            # An anchor still open at the end of a chunk waits for its text.
+            complete = len(hrefs) - (target._text is not None)
+            hrefs, target.hrefs = hrefs[:complete], hrefs[complete:]
+            anchors, target.anchors = (
+                target.anchors[:complete],
+                target.anchors[complete:],
+            )
+        else:
+            target.hrefs = []
+        if not hrefs:
+            return []
+        found = _resolve_links(
+            self._base_url, hrefs, self._url_filter, self._defrag, anchors
+        )
+        self.links.extend(found)
+        return found
+
+    def feed(self, chunk: bytes) -> List[str]:
+        """Parses the next chunk of the body, returning the newly found links."""
+        if chunk:
+            self._parser.feed(chunk)
+        return self._drain()
+
+    def close(self) -> List[str]:
+        """Finishes parsing and returns every link found in the body."""
+        try:
+            self._parser.close()
+        except etree.XMLSyntaxError:
+            pass
+        # Takes any anchor left unclosed at the end of the body with the text
+        # read so far.
+        if self._target._text is not None:
+            self._target.end("a")
+        self._drain()
+        return self.links
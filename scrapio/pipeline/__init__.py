@@ -0,0 +1,4 @@
+from scrapio.pipeline.pipeline import ResultPipeline
+from scrapio.pipeline.sinks import AbstractSink, CSVSink, JSONLSink, SQLiteSink
+
+__all__ = ["ResultPipeline", "AbstractSink", "CSVSink", "JSONLSink", "SQLiteSink"]
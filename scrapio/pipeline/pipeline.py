@@ -0,0 +1,132 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import logging
+from typing import Any, Dict, List, Optional
+
+from scrapio.pipeline.sinks import AbstractSink
+
+__all__ = ["ResultPipeline"]
+
+
+_CLOSE = object()
+
+
+class ResultPipeline:
+    """Bounded queue between parsing and a sink, writing results in batches.
+
+    Results are written once batch_size have been collected or flush_interval
+    seconds after the first of a batch arrived, whichever comes first, on a
+    single background thread. When max_pending results are already waiting,
+    put either waits for room (block=True) or drops the result and counts it.
+    close writes everything still queued before closing the sink.
+    """
+
+    __slots__ = [
+        "_sink",
+        "_batch_size",
+        "_flush_interval",
+        "_max_pending",
+        "_block",
+        "_queue",
+        "_writer",
+        "_executor",
+        "stats",
+    ]
+
+    def __init__(
+        self,
+        sink: AbstractSink,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_pending: int = 10000,
+        block: bool = True,
+    ):
+        self._sink = sink
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._max_pending = max_pending
+        self._block = block
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.stats: Dict[str, int] = {"written": 0, "batches": 0, "dropped": 0}
+
+    def start(self) -> None:
+        if self._writer is not None:
+            return
+        self._queue = asyncio.Queue(self._max_pending)
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="scrapio-sink")
+        self._writer = asyncio.ensure_future(self._write_batches())
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def put(self, result: Any) -> None:
+        if result is None:
+            return
+        if self._writer is None:
+            self.start()
+        if self._block:
+            await self._queue.put(result)
+            return
+        try:
+            self._queue.put_nowait(result)
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+
+    async def _next_batch(self) -> List[Any]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._flush_interval
+        while len(batch) < self._batch_size and batch[-1] is not _CLOSE:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            getter = asyncio.ensure_future(self._queue.get())
+            await asyncio.wait([getter], timeout=remaining)
+            if not getter.done():
+                getter.cancel()
+                # The get may still complete before the cancellation lands.
+                await asyncio.wait([getter])
+            if getter.cancelled():
+                break
+            batch.append(getter.result())
+        return batch
+
+    async def _write_batches(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            closing = batch[-1] is _CLOSE
+            if closing:
+                batch.pop()
+            if batch:
+                try:
+                    await loop.run_in_executor(self._executor, self._sink.write, batch)
+                except Exception as e:
+                    logger = logging.getLogger("ScrapIO")
+                    logger.warning(
+                        "Unable to write {} results: {}".format(len(batch), e)
+                    )
+                else:
+                    self.stats["written"] += len(batch)
+                    self.stats["batches"] += 1
+            if closing:
+                return
+
+    async def close(self) -> None:
+        """Writes any queued results and closes the sink."""
+        if self._writer is None:
+            return
+        # Waits for room even when not blocking, so no result is lost.
+        await self._queue.put(_CLOSE)
+        await self._writer
+        await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._sink.close
+        )
+        self._executor.shutdown(wait=True)
+        self._writer = None
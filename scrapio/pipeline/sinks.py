@@ -0,0 +1,165 @@
+from abc import ABC, abstractmethod
+import csv
+import gzip
+import json
+import os
+import sqlite3
+from typing import Any, IO, List, Optional
+
+__all__ = ["AbstractSink", "JSONLSink", "CSVSink", "SQLiteSink"]
+
+
+def _open_text(path: str, compress: bool) -> IO:
+    if compress:
+        return gzip.open(path, "at", encoding="utf-8", newline="")
+    return open(path, "a", encoding="utf-8", newline="")
+
+
+def _as_dict(result: Any) -> Any:
+    # Lets defaultdicts and similar mappings through as plain dicts.
+    return dict(result) if hasattr(result, "keys") else result
+
+
+class AbstractSink(ABC):
+    """Destination for batches of parsed results.
+
+    Sinks are called from a single background thread, so they may block on
+    disk or network IO without holding up the crawl.
+    """
+
+    @abstractmethod
+    def write(self, results: List[Any]) -> None:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+class JSONLSink(AbstractSink):
+    """Appends each result to path as a line of JSON, gzipped if compress."""
+
+    __slots__ = ["_path", "_compress", "_file"]
+
+    def __init__(self, path: str, compress: bool = False):
+        self._path = path
+        self._compress = compress
+        self._file: Optional[IO] = None
+
+    def write(self, results: List[Any]) -> None:
+        if self._file is None:
+            self._file = _open_text(self._path, self._compress)
+        self._file.write(
+            "".join(
+                json.dumps(_as_dict(result), default=str) + "\n" for result in results
+            )
+        )
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class CSVSink(AbstractSink):
+    """Appends results to path as CSV rows, gzipped if compress.
+
+    Mappings are written by column name, taking the columns from the first
+    result unless fieldnames is given; any other result is written as a row
+    of values.
+    """
+
+    __slots__ = ["_path", "_compress", "_fieldnames", "_file", "_writer"]
+
+    def __init__(
+        self,
+        path: str,
+        fieldnames: Optional[List[str]] = None,
+        compress: bool = False,
+    ):
+        self._path = path
+        self._compress = compress
+        self._fieldnames = fieldnames
+        self._file: Optional[IO] = None
+        self._writer = None
+
+    def _open(self, first: Any) -> None:
+        new_file = not os.path.exists(self._path) or os.path.getsize(self._path) == 0
+        self._file = _open_text(self._path, self._compress)
+        if hasattr(first, "keys"):
+            self._fieldnames = self._fieldnames or list(first.keys())
+            self._writer = csv.DictWriter(
+                self._file, self._fieldnames, extrasaction="ignore"
+            )
+            if new_file:
+                self._writer.writeheader()
+        else:
+            self._writer = csv.writer(self._file)
+
+    def write(self, results: List[Any]) -> None:
+        if self._file is None:
+            self._open(results[0])
+        self._writer.writerows(results)
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class SQLiteSink(AbstractSink):
+    """Bulk inserts results into table, one transaction per batch.
+
+    The table is created with the keys of the first result unless columns is
+    given. Values other than numbers, strings and bytes are stored as JSON.
+    """
+
+    __slots__ = ["_path", "_table", "_columns", "_conn", "_insert"]
+
+    def __init__(
+        self, path: str, table: str = "results", columns: Optional[List[str]] = None
+    ):
+        self._path = path
+        self._table = table
+        self._columns = columns
+        self._conn: Optional[sqlite3.Connection] = None
+        self._insert: Optional[str] = None
+
+    @staticmethod
+    def _quote(name: str) -> str:
+        return '"{}"'.format(name.replace('"', '""'))
+
+    def _open(self, first: Any) -> None:
+        self._columns = self._columns or list(_as_dict(first).keys())
+        columns = ", ".join(self._quote(column) for column in self._columns)
+        self._conn = sqlite3.connect(self._path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS {} ({})".format(
+                self._quote(self._table), columns
+            )
+        )
+        self._insert = "INSERT INTO {} ({}) VALUES ({})".format(
+            self._quote(self._table), columns, ", ".join("?" * len(self._columns))
+        )
+
+    @staticmethod
+    def _value(value: Any) -> Any:
+        if value is None or isinstance(value, (int, float, str, bytes)):
+            return value
+        return json.dumps(value, default=str)
+
+    def write(self, results: List[Any]) -> None:
+        if self._conn is None:
+            self._open(results[0])
+        rows = [
+            tuple(self._value(result.get(column)) for column in self._columns)
+            for result in map(_as_dict, results)
+        ]
+        with self._conn:
+            self._conn.executemany(self._insert, rows)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,219 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import json
+import sqlite3
+import time
+import zlib
+from typing import Dict, Optional
+
+from multidict import CIMultiDict
+
+from scrapio.requests.client import AbstractClient
+from scrapio.requests.response import Response
+from scrapio.structures.proxies import AbstractProxyManager
+
+
+class CacheEntry:
+    __slots__ = ["url", "status", "headers", "body", "etag", "last_modified"]
+
+    def __init__(
+        self,
+        url: str,
+        status: int,
+        headers: CIMultiDict,
+        body: bytes,
+        etag: Optional[str],
+        last_modified: Optional[str],
+    ):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def validators(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_response(self) -> Response:
+        response = Response()
+        response.url = self.url
+        response.status = self.status
+        response.headers = self.headers
+        response.content = self.body
+        response.not_modified = True
+        return response
+
+
+class HttpCache:
+    """On-disk store of response bodies and their validators.
+
+    Bodies are zlib compressed in a SQLite database, and once the compressed
+    bodies exceed max_size bytes the least recently used entries are evicted.
+    """
+
+    __slots__ = ["_conn", "_max_size", "_size"]
+
+    def __init__(self, path: str, max_size: int = 512 * 1024 * 1024):
+        # Used from the single worker thread of CachingClient's executor.
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "url TEXT PRIMARY KEY, final_url TEXT, status INTEGER, headers TEXT, "
+            "etag TEXT, last_modified TEXT, body BLOB, size INTEGER, accessed REAL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+        )
+        self._conn.commit()
+        self._max_size = max_size
+        self._size: int = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        row = self._conn.execute(
+            "SELECT final_url, status, headers, body, etag, last_modified "
+            "FROM responses WHERE url = ?",
+            (url,),
+        ).fetchone()
+        if row is None:
+            return None
+        final_url, status, headers, body, etag, last_modified = row
+        return CacheEntry(
+            final_url,
+            status,
+            CIMultiDict(json.loads(headers)),
+            zlib.decompress(body),
+            etag,
+            last_modified,
+        )
+
+    def touch(self, url: str) -> None:
+        with self._conn:
+            self._conn.execute(
+                "UPDATE responses SET accessed = ? WHERE url = ?", (time.time(), url)
+            )
+
+    def store(self, url: str, response: Response, body: bytes) -> bool:
+        """Caches body if the response carries an ETag or Last-Modified header."""
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return False
+        compressed = zlib.compress(body)
+        if len(compressed) > self._max_size:
+            return False
+        with self._conn:
+            previous = self._conn.execute(
+                "SELECT size FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    url,
+                    str(response.url),
+                    response.status,
+                    json.dumps(list(response.headers.items())),
+                    etag,
+                    last_modified,
+                    compressed,
+                    len(compressed),
+                    time.time(),
+                ),
+            )
+            self._size += len(compressed) - (previous[0] if previous else 0)
+            if self._size > self._max_size:
+                self._evict()
+        return True
+
+    def _evict(self) -> None:
+        # Rows are read oldest first through the accessed index and only
+        # until enough has been freed, rather than loading the whole table.
+        cursor = self._conn.execute("SELECT url, size FROM responses ORDER BY accessed")
+        evicted = []
+        try:
+            for url, size in cursor:
+                if self._size <= self._max_size:
+                    break
+                evicted.append((url,))
+                self._size -= size
+        finally:
+            cursor.close()
+        self._conn.executemany("DELETE FROM responses WHERE url = ?", evicted)
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class CachingClient(AbstractClient):
+    """Wraps a client, revalidating cached pages with conditional requests.
+
+    When the server answers 304 Not Modified the cached response is returned
+    with not_modified set, so crawlers can skip parsing it again. Lookups,
+    compression and writes run on a single worker thread, so the cache never
+    blocks the event loop.
+    """
+
+    __slots__ = ["_client", "_cache", "_executor", "stats"]
+
+    def __init__(self, client: AbstractClient, cache: HttpCache):
+        self._client = client
+        self._cache = cache
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="scrapio-cache")
+        self.stats: Dict[str, int] = {
+            "requests": 0,
+            "not_modified": 0,
+            "stored": 0,
+            "bytes_saved": 0,
+        }
+
+    async def _run(self, function, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, function, *args)
+
+    async def get_request(
+        self,
+        url: str,
+        proxy_manager: Optional[AbstractProxyManager],
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        entry = await self._run(self._cache.get, url)
+        if entry is not None:
+            headers = dict(headers or {}, **entry.validators())
+        response = await self._client.get_request(url, proxy_manager, headers=headers)
+        self.stats["requests"] += 1
+        if response is None:
+            return None
+        if response.status == 304 and entry is not None:
+            await self._run(self._cache.touch, url)
+            self.stats["not_modified"] += 1
+            self.stats["bytes_saved"] += len(entry.body)
+            return entry.to_response()
+        if (
+            response.status == 200
+            and response.content is not None
+            and not response.partial
+        ):
+            if await self._run(self._cache.store, url, response, response.content):
+                self.stats["stored"] += 1
+        return response
+
+    def iter_body(self, url: str, proxy_manager: Optional[AbstractProxyManager]):
+        # Sitemaps and feeds change too often to be worth caching.
+        return self._client.iter_body(url, proxy_manager)
+
+    async def close(self):
+        await self._client.close()
+        await self._run(self._cache.close)
+        self._executor.shutdown(wait=True)
@@ -1,12 +1,55 @@
 from abc import ABCMeta, abstractmethod
-from typing import Optional
+from typing import AsyncIterator, Dict, Optional, TYPE_CHECKING
 
 from scrapio.structures.proxies import AbstractProxyManager
 
+if TYPE_CHECKING:
+    from scrapio.parsing.links import StreamingLinkExtractor
+
 
 class AbstractClient(metaclass=ABCMeta):
     @abstractmethod
     async def get_request(
-        self, url: str, proxy_manager: Optional[AbstractProxyManager]
+        self,
+        url: str,
+        proxy_manager: Optional[AbstractProxyManager],
+        headers: Optional[Dict[str, str]] = None,
     ):
+        """Fetches url, sending headers in addition to the client's own."""
         ...
+
+    async def stream_request(
+        self,
+        url: str,
+        proxy_manager: Optional[AbstractProxyManager],
+        extractor: "StreamingLinkExtractor",
+        keep_body: bool = True,
+    ):
+        """Fetches url, handing the body to extractor as it is read.
+
+        Clients which cannot stream fall back to feeding the whole body once
+        it has been downloaded.
+        """
+        response = await self.get_request(url, proxy_manager)
+        if response is None:
+            return None
+        extractor.begin(str(response.url), response.encoding)
+        if response.content:
+            extractor.feed(response.content)
+        response.links = extractor.close()
+        if not keep_body:
+            response.body = None
+        return response
+
+    async def iter_body(
+        self, url: str, proxy_manager: Optional[AbstractProxyManager]
+    ) -> AsyncIterator[bytes]:
+        """Yields the body of url in chunks as it is read, for documents such
+        as sitemaps which the crawl reads itself rather than parses.
+
+        Clients which cannot stream yield the whole body at once. Error
+        responses yield nothing.
+        """
+        response = await self.get_request(url, proxy_manager)
+        if response is not None and response.status < 400 and response.content:
+            yield response.content
@@ -1,6 +1,7 @@
 from dataclasses import dataclass
-from typing import Optional
-from aiohttp import ClientTimeout
+from typing import Optional, Tuple
+from aiohttp import ClientTimeout, TCPConnector
+from aiohttp.abc import AbstractResolver
 
 
 @dataclass
@@ -23,3 +24,70 @@ def get_default_timeout() -> TimeoutRules:
         10.0,
         10.0,
     )
+
+
+@dataclass
+class ConnectorRules:
+    limit: int = 100
+    limit_per_host: int = 0
+    use_dns_cache: bool = True
+    ttl_dns_cache: Optional[int] = 10
+    keepalive_timeout: Optional[float] = 15.0
+    force_close: bool = False
+    enable_cleanup_closed: bool = False
+
+    def _to_aiohttp(self, resolver: Optional[AbstractResolver] = None) -> TCPConnector:
+        return TCPConnector(
+            resolver=resolver,
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            use_dns_cache=self.use_dns_cache,
+            ttl_dns_cache=self.ttl_dns_cache,
+            keepalive_timeout=None if self.force_close else self.keepalive_timeout,
+            force_close=self.force_close,
+            enable_cleanup_closed=self.enable_cleanup_closed,
+        )
+
+
+def get_default_connector() -> ConnectorRules:
+    return ConnectorRules()
+
+
+@dataclass
+class BodyRules:
+    """Limits on the response bodies DefaultClient will download.
+
+    Bodies are cut off after max_size bytes and returned marked as partial.
+    Responses whose Content-Type does not start with one of allowed_types are
+    returned without a body as soon as their headers arrive; a response with
+    no Content-Type is always read. probe may be "head", to send a HEAD request
+    first and skip the GET for disallowed or oversized bodies, or "range", to
+    ask the server for only the first max_size bytes.
+    """
+
+    max_size: Optional[int] = 10 * 1024 * 1024
+    allowed_types: Optional[Tuple[str, ...]] = (
+        "text/",
+        "application/xhtml+xml",
+        "application/xml",
+        "application/rss+xml",
+        "application/atom+xml",
+    )
+    probe: Optional[str] = None
+    chunk_size: int = 64 * 1024
+
+    def allows_type(self, content_type: Optional[str]) -> bool:
+        if not self.allowed_types or not content_type:
+            return True
+        return content_type.lower().startswith(self.allowed_types)
+
+    def too_large(self, content_length: Optional[int]) -> bool:
+        return (
+            self.max_size is not None
+            and content_length is not None
+            and content_length > self.max_size
+        )
+
+
+def get_default_body_rules() -> BodyRules:
+    return BodyRules()
@@ -1,13 +1,29 @@
-from typing import Dict, Optional
+from typing import AsyncIterator, Dict, Optional, Tuple, TYPE_CHECKING
 import logging
+import time
+from urllib.parse import urlparse
 
-from aiohttp import ClientSession, ClientError
+from aiohttp import ClientResponse, ClientSession, ClientError
+from aiohttp.abc import AbstractResolver
 
 from scrapio.structures.proxies import AbstractProxyManager
 from scrapio.requests.client import AbstractClient
-from scrapio.requests.response import from_aiohttp_response
+from scrapio.requests.response import Response, from_streamed_response
 from scrapio.utils.helpers import get_proxy_from_manager
-from scrapio.requests.client_configuration import TimeoutRules, get_default_timeout
+from scrapio.requests.client_configuration import (
+    BodyRules,
+    ConnectorRules,
+    TimeoutRules,
+    get_default_body_rules,
+    get_default_connector,
+    get_default_timeout,
+)
+from scrapio.requests.pool_stats import PoolStats
+from scrapio.metrics.registry import MetricsRegistry
+from scrapio.metrics.tracing import RequestTracer
+
+if TYPE_CHECKING:
+    from scrapio.parsing.links import StreamingLinkExtractor
 
 
 class DefaultClient(AbstractClient):
@@ -15,24 +31,135 @@ class DefaultClient(AbstractClient):
         self,
         timeout_rules: Optional[TimeoutRules] = None,
         headers: Optional[Dict[str, str]] = None,
+        connector_rules: Optional[ConnectorRules] = None,
+        body_rules: Optional[BodyRules] = None,
+        metrics: Optional[MetricsRegistry] = None,
+        resolver: Optional[AbstractResolver] = None,
     ):
         timeout_rules = (
             timeout_rules._to_aiohttp()
             if timeout_rules
             else get_default_timeout()._to_aiohttp()
         )
+        connector_rules = connector_rules or get_default_connector()
+        self._pool_stats = PoolStats()
+        trace_configs = [self._pool_stats.trace_config()]
+        if metrics is not None:
+            trace_configs.append(RequestTracer(metrics).trace_config())
+        self._metrics = metrics
+        self._resolver = resolver
         self.session = ClientSession(
             headers=headers,
             timeout=timeout_rules,
+            connector=connector_rules._to_aiohttp(resolver),
+            trace_configs=trace_configs,
         )
+        self._pool_stats.connector = self.session.connector
+        self._body_rules = body_rules or get_default_body_rules()
+
+    def pool_stats(self) -> Dict[str, float]:
+        """Snapshot of connection pool usage, including time spent waiting for
+        a free connection once the pool's limits have been reached."""
+        return self._pool_stats.snapshot()
+
+    def dns_stats(self) -> Optional[Dict[str, float]]:
+        """Hit rates and resolution times of the resolver, if it keeps them."""
+        snapshot = getattr(self._resolver, "snapshot", None)
+        return snapshot() if snapshot is not None else None
+
+    def _accepts(self, resp: ClientResponse) -> bool:
+        content_type = resp.content_type if "Content-Type" in resp.headers else None
+        if self._body_rules.allows_type(content_type):
+            return True
+        logger = logging.getLogger("ScrapIO")
+        logger.info("Skipping {} body of URL: {}".format(content_type, resp.url))
+        return False
+
+    def _request_headers(
+        self, headers: Optional[Dict[str, str]]
+    ) -> Optional[Dict[str, str]]:
+        max_size = self._body_rules.max_size
+        if self._body_rules.probe != "range" or max_size is None:
+            return headers
+        headers = dict(headers) if headers else {}
+        headers["Range"] = "bytes=0-{}".format(max_size - 1)
+        return headers
+
+    async def _probe(
+        self, url: str, proxy: Optional[str], headers: Optional[Dict[str, str]]
+    ) -> Optional[Response]:
+        """Sends a HEAD request, returning a bodiless response if the GET
+        should be skipped."""
+        try:
+            async with self.session.head(
+                url, proxy=proxy, headers=headers, allow_redirects=True
+            ) as resp:
+                if resp.status >= 400:
+                    # Plenty of servers do not answer HEAD, leave it to the GET.
+                    return None
+                if not self._accepts(resp) or self._body_rules.too_large(
+                    resp.content_length
+                ):
+                    return from_streamed_response(resp, None, None, partial=True)
+        except ClientError:
+            return None
+        return None
+
+    async def _read_body(
+        self,
+        resp: ClientResponse,
+        extractor: Optional["StreamingLinkExtractor"] = None,
+        keep_body: bool = True,
+    ) -> Tuple[Optional[bytes], bool]:
+        started_at = time.perf_counter() if self._metrics is not None else None
+        max_size = self._body_rules.max_size
+        chunks = [] if keep_body else None
+        size = 0
+        truncated = False
+        async for chunk in resp.content.iter_any():
+            if max_size is not None and size + len(chunk) > max_size:
+                chunk = chunk[: max_size - size]
+                truncated = True
+            size += len(chunk)
+            if extractor is not None:
+                extractor.feed(chunk)
+            if chunks is not None:
+                chunks.append(chunk)
+            if truncated:
+                # Drops the connection rather than draining the rest of the body.
+                resp.close()
+                break
+        if resp.status == 206:
+            total = resp.headers.get("Content-Range", "").rpartition("/")[2]
+            truncated = not total.isdigit() or int(total) > size
+        body = b"".join(chunks) if chunks is not None else None
+        if started_at is not None:
+            self._metrics.observe_stage(
+                "body_read",
+                urlparse(str(resp.url)).netloc,
+                time.perf_counter() - started_at,
+            )
+        return body, truncated
 
     async def get_request(
-        self, url: str, proxy_manager: Optional[AbstractProxyManager]
+        self,
+        url: str,
+        proxy_manager: Optional[AbstractProxyManager],
+        headers: Optional[Dict[str, str]] = None,
     ):
         proxy = await get_proxy_from_manager(proxy_manager)
-        async with self.session.get(url, proxy=proxy) as resp:
+        if self._body_rules.probe == "head":
+            skipped = await self._probe(url, proxy, headers)
+            if skipped is not None:
+                return skipped
+        async with self.session.get(
+            url, proxy=proxy, headers=self._request_headers(headers)
+        ) as resp:
             try:
-                await resp.read()
+                if not self._accepts(resp):
+                    resp.close()
+                    return from_streamed_response(resp, None, None, partial=True)
+                body, partial = await self._read_body(resp)
             except ClientError:
                 logger = logging.getLogger("ScrapIO")
                 logger.warning("ClientError for URL: {}".format(url))
@@ -40,7 +167,55 @@ class DefaultClient(AbstractClient):
                 logger = logging.getLogger("ScrapIO")
                 logger.warning("Unexpected error for URL: {}".format(e))
             else:
-                return await from_aiohttp_response(resp)
+                return from_streamed_response(resp, body, None, partial=partial)
+
+    async def stream_request(
+        self,
+        url: str,
+        proxy_manager: Optional[AbstractProxyManager],
+        extractor: "StreamingLinkExtractor",
+        keep_body: bool = True,
+    ):
+        proxy = await get_proxy_from_manager(proxy_manager)
+        if self._body_rules.probe == "head":
+            skipped = await self._probe(url, proxy, None)
+            if skipped is not None:
+                return skipped
+        async with self.session.get(
+            url, proxy=proxy, headers=self._request_headers(None)
+        ) as resp:
+            if not self._accepts(resp):
+                resp.close()
+                return from_streamed_response(resp, None, None, partial=True)
+            extractor.begin(str(resp.url), resp.charset)
+            try:
+                body, partial = await self._read_body(resp, extractor, keep_body)
+            except ClientError:
+                logger = logging.getLogger("ScrapIO")
+                logger.warning("ClientError for URL: {}".format(url))
+            except Exception as e:
+                logger = logging.getLogger("ScrapIO")
+                logger.warning("Unexpected error for URL: {}".format(e))
+            else:
+                return from_streamed_response(
+                    resp, body, extractor.close(), partial=partial
+                )
+
+    async def iter_body(
+        self, url: str, proxy_manager: Optional[AbstractProxyManager]
+    ) -> AsyncIterator[bytes]:
+        """Streams the body of url without applying BodyRules, as sitemaps
+        may be large or served gzipped as application/octet-stream."""
+        proxy = await get_proxy_from_manager(proxy_manager)
+        async with self.session.get(url, proxy=proxy) as resp:
+            if resp.status >= 400:
+                logger = logging.getLogger("ScrapIO")
+                logger.warning("Status {} for URL: {}".format(resp.status, url))
+                return
+            async for chunk in resp.content.iter_chunked(self._body_rules.chunk_size):
+                yield chunk
 
     async def close(self):
         await self.session.close()
+        if self._resolver is not None:
+            await self._resolver.close()
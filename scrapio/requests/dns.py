@@ -0,0 +1,240 @@
+import asyncio
+import ipaddress
+import socket
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from aiohttp.abc import AbstractResolver
+from aiohttp.resolver import ThreadedResolver
+
+from scrapio.metrics.registry import MetricsRegistry
+
+__all__ = ["CachingResolver", "hostname"]
+
+Records = List[Dict[str, Any]]
+
+
+def hostname(netloc: str) -> str:
+    """The host of a netloc, without user info, port or IPv6 brackets."""
+    host = netloc.rpartition("@")[2]
+    if host.startswith("["):
+        return host[1 : host.find("]")]
+    return host.partition(":")[0]
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+class CachingResolver(AbstractResolver):
+    """DNS resolver for DefaultClient caching answers across the crawl.
+
+    Lookups are passed to resolver, by default aiohttp's ThreadedResolver,
+    at most max_concurrent at a time, and concurrent lookups of a host share
+    one. Answers are cached for ttl seconds, or for the smallest ttl of the
+    records when the resolver gives one, up to max_ttl. Failures are cached
+    for negative_ttl seconds. At most max_hosts hosts are kept, forgetting
+    the oldest first.
+
+    prefetch starts resolving a host in the background, so that by the time
+    one of its URLs is requested the answer is waiting. Crawlers prefetch
+    the hosts of links as they are found. Hit rates and resolution times are
+    given by snapshot, and recorded in metrics when a registry is given.
+    """
+
+    __slots__ = [
+        "ttl",
+        "max_ttl",
+        "negative_ttl",
+        "max_hosts",
+        "max_prefetch",
+        "_resolver",
+        "_semaphore",
+        "_max_concurrent",
+        "_cache",
+        "_pending",
+        "_prefetching",
+        "_clock",
+        "_metrics",
+        "lookups",
+        "hits",
+        "negative_hits",
+        "prefetches",
+        "failures",
+        "resolutions",
+        "resolve_time",
+    ]
+
+    def __init__(
+        self,
+        resolver: Optional[AbstractResolver] = None,
+        ttl: float = 300.0,
+        max_ttl: float = 3600.0,
+        negative_ttl: float = 30.0,
+        max_concurrent: int = 32,
+        max_hosts: int = 100000,
+        max_prefetch: int = 1000,
+        metrics: Optional[MetricsRegistry] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.max_hosts = max_hosts
+        self.max_prefetch = max_prefetch
+        # Created on first use, as ThreadedResolver binds to the running loop.
+        self._resolver = resolver
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._max_concurrent = max_concurrent
+        # (host, family) -> (expires at, records, or the error raised)
+        self._cache: Dict[Tuple[str, int], Tuple[float, Any]] = {}
+        self._pending: Dict[Tuple[str, int], asyncio.Future] = {}
+        self._prefetching: Set[asyncio.Future] = set()
+        self._clock = clock
+        self._metrics = metrics
+        self.lookups = 0
+        self.hits = 0
+        self.negative_hits = 0
+        self.prefetches = 0
+        self.failures = 0
+        self.resolutions = 0
+        self.resolve_time = 0.0
+
+    def _count(self, result: str) -> None:
+        if self._metrics is not None:
+            self._metrics.counter(
+                "scrapio_dns_lookups_total",
+                "DNS lookups by whether they were answered from the cache.",
+                ("result",),
+            ).inc((result,))
+
+    def _store(self, key: Tuple[str, int], ttl: float, answer) -> None:
+        if key not in self._cache and len(self._cache) >= self.max_hosts:
+            # Dicts keep insertion order, so this forgets the oldest host.
+            del self._cache[next(iter(self._cache))]
+        self._cache[key] = (self._clock() + ttl, answer)
+
+    def _cached(self, key: Tuple[str, int]):
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self._clock():
+            del self._cache[key]
+            return None
+        return entry[1]
+
+    async def _lookup(self, host: str, port: int, family: int) -> Records:
+        if self._resolver is None:
+            self._resolver = ThreadedResolver()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrent)
+        key = (host, family)
+        self.resolutions += 1
+        started_at = time.perf_counter()
+        try:
+            async with self._semaphore:
+                records = await self._resolver.resolve(host, port, family)
+        except OSError as e:
+            self.failures += 1
+            self._store(key, self.negative_ttl, e)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started_at
+            self.resolve_time += elapsed
+            if self._metrics is not None:
+                self._metrics.histogram(
+                    "scrapio_dns_resolve_seconds",
+                    "Time taken by DNS lookups which missed the cache.",
+                ).observe(elapsed)
+        ttls = [record["ttl"] for record in records if record.get("ttl") is not None]
+        ttl = min(min(ttls), self.max_ttl) if ttls else self.ttl
+        self._store(key, ttl, records)
+        return records
+
+    def _start(self, host: str, port: int, family: int) -> asyncio.Future:
+        key = (host, family)
+        pending = self._pending[key] = asyncio.ensure_future(
+            self._lookup(host, port, family)
+        )
+        pending.add_done_callback(lambda future: self._finished(key, future))
+        return pending
+
+    def _finished(self, key: Tuple[str, int], future: asyncio.Future) -> None:
+        self._pending.pop(key, None)
+        self._prefetching.discard(future)
+        if not future.cancelled():
+            # Failed prefetches are only cached, never awaited.
+            future.exception()
+
+    async def resolve(
+        self, host: str, port: int = 0, family: int = socket.AF_INET
+    ) -> Records:
+        self.lookups += 1
+        key = (host, family)
+        answer = self._cached(key)
+        if answer is None:
+            pending = self._pending.get(key)
+            if pending is None:
+                self._count("miss")
+                pending = self._start(host, port, family)
+            else:
+                self._count("hit")
+                self.hits += 1
+            # Shielded so that a cancelled request leaves the lookup running
+            # for the others waiting on it.
+            answer = await asyncio.shield(pending)
+        elif isinstance(answer, OSError):
+            self._count("negative")
+            self.negative_hits += 1
+            raise OSError(*answer.args)
+        else:
+            self._count("hit")
+            self.hits += 1
+        # Records carry the port they were looked up for.
+        return [
+            record if record.get("port") == port else dict(record, port=port)
+            for record in answer
+        ]
+
+    def prefetch(self, host: str, family: int = socket.AF_UNSPEC) -> None:
+        """Starts resolving host in the background unless it is cached, being
+        resolved already or an IP address. family should be the connector's,
+        which is AF_UNSPEC unless ConnectorRules says otherwise."""
+        key = (host, family)
+        if (
+            key in self._pending
+            or len(self._prefetching) >= self.max_prefetch
+            or not host
+            or self._cached(key) is not None
+            or _is_ip(host)
+        ):
+            return
+        self.prefetches += 1
+        self._prefetching.add(self._start(host, 0, family))
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "hit_rate": (self.hits + self.negative_hits) / self.lookups
+            if self.lookups
+            else 0.0,
+            "prefetches": self.prefetches,
+            "failures": self.failures,
+            "cached_hosts": len(self._cache),
+            "resolutions": self.resolutions,
+            "mean_resolve_time": self.resolve_time / self.resolutions
+            if self.resolutions
+            else 0.0,
+        }
+
+    async def close(self) -> None:
+        for task in list(self._prefetching):
+            task.cancel()
+        if self._resolver is not None:
+            await self._resolver.close()
@@ -0,0 +1,81 @@
+import time
+from typing import Dict, Optional
+
+from aiohttp import BaseConnector, TraceConfig
+
+
+class PoolStats:
+    """Connection pool usage of a ClientSession, gathered through trace hooks."""
+
+    __slots__ = [
+        "connector",
+        "queued",
+        "waits",
+        "wait_time",
+        "max_wait_time",
+        "created",
+        "connect_time",
+        "reused",
+    ]
+
+    def __init__(self):
+        self.connector: Optional[BaseConnector] = None
+        self.queued = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.created = 0
+        self.connect_time = 0.0
+        self.reused = 0
+
+    def trace_config(self) -> TraceConfig:
+        trace_config = TraceConfig()
+        trace_config.on_connection_queued_start.append(self._on_queued_start)
+        trace_config.on_connection_queued_end.append(self._on_queued_end)
+        trace_config.on_connection_create_start.append(self._on_create_start)
+        trace_config.on_connection_create_end.append(self._on_create_end)
+        trace_config.on_connection_reuseconn.append(self._on_reuse)
+        return trace_config
+
+    async def _on_queued_start(self, session, context, params) -> None:
+        self.queued += 1
+        context.queued_at = time.perf_counter()
+
+    async def _on_queued_end(self, session, context, params) -> None:
+        waited = time.perf_counter() - context.queued_at
+        self.queued -= 1
+        self.waits += 1
+        self.wait_time += waited
+        self.max_wait_time = max(self.max_wait_time, waited)
+
+    async def _on_create_start(self, session, context, params) -> None:
+        context.connect_started_at = time.perf_counter()
+
+    async def _on_create_end(self, session, context, params) -> None:
+        self.created += 1
+        self.connect_time += time.perf_counter() - context.connect_started_at
+
+    async def _on_reuse(self, session, context, params) -> None:
+        self.reused += 1
+
+    def snapshot(self) -> Dict[str, float]:
+        connector = self.connector
+        acquired = len(getattr(connector, "_acquired", ())) if connector else 0
+        idle = (
+            sum(len(conns) for conns in getattr(connector, "_conns", {}).values())
+            if connector
+            else 0
+        )
+        return {
+            "limit": connector.limit if connector else 0,
+            "limit_per_host": connector.limit_per_host if connector else 0,
+            "acquired": acquired,
+            "idle": idle,
+            "queued": self.queued,
+            "waits": self.waits,
+            "wait_time": self.wait_time,
+            "max_wait_time": self.max_wait_time,
+            "created": self.created,
+            "connect_time": self.connect_time,
+            "reused": self.reused,
+        }
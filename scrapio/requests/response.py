@@ -1,29 +1,151 @@
-from typing import Dict, Optional, Any
+import codecs
+import re
+from typing import Dict, List, Optional, Any, Union
 
 from aiohttp import ClientResponse
 
+_CHARSET_HEADER = re.compile(r"charset=[\"']?([\w.:-]+)", re.I)
+_CHARSET_META = re.compile(rb"<meta[^>]+charset=[\"']?([\w.:-]+)", re.I)
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def _known_encoding(name: Optional[str]) -> Optional[str]:
+    if not name:
+        return None
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+
+def detect_encoding(headers: Optional[Dict], content: Optional[bytes]) -> str:
+    """Picks the charset of a page from a byte order mark, the Content-Type
+    header or a meta tag near the start of the page, defaulting to utf-8."""
+    if content:
+        for bom, encoding in _BOMS:
+            if content.startswith(bom):
+                return encoding
+    if headers is not None:
+        match = _CHARSET_HEADER.search(headers.get("Content-Type", ""))
+        encoding = _known_encoding(match.group(1)) if match else None
+        if encoding:
+            return encoding
+    if content:
+        match = _CHARSET_META.search(content[:4096])
+        encoding = _known_encoding(match.group(1).decode("ascii")) if match else None
+        if encoding:
+            return encoding
+    return "utf-8"
+
 
 class Response:
+    """A downloaded page.
 
-    __slots__ = ["url", "status", "headers", "body", "raw_response"]
+    The body is held once, as the bytes read from the connection, and is only
+    decoded the first time text (or body) is accessed, using the charset given
+    by the page. Assigning a str to body is still supported and is encoded
+    back to bytes only if content is asked for.
+    """
+
+    __slots__ = [
+        "url",
+        "status",
+        "headers",
+        "raw_response",
+        "links",
+        "not_modified",
+        "partial",
+        "duplicate_of",
+        "_content",
+        "_text",
+        "_encoding",
+    ]
 
     def __init__(self):
         self.url: Optional[str] = None
         self.status: Optional[int] = None
         self.headers: Optional[Dict] = None
-        self.body: Optional[str] = None
+        # No longer populated, the ClientResponse is released once read.
         self.raw_response: Optional[Any] = None
+        self.links: Optional[List[str]] = None
+        self.not_modified: bool = False
+        # Set when the body was cut short or skipped by the client's BodyRules.
+        self.partial: bool = False
+        # URL of the page this one nearly duplicates, set by DuplicateDetector.
+        self.duplicate_of: Optional[str] = None
+        self._content: Optional[bytes] = None
+        self._text: Optional[str] = None
+        self._encoding: Optional[str] = None
 
     def __repr__(self):
         return f"<Response: {self.url} {self.status}>"
 
+    @property
+    def encoding(self) -> str:
+        if self._encoding is None:
+            self._encoding = detect_encoding(self.headers, self._content)
+        return self._encoding
+
+    @encoding.setter
+    def encoding(self, value: Optional[str]) -> None:
+        self._encoding = value
+        if self._content is not None:
+            self._text = None
+
+    @property
+    def content(self) -> Optional[bytes]:
+        if self._content is None and self._text is not None:
+            self._content = self._text.encode(self.encoding, errors="ignore")
+        return self._content
+
+    @content.setter
+    def content(self, value: Optional[bytes]) -> None:
+        self._content = value
+        self._text = None
+
+    @property
+    def text(self) -> Optional[str]:
+        if self._text is None and self._content is not None:
+            self._text = str(self._content, self.encoding, errors="ignore")
+        return self._text
+
+    @property
+    def body(self) -> Optional[str]:
+        return self.text
+
+    @body.setter
+    def body(self, value: Union[str, bytes, None]) -> None:
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            self.content = bytes(value)
+        else:
+            self._content = None
+            self._text = value
+
 
 async def from_aiohttp_response(client_response: ClientResponse) -> Response:
     resp = Response()
     resp.url = client_response.url
     resp.status = client_response.status
     resp.headers = client_response.headers
-    resp_bytes = await client_response.read()
-    resp.body = resp_bytes.decode("utf-8", errors="ignore")
-    resp.raw_response = client_response
+    resp.content = await client_response.read()
+    return resp
+
+
+def from_streamed_response(
+    client_response: ClientResponse,
+    body: Optional[bytes],
+    links: Optional[List[str]],
+    partial: bool = False,
+) -> Response:
+    resp = Response()
+    resp.url = client_response.url
+    resp.status = client_response.status
+    resp.headers = client_response.headers
+    resp.content = body
+    resp.links = links
+    resp.partial = partial
     return resp
@@ -1,5 +1,16 @@
 from abc import ABC
-from typing import Dict
+import asyncio
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import random
+import time
+from typing import Callable, Collection, Dict, List, Optional, Tuple, Type
+from urllib.parse import urlparse
+
+from aiohttp import ClientError
+
+from scrapio.requests.response import Response
 
 
 class AbstractRetry(ABC):
@@ -9,6 +20,24 @@ class AbstractRetry(ABC):
     async def on_success(self, url: str) -> None:
         ...
 
+    def is_retryable(self, response: Response) -> bool:
+        """Whether a response which did arrive should be retried, by default
+        only failed requests are."""
+        return False
+
+    async def retry_delay(
+        self,
+        url: str,
+        response: Optional[Response] = None,
+        exception: Optional[BaseException] = None,
+    ) -> Optional[float]:
+        """Seconds to wait before retrying url, or None to give up on it."""
+        return 0.0 if await self.should_retry(url) else None
+
+    def blocked_for(self, host: str) -> float:
+        """Seconds until requests to host may be made again."""
+        return 0.0
+
 
 class NoOpRetryStrategy(AbstractRetry):
     async def should_retry(self, url: str) -> bool:
@@ -19,7 +48,6 @@ class NoOpRetryStrategy(AbstractRetry):
 
 
 class SimpleAttempts(AbstractRetry):
-
     __slots__ = ["retry_counter", "max_retries"]
 
     def __init__(self, max_retries: int):
@@ -27,7 +55,7 @@ class SimpleAttempts(AbstractRetry):
         self.max_retries = max_retries
 
     async def should_retry(self, url: str) -> bool:
-        if url not in self.max_retries:
+        if url not in self.retry_counter:
             self.retry_counter[url] = 1
             return 1 < self.max_retries
         self.retry_counter[url] += 1
@@ -36,3 +64,166 @@ class SimpleAttempts(AbstractRetry):
     async def on_success(self, url: str) -> None:
         if url in self.retry_counter:
             del self.retry_counter[url]
+
+
+RETRY_STATUSES = frozenset([408, 425, 429, 500, 502, 503, 504])
+RETRY_EXCEPTIONS: Tuple[Type[BaseException], ...] = (
+    ClientError,
+    asyncio.TimeoutError,
+    ConnectionError,
+)
+
+
+def parse_retry_after(
+    value: Optional[str], now: Optional[float] = None
+) -> Optional[float]:
+    """Seconds to wait given a Retry-After header, which is either a number
+    of seconds or an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    now = now if now is not None else datetime.now(timezone.utc).timestamp()
+    return max(0.0, when.timestamp() - now)
+
+
+class RetryPolicy(AbstractRetry):
+    """Retries failed requests after an exponential backoff with full jitter.
+
+    Requests are retried when they raise one of retry_exceptions or answer
+    with one of retry_statuses, up to max_retries times per URL. A
+    Retry-After header is honoured, up to max_retry_after seconds. After
+    breaker_threshold consecutive failures a host's circuit breaker opens,
+    holding back its URLs for breaker_cooldown seconds before a single
+    request is let through to test it. Attempt counts and breakers are kept
+    for at most max_tracked URLs and hosts, forgetting the oldest first.
+    """
+
+    __slots__ = [
+        "max_retries",
+        "backoff",
+        "max_backoff",
+        "max_retry_after",
+        "jitter",
+        "retry_statuses",
+        "retry_exceptions",
+        "breaker_threshold",
+        "breaker_cooldown",
+        "max_tracked",
+        "_attempts",
+        "_hosts",
+        "_clock",
+        "_random",
+        "stats",
+    ]
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 60.0,
+        max_retry_after: float = 300.0,
+        jitter: bool = True,
+        retry_statuses: Collection[int] = RETRY_STATUSES,
+        retry_exceptions: Tuple[Type[BaseException], ...] = RETRY_EXCEPTIONS,
+        breaker_threshold: Optional[int] = 5,
+        breaker_cooldown: float = 30.0,
+        max_tracked: int = 100000,
+        clock: Callable[[], float] = time.monotonic,
+        random_source: Callable[[], float] = random.random,
+    ):
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_retry_after = max_retry_after
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+        self.retry_exceptions = retry_exceptions
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.max_tracked = max_tracked
+        # Failed attempts per URL, and per host the consecutive failures and
+        # the time its breaker stays open until.
+        self._attempts: "OrderedDict[str, int]" = OrderedDict()
+        self._hosts: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._clock = clock
+        self._random = random_source
+        self.stats: Dict[str, int] = {"retried": 0, "gave_up": 0, "breaker_opened": 0}
+
+    @staticmethod
+    def _bounded_get(entries: OrderedDict, key: str, default, limit: int):
+        value = entries.get(key)
+        if value is None:
+            value = entries[key] = default
+            if len(entries) > limit:
+                entries.popitem(last=False)
+        else:
+            entries.move_to_end(key)
+        return value
+
+    def is_retryable(self, response: Response) -> bool:
+        return response.status in self.retry_statuses
+
+    def _delay(self, attempt: int, response: Optional[Response]) -> float:
+        delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1))
+        if self.jitter:
+            delay *= self._random()
+        if response is not None and response.headers:
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, self.max_retry_after))
+        return delay
+
+    def _host_failed(self, host: str) -> None:
+        state = self._bounded_get(self._hosts, host, [0, 0.0], self.max_tracked)
+        state[0] += 1
+        if self.breaker_threshold and state[0] >= self.breaker_threshold:
+            if state[1] <= self._clock():
+                self.stats["breaker_opened"] += 1
+            state[1] = self._clock() + self.breaker_cooldown
+
+    async def retry_delay(
+        self,
+        url: str,
+        response: Optional[Response] = None,
+        exception: Optional[BaseException] = None,
+    ) -> Optional[float]:
+        if exception is not None and not isinstance(exception, self.retry_exceptions):
+            return None
+        host = urlparse(url).netloc
+        self._host_failed(host)
+        attempt = self._bounded_get(self._attempts, url, 0, self.max_tracked) + 1
+        if attempt > self.max_retries:
+            del self._attempts[url]
+            self.stats["gave_up"] += 1
+            return None
+        self._attempts[url] = attempt
+        self.stats["retried"] += 1
+        return max(self._delay(attempt, response), self.blocked_for(host, probe=False))
+
+    async def should_retry(self, url: str) -> bool:
+        return await self.retry_delay(url) is not None
+
+    async def on_success(self, url: str) -> None:
+        self._attempts.pop(url, None)
+        self._hosts.pop(urlparse(url).netloc, None)
+
+    def blocked_for(self, host: str, probe: bool = True) -> float:
+        state = self._hosts.get(host)
+        if state is None or not state[1]:
+            return 0.0
+        remaining = state[1] - self._clock()
+        if remaining > 0:
+            return remaining
+        if probe:
+            # Half open, lets this request through and holds back the rest
+            # until it either succeeds or fails again.
+            state[1] = self._clock() + self.breaker_cooldown
+        return 0.0
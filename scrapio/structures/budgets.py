@@ -0,0 +1,113 @@
+from collections import Counter
+import re
+from typing import Any, Dict, List, Optional, Pattern, Tuple
+from urllib.parse import urlparse, urlsplit
+
+__all__ = ["CrawlBudget", "TrapFilter"]
+
+
+def _host(host_or_url: str) -> str:
+    return urlparse(host_or_url).netloc or host_or_url
+
+
+class CrawlBudget:
+    """Caps the number of pages queued per host and per path pattern.
+
+    host_budget applies to every host not listed in host_budgets. Each key
+    of path_budgets is a regular expression searched for in the URL's path
+    and query, and a URL matching several patterns needs room in each.
+    """
+
+    __slots__ = [
+        "host_budget",
+        "_host_budgets",
+        "_path_budgets",
+        "_host_counts",
+        "_path_counts",
+    ]
+
+    def __init__(
+        self,
+        host_budget: Optional[int] = None,
+        host_budgets: Optional[Dict[str, int]] = None,
+        path_budgets: Optional[Dict[str, int]] = None,
+    ):
+        self.host_budget = host_budget
+        self._host_budgets: Dict[str, int] = {
+            _host(host): budget for host, budget in (host_budgets or {}).items()
+        }
+        self._path_budgets: List[Tuple[Pattern, int]] = [
+            (re.compile(pattern), budget)
+            for pattern, budget in (path_budgets or {}).items()
+        ]
+        self._host_counts: Dict[str, int] = {}
+        self._path_counts: List[int] = [0] * len(self._path_budgets)
+
+    def allow(self, url: str) -> bool:
+        """Whether url fits the budget, counting it against the budget if so."""
+        parts = urlsplit(url)
+        host = parts.netloc
+        budget = self._host_budgets.get(host, self.host_budget)
+        count = self._host_counts.get(host, 0)
+        if budget is not None and count >= budget:
+            return False
+        matched = []
+        if self._path_budgets:
+            path = parts.path + ("?" + parts.query if parts.query else "")
+            for index, (pattern, path_budget) in enumerate(self._path_budgets):
+                if pattern.search(path):
+                    if self._path_counts[index] >= path_budget:
+                        return False
+                    matched.append(index)
+        self._host_counts[host] = count + 1
+        for index in matched:
+            self._path_counts[index] += 1
+        return True
+
+    def state(self) -> Dict[str, Any]:
+        return {"hosts": self._host_counts, "paths": self._path_counts}
+
+    def restore(self, state: Dict[str, Any]) -> None:
+        self._host_counts = state["hosts"]
+        if len(state["paths"]) == len(self._path_budgets):
+            self._path_counts = state["paths"]
+
+
+class TrapFilter:
+    """Cheap checks for URLs typical of spider traps.
+
+    A URL is rejected when it is longer than max_length, its path has more
+    than max_segments segments or repeats a segment more than max_repeats
+    times, as relative links resolved against the wrong base tend to, or
+    it has more than max_query_params query parameters, as endless
+    combinations of facets and filters do.
+    """
+
+    __slots__ = ["max_length", "max_segments", "max_repeats", "max_query_params"]
+
+    def __init__(
+        self,
+        max_length: int = 2048,
+        max_segments: int = 25,
+        max_repeats: int = 2,
+        max_query_params: int = 8,
+    ):
+        self.max_length = max_length
+        self.max_segments = max_segments
+        self.max_repeats = max_repeats
+        self.max_query_params = max_query_params
+
+    def is_trap(self, url: str) -> bool:
+        if len(url) > self.max_length:
+            return True
+        parts = urlsplit(url)
+        if parts.query and parts.query.count("&") >= self.max_query_params:
+            return True
+        segments = [segment for segment in parts.path.split("/") if segment]
+        if len(segments) > self.max_segments:
+            return True
+        if len(segments) > self.max_repeats:
+            _, repeats = Counter(segments).most_common(1)[0]
+            if repeats > self.max_repeats:
+                return True
+        return False
@@ -0,0 +1,223 @@
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+import time
+from urllib.parse import urlparse
+
+__all__ = ["AIMDLimit", "ConcurrencyController"]
+
+
+class AIMDLimit:
+    """Additive increase, multiplicative decrease limit on requests in flight.
+
+    Each success grows the limit by 1 / limit, so it rises by roughly one per
+    round trip while there is work waiting. Failures, and latency rising past
+    latency_tolerance times the best latency seen, cut it by backoff, at most
+    once per round trip so a burst of timeouts only counts once.
+    """
+
+    __slots__ = [
+        "min_limit",
+        "max_limit",
+        "_limit",
+        "_backoff",
+        "_tolerance",
+        "_smoothing",
+        "_latency",
+        "_baseline",
+        "_last_decrease",
+        "clock",
+    ]
+
+    def __init__(
+        self,
+        initial: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 256,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+        smoothing: float = 0.2,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self._limit = float(min(max(initial, min_limit), max_limit))
+        self._backoff = backoff
+        self._tolerance = latency_tolerance
+        self._smoothing = smoothing
+        self._latency: Optional[float] = None
+        self._baseline: Optional[float] = None
+        self._last_decrease = float("-inf")
+        self.clock = clock
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def latency(self) -> Optional[float]:
+        return self._latency
+
+    def set_max(self, max_limit: int) -> None:
+        self.max_limit = max_limit
+        self._limit = min(self._limit, max_limit)
+
+    def on_success(self, latency: float, saturated: bool = True) -> None:
+        if self._latency is None:
+            self._latency = self._baseline = latency
+        else:
+            self._latency += (latency - self._latency) * self._smoothing
+            # Drifts upwards slowly so a permanently slower site is relearned.
+            self._baseline = min(
+                self._latency, self._baseline + (self._latency - self._baseline) * 0.01
+            )
+        if self._latency > self._baseline * self._tolerance:
+            self._decrease()
+        elif saturated:
+            self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+
+    def on_failure(self) -> None:
+        self._decrease()
+
+    def _decrease(self) -> None:
+        now = self.clock()
+        if now - self._last_decrease < (self._latency or 0.0):
+            return
+        self._last_decrease = now
+        self._limit = max(self.min_limit, self._limit * self._backoff)
+
+
+class _Gate:
+    """FIFO semaphore whose size follows an AIMDLimit."""
+
+    __slots__ = ["limit", "in_flight", "_waiters"]
+
+    def __init__(self, limit: AIMDLimit):
+        self.limit = limit
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> None:
+        if self.in_flight < self.limit.limit and not self._waiters:
+            self.in_flight += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over as the task was cancelled.
+                self.release()
+            raise
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self.wake()
+
+    def wake(self) -> None:
+        while self._waiters and self.in_flight < self.limit.limit:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    @property
+    def waiting(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+
+class ConcurrencyController:
+    """Adapts how many requests a crawler has in flight as the crawl runs.
+
+    Each fetch holds a slot from the global limit, and with per_host set each
+    host also has its own, smaller limit. The host's slot is taken first, so
+    requests waiting on a slow host do not hold global slots other hosts
+    could use. Both limits follow
+    the latency, errors and 429/503 responses seen, and only grow while the
+    crawl queue has URLs waiting.
+    """
+
+    congestion_statuses = frozenset((429, 503))
+
+    __slots__ = ["_global", "_hosts", "_host_options", "_per_host", "backlog"]
+
+    def __init__(
+        self,
+        initial: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 256,
+        per_host: bool = False,
+        host_initial: int = 2,
+        host_max: int = 16,
+        backoff: float = 0.5,
+        latency_tolerance: float = 2.0,
+    ):
+        self._global = _Gate(
+            AIMDLimit(initial, min_limit, max_limit, backoff, latency_tolerance)
+        )
+        self._per_host = per_host
+        self._host_options = (host_initial, 1, host_max, backoff, latency_tolerance)
+        self._hosts: Dict[str, _Gate] = {}
+        self.backlog: Callable[[], int] = lambda: 1
+
+    @property
+    def limit(self) -> int:
+        return self._global.limit.limit
+
+    def set_max(self, max_limit: int) -> None:
+        self._global.limit.set_max(max_limit)
+
+    def _host_gate(self, host: str) -> _Gate:
+        gate = self._hosts.get(host)
+        if gate is None:
+            gate = self._hosts[host] = _Gate(AIMDLimit(*self._host_options))
+        return gate
+
+    def _record(self, gate: _Gate, latency: float, ok: bool) -> None:
+        if ok:
+            saturated = gate.in_flight >= gate.limit.limit and self.backlog() > 0
+            gate.limit.on_success(latency, saturated)
+        else:
+            gate.limit.on_failure()
+        gate.wake()
+
+    async def run(self, url: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Awaits fetch(), feeding its latency and outcome back to the limits."""
+        gates = []
+        try:
+            if self._per_host:
+                host_gate = self._host_gate(urlparse(url).netloc)
+                await host_gate.acquire()
+                gates.append(host_gate)
+            await self._global.acquire()
+            gates.append(self._global)
+            start = time.monotonic()
+            ok = False
+            try:
+                response = await fetch()
+                ok = (
+                    response is not None
+                    and response.status not in self.congestion_statuses
+                )
+                return response
+            finally:
+                latency = time.monotonic() - start
+                for gate in gates:
+                    self._record(gate, latency, ok)
+        finally:
+            for gate in gates:
+                gate.release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Current limits, requests in flight and smoothed latency."""
+        return {
+            "limit": self._global.limit.limit,
+            "in_flight": self._global.in_flight,
+            "waiting": self._global.waiting,
+            "latency": self._global.limit.latency,
+            "host_limits": {
+                host: gate.limit.limit for host, gate in self._hosts.items()
+            },
+        }
@@ -1,7 +1,11 @@
+import re
 from abc import ABC, abstractmethod
-import logging
-from typing import List, Union, Dict
-from urllib.robotparser import RobotFileParser
+from typing import FrozenSet, List, Optional, Pattern, Union
+from urllib.parse import urlparse
+
+from scrapio.structures.proxies import AbstractProxyManager
+from scrapio.structures.robots import RobotsCache
+from scrapio.utils.urls import URLCanonicalizer, normalize_netloc
 
 
 class AbstractURLFilter(ABC):
@@ -10,14 +14,65 @@ class AbstractURLFilter(ABC):
         pass
 
 
-class URLFilter(AbstractURLFilter):
+def _trie_regex(node: Optional[dict]) -> str:
+    if node is None:
+        return ""
+    branches = [re.escape(char) + _trie_regex(child) for char, child in node.items()]
+    if len(branches) == 1:
+        return branches[0]
+    return "(?:{})".format("|".join(branches))
+
+
+def compile_substrings(substrings: Optional[List[str]]) -> Optional[Pattern]:
+    """Compiles substrings into a single regex matching any of them.
+
+    Alternatives sharing a prefix are merged into a trie, so a search tests
+    each position of the string once rather than once per substring.
+    """
+    if not substrings:
+        return None
+    trie: Optional[dict] = {}
+    for substring in substrings:
+        if not substring:
+            trie = None
+            break
+        node = trie
+        for char in substring[:-1]:
+            child = node.setdefault(char, {})
+            if child is None:
+                break
+            node = child
+        else:
+            # A shorter substring already matches wherever this one would.
+            node[substring[-1]] = None
+    return re.compile(_trie_regex(trie))
+
 
+def _hosts(net_locations: Union[List[str], str]) -> FrozenSet[str]:
+    if isinstance(net_locations, str):
+        net_locations = [net_locations]
+    hosts = set()
+    for location in net_locations:
+        if "://" in location:
+            parsed = urlparse(location)
+            hosts.add(parsed.netloc)
+            hosts.add(normalize_netloc(parsed.netloc, parsed.scheme))
+        else:
+            hosts.add(location)
+            hosts.add(normalize_netloc(location))
+    # Hosts as given and as canonicalized, so links match either way.
+    return frozenset(hosts)
+
+
+class URLFilter(AbstractURLFilter):
     __slots__ = (
         "_net_locations",
         "_additional_rules",
+        "_rules_pattern",
         "_robots",
         "_robots_cache",
         "defragment",
+        "canonicalizer",
     )
 
     def __init__(
@@ -26,42 +81,46 @@ class URLFilter(AbstractURLFilter):
         additional_rules: Union[List[str], None],
         follow_robots: bool,
         defragment: bool = True,
+        robots_cache: Optional[RobotsCache] = None,
+        canonicalizer: Optional[URLCanonicalizer] = None,
     ):
-        self._net_locations = net_locations
+        self._net_locations = _hosts(net_locations)
         self._additional_rules = additional_rules
+        self._rules_pattern = compile_substrings(additional_rules)
         self._robots = follow_robots
-        self._robots_cache = self._gather_robots_files() if follow_robots else None
+        self._robots_cache = (robots_cache or RobotsCache()) if follow_robots else None
         self.defragment = defragment
+        # Canonicalizes the links found on pages before they are filtered.
+        self.canonicalizer = canonicalizer
 
-    def _gather_robots_files(self) -> Dict[str, RobotFileParser]:
-        robot_cache = dict()
-        if isinstance(self._net_locations, list):
-            net_locations = self._net_locations
-        else:
-            net_locations = [self._net_locations]
-        for host in net_locations:
-            try:
-                parser = RobotFileParser(url="http://{}/robots.txt".format(host))
-                parser.read()
-                robot_cache[host] = parser
-            except Exception:
-                logger = logging.getLogger("ScrapIO")
-                logger.warning(
-                    "Was unable to successfully download robots.txt, for: {}".format(
-                        host
-                    )
-                )
-        return robot_cache
+    @property
+    def robots_cache(self) -> Optional[RobotsCache]:
+        return self._robots_cache
+
+    async def allowed_by_robots(
+        self, url: str, client, proxy_manager: Optional[AbstractProxyManager] = None
+    ) -> bool:
+        """Checks url against its host's robots.txt, fetching it through client
+        the first time the host is seen."""
+        if not self._robots:
+            return True
+        parsed = urlparse(url)
+        robots_rules = await self._robots_cache.fetch(
+            parsed.netloc, parsed.scheme or "http", client, proxy_manager
+        )
+        return robots_rules.can_fetch("*", url)
+
+    def close(self) -> None:
+        if self._robots_cache is not None:
+            self._robots_cache.save()
 
     def can_crawl(self, host: str, url: str) -> bool:
-        if self._additional_rules:
-            value = any(i in url for i in self._additional_rules)
-            if value is True:
-                return False
+        if host not in self._net_locations:
+            return False
+        if self._rules_pattern is not None and self._rules_pattern.search(url):
+            return False
         if self._robots:
             robots_rules = self._robots_cache.get(host)
-            if robots_rules is None and host in self._net_locations:
-                return True
-            if robots_rules:
-                return robots_rules.can_fetch("*", url) and host in self._net_locations
-        return host in self._net_locations
+            if robots_rules is not None:
+                return robots_rules.can_fetch("*", url)
+        return True
@@ -0,0 +1,503 @@
+from abc import ABC, abstractmethod
+from collections import deque
+import heapq
+import pickle
+import sqlite3
+import time
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from scrapio.structures.scoring import AbstractScorer, DepthScorer
+from scrapio.utils.urls import url_host
+
+
+class AbstractFrontier(ABC):
+    """Storage for URLs waiting to be crawled, used by WorkQueue."""
+
+    # Frontiers which order URLs by their links ask for anchor text, and have
+    # WorkQueue track the depth of every URL and apply max_crawl_size to the
+    # URLs handed out rather than to those discovered.
+    wants_anchors = False
+    prioritised = False
+    # Frontiers which persist the seen URLs a checkpoint at a time, and the
+    # depth of each queued URL, rather than having WorkQueue pickle them.
+    incremental_checkpoints = False
+
+    @abstractmethod
+    def push(self, url: str) -> None:
+        ...
+
+    def push_link(
+        self,
+        url: str,
+        parent: Optional[str] = None,
+        anchor: Optional[str] = None,
+        depth: int = 0,
+    ) -> None:
+        """Pushes a URL found on the page parent, linked to with anchor."""
+        self.push(url)
+
+    def link_seen(
+        self,
+        url: str,
+        parent: Optional[str] = None,
+        anchor: Optional[str] = None,
+        depth: int = 0,
+    ) -> None:
+        """Called when another link is found to a URL pushed before."""
+        return
+
+    def will_retry(self, url: str) -> None:
+        """Called before done for a URL returned by pop which is to be pushed
+        again with push_retry once its retry delay has passed."""
+        return
+
+    def push_retry(self, url: str, depth: int = 0) -> None:
+        """Pushes a URL returned by pop before again, to be retried."""
+        self.push_link(url, depth=depth)
+
+    @abstractmethod
+    def pop(self) -> Optional[str]:
+        """Returns the next URL to crawl, or None when there is nothing to crawl."""
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    def done(self, url: str) -> None:
+        """Called once a URL returned by pop has been fully processed."""
+        return
+
+    def ready_in(self) -> Optional[float]:
+        """Seconds until pop can next return a URL without further pushes or
+        calls to done, or None when that will not happen on its own."""
+        return None
+
+    def checkpoint(self, state: Any, seen: Sequence[str] = ()) -> None:
+        """Persists the frontier along with state, a picklable object, and
+        with incremental_checkpoints the URLs seen since the last
+        checkpoint."""
+        return
+
+    def restore(self) -> Optional[Any]:
+        """Rewinds to the last checkpoint, returning the state saved with it."""
+        return None
+
+    def restored_seen(self) -> Iterable[str]:
+        """Every URL seen up to the last checkpoint, once restored."""
+        return ()
+
+    def restored_depths(self) -> Iterable[Tuple[str, int]]:
+        """URLs queued at the last checkpoint with their depths, once
+        restored."""
+        return ()
+
+    def close(self) -> None:
+        return
+
+
+class MemoryFrontier(AbstractFrontier):
+    __slots__ = ["_urls"]
+
+    def __init__(self):
+        self._urls: Deque[str] = deque()
+
+    def push(self, url: str) -> None:
+        self._urls.append(url)
+
+    def pop(self) -> Optional[str]:
+        if self._urls:
+            return self._urls.popleft()
+        return None
+
+    def __len__(self) -> int:
+        return len(self._urls)
+
+
+class HostFrontier(AbstractFrontier):
+    """Politeness scheduler keeping a queue of URLs per host.
+
+    Hosts with queued URLs sit in a heap keyed on the earliest time they may
+    next be fetched, at least delay seconds after their previous fetch
+    started, so pop hands out the next URL which can be fetched now in
+    O(log hosts). A host is taken out of the heap while max_per_host of its
+    URLs are in flight and put back as they are marked done.
+    """
+
+    __slots__ = [
+        "_delay",
+        "_max_per_host",
+        "_clock",
+        "_queues",
+        "_ready",
+        "_scheduled",
+        "_next_allowed",
+        "_active",
+        "_size",
+    ]
+
+    def __init__(
+        self,
+        delay: float = 0.0,
+        max_per_host: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._delay = delay
+        self._max_per_host = max_per_host
+        self._clock = clock
+        self._queues: Dict[str, Deque[str]] = {}
+        self._ready: List[Tuple[float, str]] = []
+        self._scheduled: Set[str] = set()
+        self._next_allowed: Dict[str, float] = {}
+        self._active: Dict[str, int] = {}
+        self._size = 0
+
+    def _schedule(self, host: str) -> None:
+        if host in self._scheduled or host not in self._queues:
+            return
+        if self._max_per_host and self._active.get(host, 0) >= self._max_per_host:
+            return
+        self._scheduled.add(host)
+        heapq.heappush(self._ready, (self._next_allowed.get(host, 0.0), host))
+
+    def push(self, url: str) -> None:
+        host = url_host(url)
+        queue = self._queues.get(host)
+        if queue is None:
+            queue = self._queues[host] = deque()
+        queue.append(url)
+        self._size += 1
+        self._schedule(host)
+
+    def pop(self) -> Optional[str]:
+        if not self._ready:
+            return None
+        now = self._clock()
+        if self._ready[0][0] > now:
+            return None
+        _, host = heapq.heappop(self._ready)
+        self._scheduled.discard(host)
+        queue = self._queues[host]
+        url = queue.popleft()
+        if not queue:
+            del self._queues[host]
+        self._size -= 1
+        self._active[host] = self._active.get(host, 0) + 1
+        self._next_allowed[host] = now + self._delay
+        self._schedule(host)
+        return url
+
+    def done(self, url: str) -> None:
+        host = url_host(url)
+        active = self._active.get(host, 0)
+        if active <= 1:
+            self._active.pop(host, None)
+        else:
+            self._active[host] = active - 1
+        self._schedule(host)
+
+    def ready_in(self) -> Optional[float]:
+        if not self._ready:
+            return None
+        return max(0.0, self._ready[0][0] - self._clock())
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class PriorityFrontier(AbstractFrontier):
+    """Hands out the highest scoring URL first, as decided by scorer.
+
+    URLs sit in a heap keyed on their score. When a URL is scored again,
+    because another link to it was found or the page linking to it was
+    crawled, a new entry is pushed and the old one is skipped once it
+    reaches the top. The links found on a page are kept until it has been
+    processed.
+    """
+
+    prioritised = True
+
+    __slots__ = [
+        "scorer",
+        "_heap",
+        "_order",
+        "_scores",
+        "_active",
+        "_links",
+        "_retrying",
+    ]
+
+    def __init__(self, scorer: Optional[AbstractScorer] = None):
+        self.scorer = scorer or DepthScorer()
+        self._heap: List[Tuple[float, int, str]] = []
+        self._order = 0
+        self._scores: Dict[str, float] = {}
+        self._active: Set[str] = set()
+        self._links: Dict[str, List[str]] = {}
+        self._retrying: Set[str] = set()
+
+    @property
+    def wants_anchors(self) -> bool:
+        return self.scorer.uses_anchor
+
+    def _set_score(self, url: str, score: float) -> None:
+        self._scores[url] = score
+        self._order += 1
+        heapq.heappush(self._heap, (-score, self._order, url))
+        if len(self._heap) > 2 * len(self._scores) + 1024:
+            # Drops entries left behind by rescoring.
+            self._heap = [
+                entry for entry in self._heap if self._scores.get(entry[2]) == -entry[0]
+            ]
+            heapq.heapify(self._heap)
+
+    def _add_link(self, url: str, parent: Optional[str]) -> None:
+        if parent in self._active:
+            self._links.setdefault(parent, []).append(url)
+
+    def push(self, url: str) -> None:
+        self.push_link(url)
+
+    def push_link(
+        self,
+        url: str,
+        parent: Optional[str] = None,
+        anchor: Optional[str] = None,
+        depth: int = 0,
+    ) -> None:
+        self._add_link(url, parent)
+        self._set_score(url, self.scorer.score(url, parent, depth, anchor))
+
+    def link_seen(
+        self,
+        url: str,
+        parent: Optional[str] = None,
+        anchor: Optional[str] = None,
+        depth: int = 0,
+    ) -> None:
+        self._add_link(url, parent)
+        current = self._scores.get(url)
+        if current is None:
+            return
+        score = self.scorer.score(url, parent, depth, anchor)
+        if score > current:
+            self._set_score(url, score)
+
+    def will_retry(self, url: str) -> None:
+        self._retrying.add(url)
+
+    def push_retry(self, url: str, depth: int = 0) -> None:
+        # Retries are not new links, so the scorer is asked for the score the
+        # URL has kept rather than scoring it like a seed.
+        self._retrying.discard(url)
+        self._set_score(url, self.scorer.retry_score(url, depth))
+
+    def pop(self) -> Optional[str]:
+        while self._heap:
+            score, _, url = heapq.heappop(self._heap)
+            if self._scores.get(url) == -score:
+                del self._scores[url]
+                self._active.add(url)
+                return url
+        return None
+
+    def done(self, url: str) -> None:
+        self._active.discard(url)
+        links = self._links.pop(url, [])
+        if url in self._scores or url in self._retrying:
+            # Queued again, or waiting, to be retried.
+            return
+        for link, score in self.scorer.crawled(url, links).items():
+            current = self._scores.get(link)
+            if current is not None and score != current:
+                self._set_score(link, score)
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+
+class SQLiteFrontier(AbstractFrontier):
+    """FIFO frontier spilling to an append-only SQLite table on local disk.
+
+    Pushed URLs are buffered and written in batches of batch_size, and pops
+    are served from an in-memory buffer refilled hot_size rows at a time, so
+    only those two buffers are held in memory however large the frontier
+    grows. Rows are only deleted at a checkpoint, once every URL up to them
+    has been processed, so restoring after a crash re-crawls the URLs which
+    were in flight rather than losing them.
+
+    Checkpoints are incremental: each appends the URLs seen since the one
+    before to a table of its own, and the depth of each URL is kept in its
+    row, so a checkpoint's cost grows with the URLs found since the last
+    rather than with the size of the crawl. Restoring reads every seen URL
+    back into WorkQueue's seen URL container.
+    """
+
+    incremental_checkpoints = True
+
+    __slots__ = [
+        "_conn",
+        "_hot_size",
+        "_batch_size",
+        "_hot",
+        "_pending",
+        "_unread",
+        "_read_id",
+        "_popped_id",
+        "_in_flight",
+        "_opened_at",
+        "_stale_seen",
+    ]
+
+    def __init__(self, path: str, hot_size: int = 1000, batch_size: int = 500):
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS frontier "
+            "(id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT NOT NULL, "
+            "depth INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS seen (url TEXT NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoint "
+            "(key TEXT PRIMARY KEY, value BLOB NOT NULL)"
+        )
+        self._conn.commit()
+        self._hot_size = hot_size
+        self._batch_size = batch_size
+        self._hot: Deque[Tuple[int, str]] = deque()
+        self._pending: List[Tuple[str, int]] = []
+        self._in_flight: Dict[str, int] = {}
+        # Rows left by an earlier run are skipped unless restore is called.
+        self._opened_at: int = self._conn.execute(
+            "SELECT COALESCE(MAX(id), 0) FROM frontier"
+        ).fetchone()[0]
+        self._read_id = self._opened_at
+        self._popped_id = self._opened_at
+        self._unread = 0
+        # URLs seen by an earlier run are forgotten unless restore is called.
+        self._stale_seen = True
+
+    def push(self, url: str) -> None:
+        self.push_link(url)
+
+    def push_link(
+        self,
+        url: str,
+        parent: Optional[str] = None,
+        anchor: Optional[str] = None,
+        depth: int = 0,
+    ) -> None:
+        self._pending.append((url, depth))
+        if len(self._pending) >= self._batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._pending:
+            self._conn.executemany(
+                "INSERT INTO frontier (url, depth) VALUES (?, ?)", self._pending
+            )
+            self._conn.commit()
+            self._unread += len(self._pending)
+            self._pending = []
+
+    def _read_ahead(self) -> None:
+        if not self._unread and self._pending:
+            self.flush()
+        if not self._unread:
+            return
+        rows = self._conn.execute(
+            "SELECT id, url FROM frontier WHERE id > ? ORDER BY id LIMIT ?",
+            (self._read_id, self._hot_size),
+        ).fetchall()
+        if rows:
+            self._hot.extend(rows)
+            self._read_id = rows[-1][0]
+        self._unread -= len(rows)
+
+    def pop(self) -> Optional[str]:
+        if not self._hot:
+            self._read_ahead()
+            if not self._hot:
+                return None
+        row_id, url = self._hot.popleft()
+        self._popped_id = row_id
+        self._in_flight[url] = row_id
+        return url
+
+    def done(self, url: str) -> None:
+        self._in_flight.pop(url, None)
+
+    def __len__(self) -> int:
+        return len(self._hot) + self._unread + len(self._pending)
+
+    def _safe_head(self) -> int:
+        if self._in_flight:
+            return min(self._in_flight.values()) - 1
+        return self._popped_id
+
+    def checkpoint(self, state: Any, seen: Sequence[str] = ()) -> None:
+        self.flush()
+        head = self._safe_head()
+        with self._conn:
+            self._conn.execute("DELETE FROM frontier WHERE id <= ?", (head,))
+            if self._stale_seen:
+                self._conn.execute("DELETE FROM seen")
+                self._stale_seen = False
+            self._conn.executemany(
+                "INSERT INTO seen (url) VALUES (?)", ((url,) for url in seen)
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO checkpoint (key, value) VALUES (?, ?)",
+                [("head", pickle.dumps(head)), ("state", pickle.dumps(state))],
+            )
+
+    def restore(self) -> Optional[Any]:
+        saved = dict(self._conn.execute("SELECT key, value FROM checkpoint"))
+        if "state" not in saved:
+            return None
+        head = pickle.loads(saved["head"])
+        with self._conn:
+            # Anything queued since this frontier was opened, such as seed
+            # URLs, is already accounted for by the checkpoint.
+            self._conn.execute("DELETE FROM frontier WHERE id > ?", (self._opened_at,))
+        self._stale_seen = False
+        self._hot.clear()
+        self._pending = []
+        self._in_flight.clear()
+        self._read_id = head
+        self._popped_id = head
+        self._unread = self._conn.execute(
+            "SELECT COUNT(*) FROM frontier WHERE id > ?", (head,)
+        ).fetchone()[0]
+        return pickle.loads(saved["state"])
+
+    def restored_seen(self) -> Iterator[str]:
+        for (url,) in self._conn.execute("SELECT url FROM seen"):
+            yield url
+
+    def restored_depths(self) -> Iterator[Tuple[str, int]]:
+        # Only called straight after restore, when _read_id is the head.
+        return iter(
+            self._conn.execute(
+                "SELECT url, depth FROM frontier WHERE id > ? AND depth > 0",
+                (self._read_id,),
+            ).fetchall()
+        )
+
+    def close(self) -> None:
+        self.flush()
+        self._conn.close()
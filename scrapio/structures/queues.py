@@ -1,7 +1,12 @@
 import asyncio
-from typing import Union, List
+from collections import deque
+import heapq
+import itertools
+from typing import Dict, Iterable, Union, List, Optional
 import enum
 
+from scrapio.structures.budgets import CrawlBudget, TrapFilter
+from scrapio.structures.frontier import AbstractFrontier, MemoryFrontier
 from scrapio.url_set.set_container import SetContainer
 from scrapio.url_set.abstract_set import AbstractUrlSet
 from scrapio.url_set.trie_container import TrieContainer
@@ -13,6 +18,15 @@ class JobType(enum.Enum):
 
 
 class WorkQueue:
+    """Queue of URLs to crawl, dropping those seen before.
+
+    URLs are also dropped before reaching the frontier when they are more
+    than max_depth links away from a seed, when budget has no room left
+    for their host or path, or when trap_filter takes them for a spider
+    trap. Counts of dropped URLs are kept in dropped. Depths are tracked
+    for queued and in flight URLs when max_depth is set or the frontier
+    is prioritised.
+    """
 
     __slots__ = [
         "_seen_urls",
@@ -20,7 +34,23 @@ class WorkQueue:
         "_seen_semaphore",
         "_max_crawl_size",
         "_page_count",
-        "_queue",
+        "_frontier",
+        "_getters",
+        "_putters",
+        "_unfinished",
+        "_finished",
+        "_timer",
+        "_retries",
+        "_retry_order",
+        "_retry_timer",
+        "_max_depth",
+        "_budget",
+        "_trap_filter",
+        "_track_depth",
+        "_depths",
+        "_active_depths",
+        "_new_seen",
+        "dropped",
     ]
 
     def __init__(
@@ -28,35 +58,409 @@ class WorkQueue:
         max_crawl_size: Union[int, None],
         seed_urls: Union[List[str], str],
         seen_url_handler: AbstractUrlSet = None,
+        frontier: Optional[AbstractFrontier] = None,
+        max_depth: Optional[int] = None,
+        budget: Optional[CrawlBudget] = None,
+        trap_filter: Optional[TrapFilter] = None,
     ):
         self._seen_urls: AbstractUrlSet = seen_url_handler or SetContainer()
         self._active_jobs = 0
         self._max_crawl_size = max_crawl_size
         self._page_count = 0
-        self._queue = asyncio.Queue()
+        self._frontier: AbstractFrontier = (
+            frontier if frontier is not None else MemoryFrontier()
+        )
+        self._getters = deque()
+        self._putters = []
+        self._unfinished = 0
+        self._finished = asyncio.Event()
+        self._finished.set()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._retries = []
+        self._retry_order = itertools.count()
+        self._retry_timer: Optional[asyncio.TimerHandle] = None
+        self._max_depth = max_depth
+        self._budget = budget
+        self._trap_filter = trap_filter
+        self._track_depth = max_depth is not None or self._frontier.prioritised
+        # Depths of queued URLs, and of URLs handed out but not yet done.
+        self._depths: Dict[str, int] = {}
+        self._active_depths: Dict[str, int] = {}
+        # URLs seen since the last checkpoint, for frontiers which persist
+        # them a checkpoint at a time.
+        self._new_seen: Optional[List[str]] = (
+            [] if self._frontier.incremental_checkpoints else None
+        )
+        self.dropped: Dict[str, int] = {
+            "depth": 0,
+            "trap": 0,
+            "max_crawl_size": 0,
+            "budget": 0,
+        }
         self.seed_queue(seed_urls)
 
     def seed_queue(self, seed_urls: Union[List[str], str]):
         if isinstance(seed_urls, str):
-            self._queue.put_nowait(seed_urls)
-        elif isinstance(seed_urls, (set, list)):
+            seed_urls = [seed_urls]
+        if isinstance(seed_urls, (set, list)):
             for item in seed_urls:
-                self._queue.put_nowait(item)
+                self._mark_seen(item)
+                self._push(item)
+
+    def _mark_seen(self, url: str) -> None:
+        self._seen_urls.put(url)
+        if self._new_seen is not None:
+            self._new_seen.append(url)
+
+    def _mark_seen_many(self, urls: Iterable[str]) -> List[str]:
+        new = self._seen_urls.add_many(urls)
+        if self._new_seen is not None:
+            self._new_seen.extend(new)
+        return new
+
+    def _push(
+        self,
+        url: str,
+        parent: Optional[str] = None,
+        anchor: Optional[str] = None,
+        depth: int = 0,
+    ) -> None:
+        if self._track_depth:
+            self._depths[url] = depth
+        self._frontier.push_link(url, parent, anchor, depth)
+        self._unfinished += 1
+        self._finished.clear()
+        self._wakeup_next()
+
+    def _wakeup_next(self) -> None:
+        while self._getters:
+            waiter = self._getters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                break
 
     async def get_job(self) -> str:
-        return await self._queue.get()
-
-    async def put_url(self, url):
-        if url not in self._seen_urls:
-            if self._max_crawl_size and self._page_count < self._max_crawl_size:
-                await self._queue.put(url)
-            elif self._max_crawl_size is None:
-                await self._queue.put(url)
+        while True:
+            url = self._frontier.pop()
+            if url is not None:
+                if self._putters:
+                    self._wakeup_putters()
+                if self._track_depth:
+                    self._active_depths[url] = self._depths.pop(url, 0)
+                if self._frontier.prioritised and self._max_crawl_size:
+                    self._page_count += 1
+                    if self._page_count >= self._max_crawl_size:
+                        self._drop_queued()
+                if self._getters and self._frontier.ready_in() == 0:
+                    self._wakeup_next()
+                return url
+            self._schedule_wakeup()
+            waiter = asyncio.get_event_loop().create_future()
+            self._getters.append(waiter)
+            try:
+                await waiter
+            except BaseException:
+                waiter.cancel()
+                try:
+                    self._getters.remove(waiter)
+                except ValueError:
+                    pass
+                if len(self._frontier) and not waiter.cancelled():
+                    self._wakeup_next()
+                raise
+
+    async def wait_for_room(self, max_queued: int) -> None:
+        """Waits until fewer than max_queued URLs are queued, so that producers
+        such as a Seeder only add URLs as fast as they are crawled."""
+        while len(self._frontier) >= max_queued:
+            waiter = asyncio.get_event_loop().create_future()
+            self._putters.append((max_queued, waiter))
+            try:
+                await waiter
+            finally:
+                if not waiter.done():
+                    waiter.cancel()
+
+    def _wakeup_putters(self) -> None:
+        size = len(self._frontier)
+        waiting = []
+        for max_queued, waiter in self._putters:
+            if waiter.done():
+                continue
+            if size < max_queued:
+                waiter.set_result(None)
+            else:
+                waiting.append((max_queued, waiter))
+        self._putters = waiting
+
+    def _schedule_wakeup(self) -> None:
+        # Frontiers such as HostFrontier may hold URLs which only become
+        # ready later, a single timer wakes one getter when the first is due.
+        delay = self._frontier.ready_in()
+        if delay is None:
+            return
+        loop = asyncio.get_event_loop()
+        when = loop.time() + delay
+        if self._timer is not None:
+            if self._timer.when() <= when:
+                return
+            self._timer.cancel()
+        self._timer = loop.call_at(when, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._wakeup_next()
+
+    def _drop_queued(self) -> None:
+        while True:
+            url = self._frontier.pop()
+            if url is None:
+                if self._putters:
+                    self._wakeup_putters()
+                return
+            self._depths.pop(url, None)
+            self._frontier.done(url)
+            self._unfinished -= 1
+
+    @property
+    def wants_anchors(self) -> bool:
+        return self._frontier.wants_anchors
+
+    def depth(self, url: str) -> Optional[int]:
+        """Links between url and a seed, for queued and in flight URLs when
+        depths are tracked."""
+        depth = self._active_depths.get(url)
+        return depth if depth is not None else self._depths.get(url)
+
+    def link_depth(self, parent: Optional[str]) -> int:
+        """Depth of a link found on the page parent, or 0 when depths are not
+        tracked."""
+        if self._track_depth and parent is not None:
+            return self._active_depths.get(parent, 0) + 1
+        return 0
+
+    def _admit(self, url: str, depth: int) -> bool:
+        if self._max_depth is not None and depth > self._max_depth:
+            self.dropped["depth"] += 1
+            return False
+        if self._trap_filter is not None and self._trap_filter.is_trap(url):
+            self.dropped["trap"] += 1
+            return False
+        # With a prioritised frontier the crawl budget is spent as URLs are
+        # handed out, so that the highest scoring are crawled rather than
+        # the first found.
+        if self._max_crawl_size and self._page_count >= self._max_crawl_size:
+            self.dropped["max_crawl_size"] += 1
+            return False
+        if self._budget is not None and not self._budget.allow(url):
+            self.dropped["budget"] += 1
+            return False
+        if not self._frontier.prioritised:
             self._page_count += 1
-        self._seen_urls.put(url)
+        return True
 
-    def task_done(self):
-        self._queue.task_done()
+    async def put_url(self, url, parent: Optional[str] = None):
+        """Queues url unless it has been seen before. parent is the URL of the
+        page it was found on, giving its depth and for frontiers which order
+        URLs by their links."""
+        anchor = getattr(url, "anchor", None)
+        if anchor is not None:
+            url = str(url)
+        depth = self.link_depth(parent)
+        if url in self._seen_urls:
+            if depth < self._depths.get(url, depth):
+                self._depths[url] = depth
+            self._frontier.link_seen(url, parent, anchor, depth)
+            return
+        if not self._admit(url, depth):
+            return
+        self._mark_seen(url)
+        self._push(url, parent, anchor, depth)
+
+    async def put_urls(
+        self,
+        urls: Iterable,
+        parent: Optional[str] = None,
+        depth: Optional[int] = None,
+    ) -> int:
+        """Queues those of urls not seen before, as put_url does one at a
+        time, returning how many were queued. depth overrides the depth
+        given by parent, for URLs found elsewhere such as by another shard.
+
+        Without max_depth, budgets, trap filtering or max_crawl_size the
+        batch is added to the seen URLs in one add_many call, which hashes or
+        splits each URL once. Otherwise the batch is first checked with
+        contains_many and only the URLs admitted are added, so new URLs are
+        looked up twice. A URL dropped from a batch is only counted in
+        dropped once however often it repeats.
+        """
+        urls = list(urls)
+        if depth is None:
+            depth = self.link_depth(parent)
+        if not (
+            self._track_depth
+            or self._trap_filter is not None
+            or self._budget is not None
+            or self._max_crawl_size
+        ):
+            anchors = {}
+            for url in urls:
+                anchor = getattr(url, "anchor", None)
+                if anchor is not None:
+                    anchors.setdefault(str(url), anchor)
+            new = self._mark_seen_many([str(url) for url in urls])
+            for url in new:
+                self._push(url, parent, anchors.get(url), depth)
+            self._page_count += len(new)
+            return len(new)
+        unseen = set(self._seen_urls.contains_many([str(url) for url in urls]))
+        admitted = []
+        rejected = set()
+        for url in urls:
+            anchor = getattr(url, "anchor", None)
+            url = str(url)
+            if url in rejected:
+                continue
+            if url not in unseen:
+                if depth < self._depths.get(url, depth):
+                    self._depths[url] = depth
+                self._frontier.link_seen(url, parent, anchor, depth)
+            elif self._admit(url, depth):
+                # Repeats later in the batch count as seen, as they would
+                # after put_url.
+                unseen.discard(url)
+                admitted.append(url)
+                self._push(url, parent, anchor, depth)
+            else:
+                rejected.add(url)
+        self._mark_seen_many(admitted)
+        return len(admitted)
+
+    def retry_later(self, url: str, delay: float) -> None:
+        """Queues url again after delay seconds, although it has been seen.
+
+        Waiting retries are held in a heap behind a single timer rather than
+        by a worker, and count as unfinished so that join waits for them.
+        """
+        depth = self._active_depths.get(url, 0)
+        if delay <= 0:
+            self._unfinished += 1
+            self._finished.clear()
+            self._push_retry(url, depth)
+            return
+        self._frontier.will_retry(url)
+        loop = asyncio.get_event_loop()
+        heapq.heappush(
+            self._retries, (loop.time() + delay, next(self._retry_order), url, depth)
+        )
+        self._unfinished += 1
+        self._finished.clear()
+        self._schedule_retries()
+
+    def _schedule_retries(self) -> None:
+        if not self._retries:
+            return
+        when = self._retries[0][0]
+        if self._retry_timer is not None:
+            if self._retry_timer.when() <= when:
+                return
+            self._retry_timer.cancel()
+        self._retry_timer = asyncio.get_event_loop().call_at(
+            when, self._release_retries
+        )
+
+    def _release_retries(self) -> None:
+        self._retry_timer = None
+        now = asyncio.get_event_loop().time()
+        while self._retries and self._retries[0][0] <= now:
+            _, _, url, depth = heapq.heappop(self._retries)
+            # Already counted as unfinished by retry_later.
+            self._push_retry(url, depth)
+        self._schedule_retries()
+
+    def _push_retry(self, url: str, depth: int) -> None:
+        if self._track_depth:
+            self._depths[url] = depth
+        self._frontier.push_retry(url, depth)
+        self._wakeup_next()
+
+    def pending_retries(self) -> int:
+        return len(self._retries)
+
+    def qsize(self) -> int:
+        return len(self._frontier)
+
+    def unfinished(self) -> int:
+        """URLs queued or being crawled which have not been marked done."""
+        return self._unfinished
+
+    def task_done(self, url: Optional[str] = None):
+        if self._unfinished <= 0:
+            raise ValueError("task_done() called too many times")
+        if url is not None:
+            self._active_depths.pop(url, None)
+            self._frontier.done(url)
+            if len(self._frontier):
+                self._wakeup_next()
+        self._unfinished -= 1
+        if self._unfinished == 0:
+            self._finished.set()
 
     async def join(self):
-        return await self._queue.join()
+        await self._finished.wait()
+
+    def checkpoint(self) -> None:
+        """Saves the crawl's progress with the frontier.
+
+        Frontiers with incremental_checkpoints are only given the URLs seen
+        since the previous checkpoint, and keep the depths of queued URLs
+        themselves. Others are given the whole seen URL container and depths
+        to pickle, which is slow for large crawls as it runs on the event
+        loop.
+        """
+        state = {
+            "page_count": self._page_count,
+            "retries": [(url, depth) for _, _, url, depth in self._retries],
+            "budget": self._budget.state() if self._budget else None,
+        }
+        if self._new_seen is None:
+            state["seen_urls"] = self._seen_urls
+            state["depths"] = {**self._depths, **self._active_depths}
+            self._frontier.checkpoint(state)
+            return
+        self._frontier.checkpoint(state, self._new_seen)
+        self._new_seen = []
+
+    def restore(self) -> bool:
+        """Resumes from the frontier's last checkpoint, if it has one."""
+        state = self._frontier.restore()
+        if state is None:
+            return False
+        if self._new_seen is None:
+            self._seen_urls = state["seen_urls"]
+            if self._track_depth:
+                self._depths = state.get("depths", {})
+        else:
+            # The seeds already marked as seen were seen by the earlier run.
+            self._new_seen = []
+            self._seen_urls.add_many(self._frontier.restored_seen())
+            if self._track_depth:
+                self._depths = dict(self._frontier.restored_depths())
+        self._page_count = state["page_count"]
+        if self._budget is not None and state.get("budget"):
+            self._budget.restore(state["budget"])
+        # Retries which were still waiting are due by now.
+        for url, depth in state.get("retries", ()):
+            self._frontier.push_retry(url, depth)
+        self._unfinished = len(self._frontier)
+        if self._unfinished:
+            self._finished.clear()
+        else:
+            self._finished.set()
+        return True
+
+    def close(self) -> None:
+        if self._retry_timer is not None:
+            self._retry_timer.cancel()
+            self._retry_timer = None
+        self._frontier.close()
@@ -1,9 +1,11 @@
 from abc import ABC, abstractmethod
 import asyncio
-from typing import Dict
+from typing import Dict, List, Optional
 import time
 from urllib.parse import urlparse
 
+from scrapio.utils.urls import url_host
+
 
 class AbstractLimiter(ABC):
     @abstractmethod
@@ -11,48 +13,128 @@ class AbstractLimiter(ABC):
         pass
 
 
-class RateLimiter(AbstractLimiter):
+class _Bucket:
+    """Generic cell rate algorithm state for a single limit.
 
-    __slots__ = ["_rate_limit", "_start_time", "_url_count"]
+    Requests are spaced 1 / rate seconds apart, with up to burst requests
+    allowed back to back after an idle period.
+    """
 
-    def __init__(self, reqs_per_second: int):
-        self._rate_limit = reqs_per_second
-        self._start_time: time.time = time.time()
-        self._url_count: int = 0
+    __slots__ = ["interval", "tolerance", "tat"]
 
-    async def limited(self, url: str) -> None:
-        elapsed = time.time() - self._start_time
-        while self._url_count / elapsed > self._rate_limit:
-            await asyncio.sleep(0.01)
-            elapsed = time.time() - self._start_time
-        self._url_count += 1
-        return
-
-
-class HostLimiter(AbstractLimiter):
-    def __init__(self, host_dict: Dict[str, int]):
-        self._count_per_domain: Dict[str, int] = {}
-        self._hosts, self.host_times = self._load_hosts(host_dict)
-        self._start_time: time.time = time.time()
-
-    def _load_hosts(self, host_dict: Dict[str, int]):
-        hosts = {}
-        host_times = {}
-        for k, v in host_dict.items():
-            u = urlparse(k).netloc
-            hosts[u] = v
-            host_times[u] = v
-            self._count_per_domain[u] = 0
-        return hosts
+    def __init__(self, rate: float, burst: int):
+        self.tat = 0.0
+        self.set_rate(rate, burst)
+
+    def set_rate(self, rate: float, burst: int) -> None:
+        self.interval = 1.0 / rate
+        self.tolerance = self.interval * (max(burst, 1) - 1)
+
+    def earliest(self, now: float) -> float:
+        return max(now, self.tat - self.tolerance)
+
+    def commit(self, at: float) -> None:
+        self.tat = max(self.tat, at) + self.interval
+
+    def refund(self, at: float) -> None:
+        # Only the most recent reservation can be handed back.
+        if self.tat == at + self.interval:
+            self.tat = at
+
+
+class BucketLimiter(AbstractLimiter):
+    """Reserves a slot in every bucket applying to a URL, then sleeps once.
+
+    Each call reserves the earliest time allowed by all of its buckets before
+    sleeping, so waiters are released in the order they called limited and
+    no coroutine polls.
+    """
+
+    clock = staticmethod(time.monotonic)
+
+    @abstractmethod
+    def _buckets(self, url: str) -> List[_Bucket]:
+        ...
 
     async def limited(self, url: str) -> None:
-        netloc = urlparse(url).netloc
-        if netloc in self._hosts:
-            count: int = self._count_per_domain[netloc]
-            elapsed = time.time() - self._start_time
-            while count / elapsed > self._hosts[netloc]:
-                await asyncio.sleep(0.01)
-                elapsed = time.time() - self._start_time
-            self._count_per_domain[netloc] += 1
+        buckets = self._buckets(url)
+        if not buckets:
             return
-        return
+        now = self.clock()
+        start = max(bucket.earliest(now) for bucket in buckets)
+        for bucket in buckets:
+            bucket.commit(start)
+        if start <= now:
+            return
+        try:
+            await asyncio.sleep(start - now)
+        except asyncio.CancelledError:
+            for bucket in buckets:
+                bucket.refund(start)
+            raise
+
+
+class RateLimiter(BucketLimiter):
+    __slots__ = ["_bucket"]
+
+    def __init__(self, reqs_per_second: float, burst: int = 1):
+        self._bucket = _Bucket(reqs_per_second, burst)
+
+    def set_rate(self, reqs_per_second: float, burst: int = 1) -> None:
+        self._bucket.set_rate(reqs_per_second, burst)
+
+    def _buckets(self, url: str) -> List[_Bucket]:
+        return [self._bucket]
+
+
+class HostLimiter(BucketLimiter):
+    """Limits requests per host.
+
+    host_dict maps URLs or host names to requests per second. Hosts which are
+    not listed are limited to default_rate, or not limited when it is None.
+    """
+
+    __slots__ = ["_hosts", "_default_rate", "_burst"]
+
+    def __init__(
+        self,
+        host_dict: Dict[str, float],
+        default_rate: Optional[float] = None,
+        burst: int = 1,
+    ):
+        self._hosts: Dict[str, _Bucket] = {}
+        self._default_rate = default_rate
+        self._burst = burst
+        for host, rate in host_dict.items():
+            self.set_host_rate(urlparse(host).netloc or host, rate)
+
+    def set_host_rate(self, host: str, reqs_per_second: float) -> None:
+        bucket = self._hosts.get(host)
+        if bucket is None:
+            self._hosts[host] = _Bucket(reqs_per_second, self._burst)
+        else:
+            bucket.set_rate(reqs_per_second, self._burst)
+
+    def _buckets(self, url: str) -> List[_Bucket]:
+        netloc = url_host(url)
+        bucket = self._hosts.get(netloc)
+        if bucket is None:
+            if self._default_rate is None:
+                return []
+            bucket = self._hosts[netloc] = _Bucket(self._default_rate, self._burst)
+        return [bucket]
+
+
+class CompositeLimiter(BucketLimiter):
+    """Applies several limiters at once, such as a global and a per host limit."""
+
+    __slots__ = ["limiters"]
+
+    def __init__(self, *limiters: BucketLimiter):
+        self.limiters = list(limiters)
+
+    def _buckets(self, url: str) -> List[_Bucket]:
+        buckets = []
+        for limiter in self.limiters:
+            buckets.extend(limiter._buckets(url))
+        return buckets
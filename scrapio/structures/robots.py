@@ -0,0 +1,255 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import quote, unquote, urlparse, urlunparse
+from urllib.robotparser import RobotFileParser
+
+from scrapio.structures.proxies import AbstractProxyManager
+
+
+def _build_parser(url: str, status: int, text: str) -> RobotFileParser:
+    # Mirrors RobotFileParser.read's handling of error statuses.
+    parser = RobotFileParser(url)
+    if status in (401, 403):
+        parser.disallow_all = True
+    elif status >= 400:
+        parser.allow_all = True
+    else:
+        parser.parse(text.splitlines())
+    parser.modified()
+    return parser
+
+
+class RobotsRules:
+    """Compiled form of a parsed robots.txt for a single user agent.
+
+    The rule paths are held in a prefix trie, so a lookup walks the URL path
+    once instead of testing every rule in turn, and recent decisions are kept
+    in an LRU cache. Decisions match RobotFileParser.can_fetch, which is used
+    directly for any other user agent.
+    """
+
+    __slots__ = ["parser", "_useragent", "_verdict", "_trie", "_root", "_decide"]
+
+    def __init__(
+        self, parser: RobotFileParser, useragent: str = "*", cache_size: int = 4096
+    ):
+        self.parser = parser
+        self._useragent = useragent
+        # Set when every URL gets the same answer.
+        self._verdict: Optional[bool] = None
+        # Trie nodes are dicts of character -> child, with the rule found at a
+        # node stored under None as (position in file, allowance).
+        self._trie: dict = {}
+        self._root: Optional[Tuple[int, bool]] = None
+        if parser.disallow_all or not parser.last_checked:
+            self._verdict = False
+        elif parser.allow_all:
+            self._verdict = True
+        else:
+            self._compile(self._entry_for(parser, useragent))
+        self._decide = lru_cache(maxsize=cache_size)(self._decide_url)
+
+    @staticmethod
+    def _entry_for(parser: RobotFileParser, useragent: str):
+        for entry in parser.entries:
+            if entry.applies_to(useragent):
+                return entry
+        return parser.default_entry
+
+    def _compile(self, entry) -> None:
+        if entry is None:
+            self._verdict = True
+            return
+        for position, line in enumerate(entry.rulelines):
+            rule = (position, line.allowance)
+            if line.path in ("", "*"):
+                if self._root is None:
+                    self._root = rule
+                continue
+            node = self._trie
+            for char in line.path:
+                node = node.setdefault(char, {})
+            node.setdefault(None, rule)
+        if not self._trie:
+            self._verdict = True if self._root is None else self._root[1]
+
+    def _lookup(self, path: str) -> bool:
+        best = self._root
+        node = self._trie
+        for char in path:
+            node = node.get(char)
+            if node is None:
+                break
+            rule = node.get(None)
+            if rule is not None and (best is None or rule[0] < best[0]):
+                best = rule
+        return True if best is None else best[1]
+
+    def _decide_url(self, url: str) -> bool:
+        parsed = urlparse(unquote(url))
+        path = quote(
+            urlunparse(
+                ("", "", parsed.path, parsed.params, parsed.query, parsed.fragment)
+            )
+        )
+        return self._lookup(path or "/")
+
+    def can_fetch(self, useragent: str, url: str) -> bool:
+        if useragent != self._useragent:
+            return self.parser.can_fetch(useragent, url)
+        if self._verdict is not None:
+            return self._verdict
+        return self._decide(url)
+
+    def crawl_delay(self, useragent: str):
+        return self.parser.crawl_delay(useragent)
+
+
+class RobotsCache:
+    """Shared cache of robots.txt files, fetched lazily the first time a host
+    is requested.
+
+    Concurrent requests for the same host share a single download. Entries
+    expire after ttl seconds, failed downloads are retried after failure_ttl
+    seconds, and when path is given the cache is saved to and loaded from a
+    JSON file so that later runs do not download robots.txt again.
+    """
+
+    __slots__ = [
+        "_entries",
+        "_parsers",
+        "_pending",
+        "_ttl",
+        "_failure_ttl",
+        "_path",
+        "on_crawl_delay",
+    ]
+
+    def __init__(
+        self,
+        ttl: float = 86400.0,
+        path: Optional[str] = None,
+        failure_ttl: float = 300.0,
+    ):
+        # host -> (robots url, status, text, fetched at)
+        self._entries: Dict[str, Tuple[str, int, str, float]] = {}
+        self._parsers: Dict[str, RobotsRules] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._ttl = ttl
+        self._failure_ttl = failure_ttl
+        self._path = path
+        self.on_crawl_delay: Optional[Callable[[str, float], None]] = None
+        if path and os.path.exists(path):
+            self._load(path)
+
+    def __getstate__(self):
+        # Downloads in progress and the crawl delay callback belong to the
+        # running crawler, copies sent to worker processes only need entries.
+        return {
+            "_entries": self._entries,
+            "_ttl": self._ttl,
+            "_failure_ttl": self._failure_ttl,
+            "_path": None,
+        }
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._parsers = {}
+        self._pending = {}
+        self.on_crawl_delay = None
+
+    def _load(self, path: str) -> None:
+        try:
+            with open(path) as f:
+                for host, entry in json.load(f).items():
+                    self._entries[host] = tuple(entry)
+        except (OSError, ValueError):
+            logger = logging.getLogger("ScrapIO")
+            logger.warning("Unable to load robots.txt cache from: {}".format(path))
+
+    def save(self) -> None:
+        if not self._path:
+            return
+        tmp_path = "{}.tmp".format(self._path)
+        with open(tmp_path, "w") as f:
+            json.dump(self._entries, f)
+        os.replace(tmp_path, self._path)
+
+    def _expired(self, entry: Tuple[str, int, str, float]) -> bool:
+        ttl = self._failure_ttl if entry[1] >= 500 else self._ttl
+        return time.time() - entry[3] > ttl
+
+    def get(self, host: str) -> Optional[RobotsRules]:
+        """Returns the cached rules for host, or None if they must be fetched."""
+        entry = self._entries.get(host)
+        if entry is None or self._expired(entry):
+            return None
+        parser = self._parsers.get(host)
+        if parser is None:
+            parser = self._parsers[host] = RobotsRules(_build_parser(*entry[:3]))
+            delay = parser.crawl_delay("*")
+            if delay and self.on_crawl_delay is not None:
+                self.on_crawl_delay(host, float(delay))
+        return parser
+
+    async def fetch(
+        self,
+        host: str,
+        scheme: str,
+        client,
+        proxy_manager: Optional[AbstractProxyManager] = None,
+    ) -> RobotsRules:
+        while True:
+            parser = self.get(host)
+            if parser is not None:
+                return parser
+            pending = self._pending.get(host)
+            if pending is None:
+                break
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # Only retry when it was the shared download that was cancelled.
+                if not pending.cancelled():
+                    raise
+        pending = self._pending[host] = asyncio.get_running_loop().create_future()
+        try:
+            parser = await self._download(host, scheme, client, proxy_manager)
+            pending.set_result(parser)
+        except BaseException:
+            pending.cancel()
+            raise
+        finally:
+            del self._pending[host]
+        return parser
+
+    async def _download(
+        self,
+        host: str,
+        scheme: str,
+        client,
+        proxy_manager: Optional[AbstractProxyManager],
+    ) -> RobotsRules:
+        url = "{}://{}/robots.txt".format(scheme, host)
+        try:
+            response = await client.get_request(url, proxy_manager)
+        except Exception:
+            response = None
+        if response is None:
+            logger = logging.getLogger("ScrapIO")
+            logger.warning(
+                "Was unable to successfully download robots.txt, for: {}".format(host)
+            )
+            # Treated as allowing everything until failure_ttl has passed.
+            status, text = 599, ""
+        else:
+            status, text = response.status, response.body or ""
+        self._entries[host] = (url, status, text, time.time())
+        self._parsers.pop(host, None)
+        return self.get(host)
@@ -0,0 +1,146 @@
+from abc import ABC, abstractmethod
+import calendar
+import re
+from typing import Callable, Dict, List, Optional
+
+__all__ = [
+    "AbstractScorer",
+    "DepthScorer",
+    "OPICScorer",
+    "FreshnessScorer",
+    "FunctionScorer",
+]
+
+
+class AbstractScorer(ABC):
+    """Decides the order in which a PriorityFrontier hands out URLs.
+
+    score is called whenever a link to a queued URL is found, with the page
+    it was found on, that page's depth plus one and, when uses_anchor is set,
+    the link's anchor text. Higher scores are crawled first and a URL keeps
+    the highest score it has been given.
+    """
+
+    uses_anchor = False
+
+    @abstractmethod
+    def score(
+        self, url: str, parent: Optional[str], depth: int, anchor: Optional[str]
+    ) -> float:
+        ...
+
+    def crawled(self, url: str, links: List[str]) -> Dict[str, float]:
+        """Called once url has been processed with the links found on it,
+        returning new scores for any of them."""
+        return {}
+
+    def retry_score(self, url: str, depth: int) -> float:
+        """Score of a URL queued again to be retried, which was not crawled
+        with the links found on it."""
+        return self.score(url, None, depth, None)
+
+
+class DepthScorer(AbstractScorer):
+    """Breadth first, crawling every page at one depth before the next."""
+
+    __slots__ = []
+
+    def score(self, url, parent, depth, anchor) -> float:
+        return -depth
+
+
+class OPICScorer(AbstractScorer):
+    """Online Page Importance Computation, a running estimate of PageRank.
+
+    Each seed starts with initial_cash. When a page has been crawled its cash
+    is split evenly among the links found on it, and queued pages are crawled
+    in order of the cash they have received, so pages linked to from many
+    important pages are reached first. Cash is only held for queued URLs and
+    URLs waiting to be retried.
+    """
+
+    __slots__ = ["initial_cash", "_cash"]
+
+    def __init__(self, initial_cash: float = 1.0):
+        self.initial_cash = initial_cash
+        self._cash: Dict[str, float] = {}
+
+    def score(self, url, parent, depth, anchor) -> float:
+        if parent is None:
+            self._cash[url] = self._cash.get(url, 0.0) + self.initial_cash
+        return self._cash.setdefault(url, 0.0)
+
+    def retry_score(self, url, depth) -> float:
+        # A retried URL keeps its cash rather than being given a seed's.
+        return self._cash.setdefault(url, 0.0)
+
+    def crawled(self, url: str, links: List[str]) -> Dict[str, float]:
+        cash = self._cash.pop(url, 0.0)
+        if not links or not cash:
+            return {}
+        share = cash / len(links)
+        scores = {}
+        for link in links:
+            if link in self._cash:
+                self._cash[link] += share
+                scores[link] = self._cash[link]
+        return scores
+
+
+_DATE = re.compile(
+    r"(?<!\d)((?:19|20)\d{2})[/_-]?(0[1-9]|1[0-2])(?:[/_-]?(0[1-9]|[12]\d|3[01]))?(?!\d)"
+)
+
+
+class FreshnessScorer(AbstractScorer):
+    """Crawls the pages most likely to be recently published first.
+
+    Pages are ordered by a last modified time, taken from set_modified, for
+    example from a sitemap's lastmod, or else from a date in the URL such as
+    /2023/10/18/. Undated pages come after dated ones, shallowest first.
+    """
+
+    __slots__ = ["_modified"]
+
+    def __init__(self):
+        self._modified: Dict[str, float] = {}
+
+    def set_modified(self, url: str, timestamp: float) -> None:
+        self._modified[url] = timestamp
+
+    @staticmethod
+    def url_date(url: str) -> Optional[float]:
+        match = _DATE.search(url)
+        if match is None:
+            return None
+        year, month, day = match.groups()
+        return float(calendar.timegm((int(year), int(month), int(day or 1), 0, 0, 0)))
+
+    def score(self, url, parent, depth, anchor) -> float:
+        modified = self._modified.get(url)
+        if modified is None:
+            modified = self.url_date(url)
+        if modified is None:
+            return -1.0 - depth
+        return modified
+
+    def crawled(self, url: str, links: List[str]) -> Dict[str, float]:
+        self._modified.pop(url, None)
+        return {}
+
+
+class FunctionScorer(AbstractScorer):
+    """Scores URLs with a plain function of url, parent, depth and anchor."""
+
+    __slots__ = ["_function", "uses_anchor"]
+
+    def __init__(
+        self,
+        function: Callable[[str, Optional[str], int, Optional[str]], float],
+        uses_anchor: bool = False,
+    ):
+        self._function = function
+        self.uses_anchor = uses_anchor
+
+    def score(self, url, parent, depth, anchor) -> float:
+        return self._function(url, parent, depth, anchor)
@@ -0,0 +1,314 @@
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import gzip
+import logging
+import re
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+import zlib
+
+import lxml.etree as etree
+
+from scrapio.structures.filtering import URLFilter
+from scrapio.structures.proxies import AbstractProxyManager
+from scrapio.utils.urls import url_host
+
+__all__ = ["SitemapParser", "Seeder", "read_seed_file", "parse_lastmod"]
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_SITEMAP_LINE = re.compile(r"^\s*sitemap\s*:\s*(\S+)", re.I | re.M)
+
+# (kind, url, last modified) where kind is "url" for a page and "sitemap" for
+# another sitemap to read.
+Entry = Tuple[str, str, Optional[float]]
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[float]:
+    """Timestamp of a W3C datetime, as used by sitemaps and Atom, or an RFC
+    822 date, as used by RSS."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        when = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return when.timestamp()
+
+
+def _name(tag) -> str:
+    return tag.rpartition("}")[2] if isinstance(tag, str) else ""
+
+
+class SitemapParser:
+    """Incremental parser for sitemaps, sitemap indexes and RSS or Atom feeds.
+
+    Bytes are fed as they are downloaded, gzip compressed or not, and run
+    through lxml's pull parser, the feed driven form of iterparse. Every
+    finished <url>, <sitemap>, <item> or <entry> is turned into an entry and
+    then cleared along with the elements before it, so memory stays flat
+    however large the document. Parsing stops once max_size bytes have been
+    decompressed.
+    """
+
+    __slots__ = ["max_size", "_parser", "_decompressor", "_started", "_size"]
+
+    def __init__(self, max_size: int = 100 * 1024 * 1024):
+        self.max_size = max_size
+        self._parser = etree.XMLPullParser(
+            events=("end",),
+            resolve_entities=False,
+            no_network=True,
+            remove_comments=True,
+            huge_tree=True,
+        )
+        self._decompressor = None
+        self._started = False
+        self._size = 0
+
+    def _entries(self) -> List[Entry]:
+        entries = []
+        for _, element in self._parser.read_events():
+            name = _name(element.tag)
+            if name == "url" or name == "sitemap":
+                entry = self._sitemap_entry(name, element)
+            elif name == "item" or name == "entry":
+                entry = self._feed_entry(element)
+            else:
+                continue
+            if entry is not None:
+                entries.append(entry)
+            element.clear()
+            parent = element.getparent()
+            if parent is not None:
+                while element.getprevious() is not None:
+                    del parent[0]
+        return entries
+
+    @staticmethod
+    def _sitemap_entry(name: str, element) -> Optional[Entry]:
+        loc = lastmod = None
+        for child in element:
+            child_name = _name(child.tag)
+            if child_name == "loc":
+                loc = child.text
+            elif child_name == "lastmod":
+                lastmod = child.text
+        if not loc or not loc.strip():
+            return None
+        return name if name == "sitemap" else "url", loc.strip(), parse_lastmod(lastmod)
+
+    @staticmethod
+    def _feed_entry(element) -> Optional[Entry]:
+        link = modified = None
+        for child in element:
+            child_name = _name(child.tag)
+            if child_name == "link":
+                # RSS gives the link as text, Atom as the href of an
+                # alternate link.
+                if child.text and child.text.strip():
+                    link = child.text.strip()
+                elif child.get("rel", "alternate") == "alternate" and child.get("href"):
+                    link = child.get("href").strip()
+            elif child_name in ("pubDate", "updated", "published", "date"):
+                modified = modified or child.text
+        if not link:
+            return None
+        return "url", link, parse_lastmod(modified)
+
+    def feed(self, chunk: bytes) -> List[Entry]:
+        """Parses the next chunk of the document, returning the entries it
+        completed."""
+        if not chunk or self._size > self.max_size:
+            return []
+        if not self._started:
+            self._started = True
+            if chunk.startswith(_GZIP_MAGIC):
+                self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self._decompressor is not None:
+            chunk = self._decompressor.decompress(chunk)
+        self._size += len(chunk)
+        if self._size > self.max_size:
+            logger = logging.getLogger("ScrapIO")
+            logger.warning("Sitemap exceeds {} bytes, stopped".format(self.max_size))
+            return []
+        self._parser.feed(chunk)
+        return self._entries()
+
+    def close(self) -> List[Entry]:
+        """Finishes parsing, returning any remaining entries."""
+        try:
+            self._parser.close()
+        except etree.XMLSyntaxError:
+            pass
+        return self._entries()
+
+
+def read_seed_file(path: str) -> Iterator[str]:
+    """Yields the URLs of a seed file one line at a time, skipping blank lines
+    and # comments. Files ending in .gz are decompressed as they are read."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", errors="ignore") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+
+
+class Seeder:
+    """Seeds a crawl from sitemaps, feeds and seed files as well as links.
+
+    Sitemaps are found through the Sitemap lines of each start host's
+    robots.txt when robots is set, and can also be given directly along with
+    RSS and Atom feeds. Sitemap indexes are followed up to max_documents
+    documents in all. URLs are streamed into the crawl's WorkQueue, which is
+    only topped up while it holds fewer than max_queued URLs: documents are
+    fetched one at a time as room is made, and seed files, which may run to
+    millions of lines, are read lazily. URLs go through the crawl's
+    canonicalizer and URLFilter like any link, and on_lastmod is called with
+    each URL's last modified time, for example FreshnessScorer.set_modified.
+    """
+
+    __slots__ = [
+        "sitemaps",
+        "seed_files",
+        "robots",
+        "max_queued",
+        "max_documents",
+        "on_lastmod",
+        "stats",
+    ]
+
+    def __init__(
+        self,
+        sitemaps: Iterable[str] = (),
+        seed_files: Iterable[str] = (),
+        robots: bool = True,
+        max_queued: int = 10000,
+        max_documents: int = 1000,
+        on_lastmod: Optional[Callable[[str, float], None]] = None,
+    ):
+        self.sitemaps = list(sitemaps)
+        self.seed_files = list(seed_files)
+        self.robots = robots
+        self.max_queued = max_queued
+        self.max_documents = max_documents
+        self.on_lastmod = on_lastmod
+        self.stats = {"documents": 0, "urls": 0, "filtered": 0}
+
+    async def _robots_sitemaps(
+        self,
+        start_url: str,
+        client,
+        url_filter: URLFilter,
+        proxy_manager: Optional[AbstractProxyManager],
+    ) -> List[str]:
+        parsed = urlparse(start_url)
+        scheme = parsed.scheme or "http"
+        if url_filter.robots_cache is not None:
+            rules = await url_filter.robots_cache.fetch(
+                parsed.netloc, scheme, client, proxy_manager
+            )
+            return rules.parser.site_maps() or []
+        response = await client.get_request(
+            "{}://{}/robots.txt".format(scheme, parsed.netloc), proxy_manager
+        )
+        if response is None or response.status >= 400 or not response.body:
+            return []
+        return _SITEMAP_LINE.findall(response.body)
+
+    async def _put(self, queue, url_filter: URLFilter, url: str, lastmod=None):
+        canonicalizer = url_filter.canonicalizer
+        if canonicalizer is not None:
+            split = canonicalizer.split(url)
+            if split is None:
+                self.stats["filtered"] += 1
+                return
+            url, host = split
+        else:
+            host = url_host(url)
+        if not url_filter.can_crawl(host, url):
+            self.stats["filtered"] += 1
+            return
+        if queue.qsize() >= self.max_queued:
+            await queue.wait_for_room(self.max_queued)
+        if lastmod is not None and self.on_lastmod is not None:
+            self.on_lastmod(url, lastmod)
+        await queue.put_url(url)
+        self.stats["urls"] += 1
+
+    async def _add_entries(
+        self, entries, queue, url_filter: URLFilter, pending: deque
+    ) -> None:
+        for kind, location, lastmod in entries:
+            if kind == "sitemap":
+                pending.append(location)
+            else:
+                await self._put(queue, url_filter, location, lastmod)
+
+    async def _read_document(
+        self,
+        url: str,
+        queue,
+        client,
+        url_filter: URLFilter,
+        proxy_manager: Optional[AbstractProxyManager],
+        pending: deque,
+    ) -> None:
+        parser = SitemapParser()
+        # Queues each chunk's entries before reading on, so a full WorkQueue
+        # also holds off the download.
+        async for chunk in client.iter_body(url, proxy_manager):
+            await self._add_entries(parser.feed(chunk), queue, url_filter, pending)
+        await self._add_entries(parser.close(), queue, url_filter, pending)
+
+    async def run(
+        self,
+        queue,
+        client,
+        url_filter: URLFilter,
+        start_urls: List[str],
+        proxy_manager: Optional[AbstractProxyManager] = None,
+    ) -> None:
+        logger = logging.getLogger("ScrapIO")
+        pending = deque(self.sitemaps)
+        if self.robots:
+            for start_url in start_urls:
+                try:
+                    pending.extend(
+                        await self._robots_sitemaps(
+                            start_url, client, url_filter, proxy_manager
+                        )
+                    )
+                except Exception as e:
+                    logger.warning(
+                        "Unable to read sitemaps from robots.txt: {}".format(e)
+                    )
+        read = set()
+        while pending and self.stats["documents"] < self.max_documents:
+            url = pending.popleft()
+            if url in read:
+                continue
+            read.add(url)
+            # Holds off fetching the next document until the crawl needs it.
+            if queue.qsize() >= self.max_queued:
+                await queue.wait_for_room(self.max_queued)
+            self.stats["documents"] += 1
+            try:
+                await self._read_document(
+                    url, queue, client, url_filter, proxy_manager, pending
+                )
+            except Exception as e:
+                logger.warning("Unable to read sitemap {}: {}".format(url, e))
+        for path in self.seed_files:
+            try:
+                for url in read_seed_file(path):
+                    await self._put(queue, url_filter, url)
+            except OSError as e:
+                logger.warning("Unable to read seed file {}: {}".format(path, e))
@@ -1,4 +1,5 @@
 from abc import abstractmethod, ABC
+from typing import Iterable, List
 
 
 class AbstractUrlSet(ABC):
@@ -9,3 +10,16 @@ class AbstractUrlSet(ABC):
     @abstractmethod
     def __contains__(self, item):
         ...
+
+    def contains_many(self, urls: Iterable[str]) -> List[str]:
+        """Returns the urls not in the set, in order and each only once,
+        without adding them."""
+        return [url for url in dict.fromkeys(urls) if url not in self]
+
+    def add_many(self, urls: Iterable[str]) -> List[str]:
+        """Adds urls, returning those which were not already in the set in
+        order and each only once."""
+        new = self.contains_many(urls)
+        for url in new:
+            self.put(url)
+        return new
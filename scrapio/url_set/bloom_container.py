@@ -0,0 +1,111 @@
+import math
+from typing import Iterable, List
+
+from scrapio.url_set.abstract_set import AbstractUrlSet
+from scrapio.url_set.fingerprint_container import url_fingerprint
+
+
+class _BloomFilter:
+    __slots__ = ["bits", "size", "hashes", "capacity", "count"]
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(
+            8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, math.ceil(-math.log2(error_rate)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.capacity = capacity
+        self.count = 0
+
+    def positions(self, first: int, second: int):
+        size = self.size
+        return [(first + i * second) % size for i in range(self.hashes)]
+
+    def contains(self, positions: List[int]) -> bool:
+        bits = self.bits
+        for position in positions:
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def add(self, positions: List[int]) -> None:
+        bits = self.bits
+        for position in positions:
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+
+class BloomContainer(AbstractUrlSet):
+    """Scalable Bloom filter with a configurable false positive rate.
+
+    A new, larger filter with a tighter error rate is added each time the
+    current one reaches capacity, so the overall false positive rate stays
+    below error_rate however many URLs are added. A false positive means a
+    URL which was never seen is reported as seen and is not crawled; URLs
+    which have been seen are always reported as seen.
+    """
+
+    __slots__ = [
+        "_filters",
+        "_error_rate",
+        "_growth",
+        "_tightening",
+        "_size",
+    ]
+
+    def __init__(
+        self,
+        initial_capacity: int = 100000,
+        error_rate: float = 0.001,
+        growth: int = 2,
+        tightening: float = 0.5,
+    ):
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate must be between 0 and 1")
+        self._error_rate = error_rate
+        self._growth = growth
+        self._tightening = tightening
+        self._size = 0
+        self._filters = [_BloomFilter(initial_capacity, error_rate * (1 - tightening))]
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def _hashes(url: str):
+        first, second = url_fingerprint(url)
+        return first, second | 1
+
+    def __contains__(self, item):
+        first, second = self._hashes(item)
+        return any(
+            bloom.contains(bloom.positions(first, second)) for bloom in self._filters
+        )
+
+    def _add(self, url: str) -> bool:
+        first, second = self._hashes(url)
+        for bloom in self._filters:
+            if bloom.contains(bloom.positions(first, second)):
+                return False
+        current = self._filters[-1]
+        if current.count >= current.capacity:
+            current = _BloomFilter(
+                current.capacity * self._growth,
+                self._error_rate
+                * (1 - self._tightening)
+                * self._tightening ** len(self._filters),
+            )
+            self._filters.append(current)
+        current.add(current.positions(first, second))
+        self._size += 1
+        return True
+
+    def put(self, url: str) -> None:
+        self._add(url)
+
+    def add_many(self, urls: Iterable[str]) -> List[str]:
+        return [url for url in urls if self._add(url)]
+
+    def memory_usage(self) -> int:
+        """Bytes held by the filters' bit arrays."""
+        return sum(len(bloom.bits) for bloom in self._filters)
@@ -0,0 +1,108 @@
+from array import array
+from hashlib import blake2b
+from typing import Iterable, List, Optional, Tuple
+
+from scrapio.url_set.abstract_set import AbstractUrlSet
+
+
+def url_fingerprint(url: str) -> Tuple[int, int]:
+    digest = blake2b(url.encode("utf-8"), digest_size=16).digest()
+    return (
+        int.from_bytes(digest[:8], "little"),
+        int.from_bytes(digest[8:], "little"),
+    )
+
+
+class FingerprintContainer(AbstractUrlSet):
+    """Stores 64 or 128 bit URL fingerprints in an open addressing hash table.
+
+    Fingerprints are kept in flat unsigned 64 bit arrays with linear probing,
+    so each URL costs a fixed 8 or 16 bytes divided by the load factor,
+    regardless of its length. Two distinct URLs sharing a fingerprint would be
+    treated as the same URL, which at 64 bits is unlikely below billions of URLs.
+    """
+
+    __slots__ = ["_low", "_high", "_mask", "_size", "_max_load"]
+
+    def __init__(
+        self,
+        fingerprint_bits: int = 64,
+        initial_capacity: int = 1024,
+        max_load: float = 0.7,
+    ):
+        if fingerprint_bits not in (64, 128):
+            raise ValueError("fingerprint_bits must be 64 or 128")
+        capacity = 1
+        while capacity < initial_capacity:
+            capacity <<= 1
+        self._low = array("Q", bytes(8 * capacity))
+        self._high: Optional[array] = (
+            array("Q", bytes(8 * capacity)) if fingerprint_bits == 128 else None
+        )
+        self._mask = capacity - 1
+        self._size = 0
+        self._max_load = max_load
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _key(self, url: str) -> Tuple[int, int]:
+        low, high = url_fingerprint(url)
+        # Zero marks an empty slot, so it can never be a stored fingerprint.
+        return low or 1, high
+
+    def _find(self, low: int, high: int) -> Tuple[bool, int]:
+        table, highs, mask = self._low, self._high, self._mask
+        index = low & mask
+        while True:
+            stored = table[index]
+            if stored == 0:
+                return False, index
+            if stored == low and (highs is None or highs[index] == high):
+                return True, index
+            index = (index + 1) & mask
+
+    def __contains__(self, item):
+        return self._find(*self._key(item))[0]
+
+    def _add(self, url: str) -> bool:
+        low, high = self._key(url)
+        found, index = self._find(low, high)
+        if found:
+            return False
+        self._low[index] = low
+        if self._high is not None:
+            self._high[index] = high
+        self._size += 1
+        if self._size > self._max_load * (self._mask + 1):
+            self._grow()
+        return True
+
+    def put(self, url: str) -> None:
+        self._add(url)
+
+    def add_many(self, urls: Iterable[str]) -> List[str]:
+        # Each URL is hashed once, and repeats within urls are found by the
+        # table itself.
+        return [url for url in urls if self._add(url)]
+
+    def _grow(self) -> None:
+        old_low, old_high = self._low, self._high
+        capacity = (self._mask + 1) * 2
+        self._low = array("Q", bytes(8 * capacity))
+        self._high = array("Q", bytes(8 * capacity)) if old_high is not None else None
+        self._mask = capacity - 1
+        for index, low in enumerate(old_low):
+            if low:
+                high = old_high[index] if old_high is not None else 0
+                _, slot = self._find(low, high)
+                self._low[slot] = low
+                if self._high is not None:
+                    self._high[slot] = high
+
+    def memory_usage(self) -> int:
+        """Bytes held by the fingerprint table."""
+        size = self._low.itemsize * len(self._low)
+        if self._high is not None:
+            size += self._high.itemsize * len(self._high)
+        return size
@@ -1,3 +1,5 @@
+from typing import Iterable, List
+
 from scrapio.url_set.abstract_set import AbstractUrlSet
 
 
@@ -13,3 +15,12 @@ class SetContainer(AbstractUrlSet):
 
     def __contains__(self, item):
         return item in self._seen
+
+    def contains_many(self, urls: Iterable[str]) -> List[str]:
+        seen = self._seen
+        return [url for url in dict.fromkeys(urls) if url not in seen]
+
+    def add_many(self, urls: Iterable[str]) -> List[str]:
+        new = self.contains_many(urls)
+        self._seen.update(new)
+        return new
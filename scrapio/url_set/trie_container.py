@@ -1,5 +1,5 @@
 from urllib.parse import urlparse
-from typing import List
+from typing import Iterable, List
 
 from scrapio.url_set.abstract_set import AbstractUrlSet
 
@@ -33,14 +33,19 @@ class TrieContainer(AbstractUrlSet):
             else:
                 return False
 
-    def put(self, url: str) -> None:
-        if url in self:
-            return
+    def _add(self, url: str) -> bool:
+        # Walks the trie once, creating nodes as needed, rather than checking
+        # for the URL first.
         temp_trie = self.trie
-        parts = self.make_parts(url)
-        for char in parts:
-            if char in temp_trie:
-                temp_trie = temp_trie[char]
-            else:
-                temp_trie = temp_trie.setdefault(char, {})
+        for char in self.make_parts(url):
+            temp_trie = temp_trie.setdefault(char, {})
+        if self._end_symbol in temp_trie:
+            return False
         temp_trie[self._end_symbol] = self._end_symbol
+        return True
+
+    def put(self, url: str) -> None:
+        self._add(url)
+
+    def add_many(self, urls: Iterable[str]) -> List[str]:
+        return [url for url in dict.fromkeys(urls) if self._add(url)]
@@ -29,4 +29,4 @@ def create_client_session(
 
 
 def response_to_html(response: ClientResponse) -> str:
-    return response._body.decode("utf-8", errors="ignore")
+    return response._body.decode(response.get_encoding(), errors="ignore")
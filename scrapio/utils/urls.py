@@ -1,5 +1,6 @@
-from urllib.parse import urlparse
-from typing import Union, List
+import re
+from urllib.parse import quote, urljoin, urlparse, urlsplit
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 
 
 def hosts_from_url(raw_urls: Union[List[str], None], start_url: str) -> List[str]:
@@ -9,3 +10,207 @@ def hosts_from_url(raw_urls: Union[List[str], None], start_url: str) -> List[str
     for url in raw_urls:
         netlocs.append(urlparse(url).netloc)
     return list(set(netlocs))
+
+
+def url_host(url: str) -> str:
+    """The netloc of url as urlsplit gives it, without splitting the rest."""
+    start = url.find("://")
+    if start == -1:
+        return urlsplit(url).netloc
+    start += 3
+    end = len(url)
+    for char in "/?#":
+        index = url.find(char, start, end)
+        if index != -1:
+            end = index
+    return url[start:end]
+
+
+_DEFAULT_PORTS = {"http": "80", "https": "443"}
+_UNRESERVED = frozenset(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~"
+)
+_ESCAPE = re.compile(r"%([0-9A-Fa-f]{2})")
+_PATH_SAFE = "/;:@!$&'()*+,=-._~%"
+_QUERY_SAFE = _PATH_SAFE + "?"
+_PATH_UNSAFE = re.compile(r"[^A-Za-z0-9/;:@!$&'()*+,=\-._~%]")
+_QUERY_UNSAFE = re.compile(r"[^A-Za-z0-9/;:@!$&'()*+,=\-._~%?]")
+_ABSOLUTE = re.compile(r"[A-Za-z][A-Za-z0-9+.-]*://")
+_SCHEME = re.compile(r"[A-Za-z][A-Za-z0-9+.-]*:")
+
+
+def _escape(match) -> str:
+    char = chr(int(match.group(1), 16))
+    return char if char in _UNRESERVED else "%" + match.group(1).upper()
+
+
+def _normalize_escapes(text: str, unsafe, safe: str) -> str:
+    # Escapes of unreserved characters are decoded and the rest upper cased,
+    # then anything which should have been escaped is.
+    if "%" in text:
+        text = _ESCAPE.sub(_escape, text)
+    if unsafe.search(text):
+        text = quote(text, safe=safe)
+    return text
+
+
+def _remove_dot_segments(path: str) -> str:
+    segments = path.split("/")
+    output = []
+    for segment in segments[1:]:
+        if segment == "..":
+            if output:
+                output.pop()
+        elif segment != ".":
+            output.append(segment)
+    if segments[-1] in (".", ".."):
+        output.append("")
+    return "/" + "/".join(output)
+
+
+def normalize_netloc(netloc: str, scheme: str = "") -> str:
+    """Lower cases the host, drops a trailing dot and the scheme's default
+    port, and encodes international domain names."""
+    userinfo, at, hostport = netloc.rpartition("@")
+    host, port = hostport, ""
+    index = hostport.rfind(":")
+    if index > hostport.rfind("]"):
+        host, port = hostport[:index], hostport[index + 1 :]
+    host = host.lower().rstrip(".")
+    if not host.isascii():
+        try:
+            host = host.encode("idna").decode("ascii")
+        except UnicodeError:
+            pass
+    if port == _DEFAULT_PORTS.get(scheme):
+        port = ""
+    return userinfo + at + host + (":" + port if port else "")
+
+
+class URLCanonicalizer:
+    """Resolves and normalizes the links found on a page, so that variants of
+    a URL are only crawled once.
+
+    Only http and https URLs are kept. Hosts are lower cased and stripped of
+    default ports, dot segments are removed, percent escapes are normalized,
+    empty paths become / and query parameters are sorted by name when
+    sort_query is set. Parameters named in drop_params, such as tracking
+    parameters, are removed, as are fragments when defragment is set.
+
+    resolve_many takes every href on a page at once, splitting the page's URL
+    a single time. Normalized hosts, and resolved links keyed on the part of
+    the page's URL they depend on, are cached for up to max_cached entries so
+    that links repeated across pages, such as navigation, are only
+    canonicalized once.
+    """
+
+    __slots__ = [
+        "defragment",
+        "sort_query",
+        "drop_params",
+        "max_cached",
+        "_netlocs",
+        "_resolved",
+    ]
+
+    def __init__(
+        self,
+        defragment: bool = True,
+        sort_query: bool = True,
+        drop_params: Iterable[str] = (),
+        max_cached: int = 100000,
+    ):
+        self.defragment = defragment
+        self.sort_query = sort_query
+        self.drop_params = frozenset(drop_params)
+        self.max_cached = max_cached
+        self._netlocs: Dict[Tuple[str, str], str] = {}
+        self._resolved: Dict[Tuple[str, str], Optional[Tuple[str, str]]] = {}
+
+    def _cache(self, cache: dict, key, value) -> None:
+        if len(cache) >= self.max_cached:
+            # Dicts keep insertion order, so this forgets the oldest entry.
+            del cache[next(iter(cache))]
+        cache[key] = value
+
+    def _normalize_query(self, query: str) -> str:
+        params = [
+            _normalize_escapes(param, _QUERY_UNSAFE, _QUERY_SAFE)
+            for param in query.split("&")
+            if param
+        ]
+        if self.drop_params:
+            params = [
+                param
+                for param in params
+                if param.partition("=")[0] not in self.drop_params
+            ]
+        if self.sort_query:
+            params.sort(key=lambda param: param.partition("=")[0])
+        return "&".join(params)
+
+    def split(self, url: str) -> Optional[Tuple[str, str]]:
+        """The canonical form of url and its host, or None if it is not an
+        http or https URL."""
+        scheme, netloc, path, query, fragment = urlsplit(url)
+        if scheme not in _DEFAULT_PORTS or not netloc:
+            return None
+        host = self._netlocs.get((scheme, netloc))
+        if host is None:
+            host = normalize_netloc(netloc, scheme)
+            self._cache(self._netlocs, (scheme, netloc), host)
+        if "/." in path:
+            path = _remove_dot_segments(path)
+        path = _normalize_escapes(path, _PATH_UNSAFE, _PATH_SAFE) or "/"
+        url = scheme + "://" + host + path
+        if query:
+            query = self._normalize_query(query)
+            if query:
+                url += "?" + query
+        if fragment and not self.defragment:
+            url += "#" + fragment
+        return url, host
+
+    def canonicalize(self, url: str) -> Optional[str]:
+        split = self.split(url)
+        return split[0] if split is not None else None
+
+    def resolve_many(
+        self, base_url: str, hrefs: Iterable[str]
+    ) -> List[Optional[Tuple[str, str]]]:
+        """Resolves each href against base_url, giving the canonical URL and
+        host for each, or None for those which are not http or https."""
+        base = urlsplit(base_url)
+        origin = base.scheme + "://" + base.netloc
+        document = origin + base.path
+        page = document + ("?" + base.query if base.query else "")
+        directory = origin + base.path[: base.path.rfind("/") + 1]
+        resolved = self._resolved
+        results = []
+        for href in hrefs:
+            href = href.strip()
+            # The part of the base URL the result depends on, if any.
+            first = href[:1]
+            if first == "/":
+                context = base.scheme if href[:2] == "//" else origin
+            elif first == "?":
+                context = document
+            elif first == "#" or not first:
+                context = page
+            elif _ABSOLUTE.match(href):
+                context = ""
+            elif _SCHEME.match(href):
+                # mailto:, javascript: and the like, or a scheme relative
+                # form too rare to be worth caching.
+                results.append(self.split(urljoin(base_url, href)))
+                continue
+            else:
+                context = directory
+            key = (context, href)
+            try:
+                results.append(resolved[key])
+            except KeyError:
+                result = self.split(urljoin(base_url, href))
+                self._cache(resolved, key, result)
+                results.append(result)
+        return results
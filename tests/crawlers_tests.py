@@ -0,0 +1,207 @@
+import unittest
+import asyncio
+import os
+import tempfile
+import threading
+
+from aiohttp import web
+
+from scrapio.crawlers import BaseCrawler
+from scrapio.crawlers.sharded import (
+    ShardedCrawler,
+    ShardQueue,
+    ShardRing,
+    _ShardChannel,
+)
+from scrapio.structures.sitemaps import Seeder
+
+
+class TestShardRing(unittest.TestCase):
+    def test_hosts_stay_on_one_shard(self):
+        ring = ShardRing(4)
+        self.assertEqual(
+            ring.shard_for("http://www.example.com/a"),
+            ring.shard_for("http://www.example.com/b?page=2"),
+        )
+        hosts = ["www.site{}.com".format(i) for i in range(2000)]
+        counts = [0] * 4
+        for host in hosts:
+            counts[ring.shard_for_host(host)] += 1
+        self.assertGreater(min(counts), 300)
+
+    def test_adding_a_shard_moves_few_hosts(self):
+        hosts = ["www.site{}.com".format(i) for i in range(2000)]
+        before, after = ShardRing(4), ShardRing(5)
+        moved = sum(
+            1
+            for host in hosts
+            if before.shard_for_host(host) != after.shard_for_host(host)
+        )
+        self.assertLess(moved, 2000 * 0.3)
+
+
+class TestShardQueue(unittest.TestCase):
+    def test_put_urls_takes_an_explicit_depth(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        ring = ShardRing(2)
+        hosts = ["www.site{}.com".format(i) for i in range(20)]
+        local = next(h for h in hosts if ring.shard_for_host(h) == 0)
+        remote = next(h for h in hosts if ring.shard_for_host(h) == 1)
+        channel = _ShardChannel(0, ("127.0.0.1", 0), 100, 0.1)
+        queue = ShardQueue(None, [], 0, ring, channel, max_depth=5)
+        local_url = "http://{}/".format(local)
+        remote_url = "http://{}/".format(remote)
+
+        queued = loop.run_until_complete(
+            queue.put_urls([local_url, remote_url], depth=3)
+        )
+
+        self.assertEqual(queued, 1)
+        self.assertEqual(queue.depth(local_url), 3)
+        self.assertEqual(channel._outbox[1], ([remote_url], [3]))
+
+
+PAGES = 30
+SITEMAP_REQUESTS = []
+
+
+def serve_site(ready: threading.Event, hosts: list) -> None:
+    # Binds an ephemeral port, then fills in hosts with two names for it.
+    # Its sitemap lists two pages which are not linked from any other.
+    async def page(request):
+        n = int(request.match_info["n"])
+        links = "".join(
+            '<a href="http://{}/p/{}">link</a>'.format(hosts[child % 2], child)
+            for child in range(n * 3 + 1, n * 3 + 4)
+            if child < PAGES
+        )
+        return web.Response(
+            text="<html><body>{}</body></html>".format(links), content_type="text/html"
+        )
+
+    async def sitemap(request):
+        SITEMAP_REQUESTS.append(request.host)
+        urls = "".join(
+            "<url><loc>http://{}/p/{}</loc></url>".format(hosts[n % 2], n)
+            for n in (PAGES, PAGES + 1)
+        )
+        return web.Response(
+            text="<urlset>{}</urlset>".format(urls), content_type="application/xml"
+        )
+
+    loop = asyncio.new_event_loop()
+    app = web.Application()
+    app.router.add_get("/p/{n}", page)
+    app.router.add_get("/sitemap.xml", sitemap)
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    loop.run_until_complete(site.start())
+    port = site._server.sockets[0].getsockname()[1]
+    hosts.extend(["127.0.0.1:{}".format(port), "localhost:{}".format(port)])
+    ready.set()
+    loop.run_forever()
+
+
+class RecordingCrawler(BaseCrawler):
+    output_path = None
+
+    def parse_result(self, response):
+        return str(response.url)
+
+    async def save_results(self, result):
+        with open(self.output_path, "a") as f:
+            f.write("{} {}\n".format(os.getpid(), result))
+
+
+class BrokenCrawler(BaseCrawler):
+    def __init__(self, *args, **kwargs):
+        raise ValueError("broken")
+
+
+class TestShardedCrawler(unittest.TestCase):
+    def test_crawls_every_page_once_across_shards(self):
+        hosts = []
+        ready = threading.Event()
+        threading.Thread(target=serve_site, args=(ready, hosts), daemon=True).start()
+        ready.wait()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        RecordingCrawler.output_path = os.path.join(directory.name, "results.txt")
+
+        ShardedCrawler(
+            RecordingCrawler,
+            ["http://{}/p/0".format(host) for host in hosts],
+            shards=2,
+            follow_robots=False,
+        ).run_crawler(4)
+
+        with open(RecordingCrawler.output_path) as f:
+            rows = [line.split() for line in f.read().splitlines()]
+        urls = [url for _, url in rows]
+        self.assertEqual(len(urls), len(set(urls)))
+        self.assertEqual(
+            {url.rsplit("/", 1)[1] for url in urls}, {str(n) for n in range(PAGES)}
+        )
+        ring = ShardRing(2)
+        by_shard = {}
+        for pid, url in rows:
+            by_shard.setdefault(ring.shard_for(url), set()).add(pid)
+        self.assertTrue(all(len(pids) == 1 for pids in by_shard.values()))
+
+    def test_forwarded_links_keep_their_depth(self):
+        hosts = []
+        ready = threading.Event()
+        threading.Thread(target=serve_site, args=(ready, hosts), daemon=True).start()
+        ready.wait()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        RecordingCrawler.output_path = os.path.join(directory.name, "results.txt")
+
+        ShardedCrawler(
+            RecordingCrawler,
+            ["http://{}/p/0".format(host) for host in hosts],
+            shards=2,
+            follow_robots=False,
+            max_depth=2,
+        ).run_crawler(4)
+
+        with open(RecordingCrawler.output_path) as f:
+            urls = [line.split()[1] for line in f.read().splitlines()]
+        # Pages 1 to 3 are one link from the seeds and 4 to 12 two links.
+        self.assertEqual(
+            sorted(int(url.rsplit("/", 1)[1]) for url in urls), [0] + list(range(13))
+        )
+
+    def test_reads_sitemaps_in_one_shard(self):
+        hosts = []
+        ready = threading.Event()
+        threading.Thread(target=serve_site, args=(ready, hosts), daemon=True).start()
+        ready.wait()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        RecordingCrawler.output_path = os.path.join(directory.name, "results.txt")
+        del SITEMAP_REQUESTS[:]
+
+        ShardedCrawler(
+            RecordingCrawler,
+            ["http://{}/p/0".format(host) for host in hosts],
+            shards=2,
+            follow_robots=False,
+            seeder=Seeder(["http://{}/sitemap.xml".format(hosts[0])], robots=False),
+        ).run_crawler(4)
+
+        with open(RecordingCrawler.output_path) as f:
+            urls = [line.split()[1] for line in f.read().splitlines()]
+        self.assertEqual(len(urls), len(set(urls)))
+        self.assertEqual(
+            {url.rsplit("/", 1)[1] for url in urls}, {str(n) for n in range(PAGES + 2)}
+        )
+        self.assertEqual(len(SITEMAP_REQUESTS), 1)
+
+    def test_fails_when_a_shard_dies(self):
+        with self.assertRaises(RuntimeError):
+            ShardedCrawler(
+                BrokenCrawler, "http://127.0.0.1:1/", shards=2, follow_robots=False
+            ).run_crawler(1)
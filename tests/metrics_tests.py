@@ -0,0 +1,151 @@
+import unittest
+import asyncio
+import socket
+
+from aiohttp import ClientSession, web
+
+from scrapio.crawlers import BaseCrawler
+from scrapio.metrics import MetricsRegistry, MetricsServer
+
+
+class TestMetricsRegistry(unittest.TestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        for seconds in (0.001, 0.02, 0.02, 3.0, 60.0):
+            registry.observe_stage("fetch", "www.example.com", seconds)
+        lines = registry.render().splitlines()
+        self.assertIn(
+            'scrapio_stage_seconds_bucket{stage="fetch",host="www.example.com",le="0.005"} 1',
+            lines,
+        )
+        self.assertIn(
+            'scrapio_stage_seconds_bucket{stage="fetch",host="www.example.com",le="0.025"} 3',
+            lines,
+        )
+        self.assertIn(
+            'scrapio_stage_seconds_bucket{stage="fetch",host="www.example.com",le="+Inf"} 5',
+            lines,
+        )
+        self.assertIn(
+            'scrapio_stage_seconds_count{stage="fetch",host="www.example.com"} 5', lines
+        )
+        snapshot = registry.snapshot()["scrapio_stage_seconds"]
+        self.assertAlmostEqual(snapshot[("fetch", "www.example.com")]["sum"], 63.041)
+
+    def test_counters_and_gauges(self):
+        registry = MetricsRegistry()
+        queue = [1, 2, 3]
+        registry.gauge("queue_size", "Queued URLs.", function=lambda: len(queue))
+        counter = registry.counter("responses", "Responses.", ("status",))
+        counter.inc(("200",))
+        registry.counter("responses", "Responses.", ("status",)).inc(("200",))
+        queue.pop()
+        self.assertEqual(
+            registry.snapshot(),
+            {"queue_size": {(): 2}, "responses": {("200",): 2}},
+        )
+        self.assertIn('responses{status="200"} 2', registry.render())
+        with self.assertRaises(ValueError):
+            registry.gauge("responses", "Responses.")
+
+    def test_host_labels_are_capped(self):
+        registry = MetricsRegistry(max_hosts=2)
+        for host in ("a.com", "b.com", "c.com", "a.com"):
+            registry.observe_stage("parse", host, 0.1)
+        self.assertEqual(
+            set(registry.snapshot()["scrapio_stage_seconds"]),
+            {("parse", "a.com"), ("parse", "b.com"), ("parse", "other")},
+        )
+
+
+class TestMetricsServer(unittest.TestCase):
+    def test_serves_metrics(self):
+        registry = MetricsRegistry()
+        registry.counter("scrapio_links_total", "Links found.").inc(amount=3)
+        server = MetricsServer(registry, port=0)
+
+        async def scrape():
+            await server.start()
+            try:
+                async with ClientSession() as session:
+                    url = "http://127.0.0.1:{}/metrics".format(server.port)
+                    async with session.get(url) as resp:
+                        return resp.status, await resp.text()
+            finally:
+                await server.stop()
+
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        status, text = loop.run_until_complete(scrape())
+        self.assertEqual(status, 200)
+        self.assertIn("# TYPE scrapio_links_total counter", text)
+        self.assertIn("scrapio_links_total 3", text)
+
+
+async def linking_page(request):
+    return web.Response(
+        text='<html><body><a href="/b">B</a></body></html>', content_type="text/html"
+    )
+
+
+class CountingCrawler(BaseCrawler):
+    def parse_result(self, response):
+        return str(response.url)
+
+    async def save_results(self, result):
+        pass
+
+
+class TestCrawlerMetrics(unittest.TestCase):
+    def test_crawl_records_stages_and_responses(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        # A port nothing listens on, so requests to it raise.
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            closed = "127.0.0.1:{}".format(sock.getsockname()[1])
+
+        async def crawl():
+            app = web.Application()
+            app.router.add_get("/", linking_page)
+            app.router.add_get("/b", linking_page)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            host = "127.0.0.1:{}".format(site._server.sockets[0].getsockname()[1])
+            registry = MetricsRegistry()
+            crawler = CountingCrawler(
+                ["http://{}/".format(host), "http://{}/".format(closed)],
+                follow_robots=False,
+                metrics=registry,
+                metrics_port=0,
+            )
+            try:
+                await crawler._crawl(2)
+                port = crawler._metrics_server.port
+                await crawler._close()
+            finally:
+                await runner.cleanup()
+            return host, port, registry.render().splitlines()
+
+        host, port, lines = loop.run_until_complete(asyncio.wait_for(crawl(), 10))
+        self.assertNotEqual(port, 0)
+        for stage in ("robots", "fetch", "links", "parse", "save", "enqueue"):
+            self.assertIn(
+                'scrapio_stage_seconds_count{{stage="{}",host="{}"}} 2'.format(
+                    stage, host
+                ),
+                lines,
+            )
+        self.assertIn(
+            'scrapio_responses_total{{host="{}",status="200"}} 2'.format(host), lines
+        )
+        self.assertIn(
+            'scrapio_errors_total{{host="{}",error="ClientConnectorError"}} 1'.format(
+                closed
+            ),
+            lines,
+        )
+        self.assertIn("scrapio_queue_size 0", lines)
+        self.assertIn("scrapio_links_total 2", lines)
@@ -0,0 +1,234 @@
+import unittest
+import asyncio
+
+from scrapio.crawlers import BaseCrawler
+from scrapio.parsing.duplicates import DuplicateDetector, SimHashIndex, simhash
+from scrapio.parsing.executor import ParseExecutor
+from scrapio.parsing.links import link_extractor, StreamingLinkExtractor
+from scrapio.requests.response import Response
+from scrapio.structures.filtering import URLFilter
+from scrapio.utils.urls import URLCanonicalizer
+
+
+PAGE = """
+<html><head><title>Example</title></head>
+<body>
+<a href="/first">First</a>
+<a href="second#fragment">Second</a>
+<a href="http://www.elsewhere.com/third">Third</a>
+</body></html>
+"""
+
+
+def page_title(response: Response) -> str:
+    return response.body.split("<title>")[1].split("</title>")[0]
+
+
+def make_response() -> Response:
+    response = Response()
+    response.url = "http://www.example.com/index.html"
+    response.status = 200
+    response.headers = {"Content-Type": "text/html"}
+    response.body = PAGE
+    return response
+
+
+class TestLinkExtractor(unittest.TestCase):
+    def test_extracts_and_filters_links(self):
+        url_filter = URLFilter(["www.example.com"], None, False)
+        _, links = link_extractor(make_response(), url_filter, True)
+        self.assertEqual(
+            links, ["http://www.example.com/first", "http://www.example.com/second"]
+        )
+
+    def test_anchor_text(self):
+        url_filter = URLFilter(["www.example.com"], None, False)
+        _, links = link_extractor(make_response(), url_filter, True, anchors=True)
+        self.assertEqual([link.anchor for link in links], ["First", "Second"])
+
+    def test_uses_page_charset(self):
+        url_filter = URLFilter(["www.example.com"], None, False)
+        response = make_response()
+        response.headers = {"Content-Type": "text/html; charset=latin-1"}
+        response.content = '<a href="/café">Café</a>'.encode("latin-1")
+        _, links = link_extractor(response, url_filter, True)
+        self.assertEqual(links, ["http://www.example.com/café"])
+
+    def test_canonicalizes_links(self):
+        url_filter = URLFilter(
+            ["http://www.example.com"],
+            None,
+            False,
+            canonicalizer=URLCanonicalizer(),
+        )
+        response = make_response()
+        response.body = (
+            '<a href="/b?y=2&x=1">B</a><a href="HTTP://WWW.EXAMPLE.COM:80/c">C</a>'
+            '<a href="mailto:someone@example.com">Mail</a>'
+        )
+        _, links = link_extractor(response, url_filter, True, anchors=True)
+        self.assertEqual(
+            links,
+            ["http://www.example.com/b?x=1&y=2", "http://www.example.com/c"],
+        )
+        self.assertEqual([link.anchor for link in links], ["B", "C"])
+
+
+class TestStreamingLinkExtractor(unittest.TestCase):
+    def test_matches_link_extractor_across_chunks(self):
+        url_filter = URLFilter(["www.example.com"], None, False)
+        extractor = StreamingLinkExtractor(url_filter, True)
+        extractor.begin("http://www.example.com/index.html")
+        body = PAGE.encode("utf-8")
+        found = []
+        for i in range(0, len(body), 16):
+            found.extend(extractor.feed(body[i : i + 16]))
+        links = extractor.close()
+        _, expected = link_extractor(make_response(), url_filter, True)
+        self.assertEqual(links, expected)
+        self.assertEqual(found, expected)
+
+    def test_anchor_text_split_across_chunks(self):
+        url_filter = URLFilter(["www.example.com"], None, False)
+        extractor = StreamingLinkExtractor(url_filter, True, anchors=True)
+        extractor.begin("http://www.example.com/")
+        body = b'<p><a href="/a">Long <b>anchor</b>\n text</a><a href="/b">B</a></p>'
+        for i in range(0, len(body), 7):
+            extractor.feed(body[i : i + 7])
+        links = extractor.close()
+        self.assertEqual(
+            links, ["http://www.example.com/a", "http://www.example.com/b"]
+        )
+        self.assertEqual([link.anchor for link in links], ["Long anchor text", "B"])
+
+    def test_unclosed_anchor_keeps_its_text(self):
+        url_filter = URLFilter(["www.example.com"], None, False)
+        extractor = StreamingLinkExtractor(url_filter, True, anchors=True)
+        extractor.begin("http://www.example.com/")
+        extractor.feed(b'<p><a href="/a">Cut <b>off')
+        links = extractor.close()
+        self.assertEqual([link.anchor for link in links], ["Cut off"])
+
+    def test_empty_body(self):
+        url_filter = URLFilter(["www.example.com"], None, False)
+        extractor = StreamingLinkExtractor(url_filter, True)
+        extractor.begin("http://www.example.com/")
+        self.assertEqual(extractor.close(), [])
+
+
+class TestParseExecutor(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def run_executor(self, mode: str, parse_function=page_title):
+        async def run():
+            url_filter = URLFilter(["www.example.com"], None, False)
+            executor = ParseExecutor(
+                parse_function, url_filter, True, mode=mode, workers=2, max_pending=2
+            )
+            try:
+                results = await asyncio.gather(
+                    *[executor.parse(make_response()) for _ in range(5)]
+                )
+            finally:
+                executor.shutdown()
+            return executor.mode, results
+
+        return self.loop.run_until_complete(run())
+
+    def test_thread_executor(self):
+        mode, results = self.run_executor("thread")
+        self.assertEqual(mode, "thread")
+        for links, title in results:
+            self.assertEqual(len(links), 2)
+            self.assertEqual(title, "Example")
+
+    def test_process_executor(self):
+        mode, results = self.run_executor("process")
+        self.assertEqual(mode, "process")
+        for links, title in results:
+            self.assertEqual(len(links), 2)
+            self.assertEqual(title, "Example")
+
+    def test_unpicklable_parse_function_falls_back_to_threads(self):
+        mode, results = self.run_executor("process", lambda response: response.status)
+        self.assertEqual(mode, "thread")
+        self.assertEqual(results[0][1], 200)
+
+
+def article(words: int, changed: int = -1, prefix: str = "word") -> str:
+    text = " ".join(
+        "changed" if index == changed else prefix + str(index) for index in range(words)
+    )
+    return "<html><body><nav>Home</nav><p>{}</p></body></html>".format(text)
+
+
+class TestDuplicateDetector(unittest.TestCase):
+    def test_close_texts_give_close_fingerprints(self):
+        first = simhash("word{}".format(index) for index in range(500))
+        second = simhash("word{}".format(index) for index in range(1, 501))
+        third = simhash("other{}".format(index) for index in range(500))
+        self.assertLessEqual(bin(first ^ second).count("1"), 3)
+        self.assertGreater(bin(first ^ third).count("1"), 10)
+
+    def test_index_finds_fingerprints_within_distance(self):
+        index = SimHashIndex(max_distance=3)
+        index.add(0b1011 << 40, "a")
+        self.assertEqual(index.find((0b1011 << 40) ^ 0b111), "a")
+        self.assertIsNone(index.find((0b1011 << 40) ^ 0b1111))
+
+    def test_flags_near_duplicates(self):
+        detector = DuplicateDetector(skip=False)
+        pages = [
+            ("http://www.example.com/a", article(300)),
+            ("http://www.example.com/a?print=1", article(300, changed=150)),
+            ("http://www.example.com/b", article(300, prefix="other")),
+            ("http://www.example.com/short", "<p>Not found</p>"),
+        ]
+        originals = []
+        for url, body in pages:
+            response = make_response()
+            response.url = url
+            response.body = body
+            originals.append(detector.check(response))
+        self.assertEqual(originals, [None, "http://www.example.com/a", None, None])
+        self.assertEqual(detector.stats, {"checked": 3, "duplicates": 1})
+
+    def test_crawler_skips_duplicates(self):
+        class Recorder(BaseCrawler):
+            def parse_result(self, response):
+                return str(response.url)
+
+            async def save_results(self, result):
+                self.saved.append(result)
+
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+
+        async def parse(mode):
+            crawler = Recorder(
+                "http://www.example.com/",
+                follow_robots=False,
+                duplicate_detector=DuplicateDetector(),
+                parse_executor=mode,
+            )
+            crawler._start_parse_executor()
+            crawler.saved = []
+            for url in ["http://www.example.com/a", "http://www.example.com/b"]:
+                response = make_response()
+                response.url = url
+                response.body = article(300) + '<a href="/c">C</a>'
+                await crawler._parse_response(0, response, url)
+            if crawler._parse_executor:
+                crawler._parse_executor.shutdown()
+            await crawler._client.close()
+            return crawler
+
+        # Fingerprints are computed in the parse executor when there is one.
+        for mode in (None, "thread"):
+            crawler = loop.run_until_complete(parse(mode))
+            self.assertEqual(crawler.saved, ["http://www.example.com/a"])
+            self.assertEqual(crawler._duplicates.stats["duplicates"], 1)
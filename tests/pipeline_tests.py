@@ -0,0 +1,123 @@
+import unittest
+import asyncio
+import csv
+import gzip
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+
+from scrapio.pipeline import CSVSink, JSONLSink, ResultPipeline, SQLiteSink
+from scrapio.pipeline.sinks import AbstractSink
+
+
+RESULTS = [
+    {"url": "http://www.example.com/{}".format(i), "title": "Page {}".format(i)}
+    for i in range(5)
+]
+
+
+class RecordingSink(AbstractSink):
+    def __init__(self, release: threading.Event = None):
+        self.batches = []
+        self.closed = False
+        self.release = release
+
+    def write(self, results):
+        if self.release is not None:
+            self.release.wait()
+        self.batches.append(list(results))
+
+    def close(self):
+        self.closed = True
+
+
+class TestResultPipeline(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def test_writes_in_batches_and_flushes_on_close(self):
+        sink = RecordingSink()
+        pipeline = ResultPipeline(sink, batch_size=3, flush_interval=10)
+
+        async def run():
+            for i in range(7):
+                await pipeline.put(i)
+            await pipeline.put(None)
+            await pipeline.close()
+
+        self.loop.run_until_complete(run())
+        self.assertEqual(sink.batches, [[0, 1, 2], [3, 4, 5], [6]])
+        self.assertTrue(sink.closed)
+        self.assertEqual(pipeline.stats["written"], 7)
+
+    def test_flushes_partial_batches_after_interval(self):
+        sink = RecordingSink()
+        pipeline = ResultPipeline(sink, batch_size=100, flush_interval=0.02)
+
+        async def run():
+            await pipeline.put("only")
+            await asyncio.sleep(0.1)
+            written = list(sink.batches)
+            await pipeline.close()
+            return written
+
+        self.assertEqual(self.loop.run_until_complete(run()), [["only"]])
+
+    def test_drops_results_when_full(self):
+        release = threading.Event()
+        sink = RecordingSink(release)
+        pipeline = ResultPipeline(
+            sink, batch_size=1, flush_interval=0, max_pending=2, block=False
+        )
+
+        async def run():
+            await pipeline.put(0)
+            # Lets the writer take the first result and block in the sink.
+            await asyncio.sleep(0.02)
+            for i in range(1, 5):
+                await pipeline.put(i)
+            release.set()
+            await pipeline.close()
+
+        self.loop.run_until_complete(run())
+        self.assertEqual(pipeline.stats["dropped"], 2)
+        self.assertEqual(sink.batches, [[0], [1], [2]])
+
+
+class TestSinks(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_jsonl_sink_with_compression(self):
+        sink = JSONLSink(self.path("results.jsonl.gz"), compress=True)
+        sink.write(RESULTS[:2])
+        sink.write(RESULTS[2:])
+        sink.close()
+        with gzip.open(self.path("results.jsonl.gz"), "rt") as f:
+            self.assertEqual([json.loads(line) for line in f], RESULTS)
+
+    def test_csv_sink_writes_header_once(self):
+        for batch in (RESULTS[:2], RESULTS[2:]):
+            sink = CSVSink(self.path("results.csv"))
+            sink.write(batch)
+            sink.close()
+        with open(self.path("results.csv"), newline="") as f:
+            self.assertEqual(list(csv.DictReader(f)), RESULTS)
+
+    def test_sqlite_sink_bulk_inserts(self):
+        sink = SQLiteSink(self.path("results.db"))
+        sink.write(RESULTS)
+        sink.write([{"url": "http://www.example.com/x", "title": ["a", "b"]}])
+        sink.close()
+        conn = sqlite3.connect(self.path("results.db"))
+        rows = conn.execute("SELECT url, title FROM results").fetchall()
+        conn.close()
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[-1][1], '["a", "b"]')
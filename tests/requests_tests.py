@@ -0,0 +1,395 @@
+import unittest
+import asyncio
+import os
+import socket
+import tempfile
+
+from aiohttp import web
+from aiohttp.abc import AbstractResolver
+
+from scrapio.requests.cache import CachingClient, HttpCache
+from scrapio.requests.client import AbstractClient
+from scrapio.requests.client_configuration import BodyRules, ConnectorRules
+from scrapio.requests.default_client import DefaultClient
+from scrapio.requests.dns import CachingResolver
+from scrapio.requests.response import Response, detect_encoding
+from tests.structures_tests import FakeClock
+
+
+async def slow_page(request):
+    await asyncio.sleep(0.02)
+    return web.Response(
+        text="<html><body>Hello</body></html>", content_type="text/html"
+    )
+
+
+class LocalServerTestCase(unittest.TestCase):
+    routes = [web.get("/", slow_page)]
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        app = web.Application()
+        app.add_routes(self.routes)
+        self.runner = web.AppRunner(app)
+        self.loop.run_until_complete(self.runner.setup())
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        self.loop.run_until_complete(site.start())
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = "http://127.0.0.1:{}".format(port)
+
+    def tearDown(self):
+        self.loop.run_until_complete(self.runner.cleanup())
+        self.loop.close()
+
+
+async def latin_page(request):
+    return web.Response(
+        body="<html><body>Café</body></html>".encode("latin-1"),
+        headers={"Content-Type": "text/html; charset=ISO-8859-1"},
+    )
+
+
+class TestDefaultClientPool(LocalServerTestCase):
+    def test_pool_stats_report_waits_and_reuse(self):
+        async def fetch():
+            client = DefaultClient(connector_rules=ConnectorRules(limit=1))
+            responses = await asyncio.gather(
+                *[client.get_request(self.base_url + "/", None) for _ in range(3)]
+            )
+            await client.close()
+            return responses, client.pool_stats()
+
+        responses, stats = self.loop.run_until_complete(fetch())
+
+        self.assertTrue(all(r.status == 200 for r in responses))
+        self.assertEqual(stats["limit"], 1)
+        self.assertEqual(stats["waits"], 2)
+        self.assertGreater(stats["wait_time"], 0)
+        self.assertEqual(stats["created"] + stats["reused"], 3)
+        self.assertEqual(stats["queued"], 0)
+
+
+async def tagged_page(request):
+    if request.headers.get("If-None-Match") == '"v1"':
+        return web.Response(status=304)
+    return web.Response(
+        text="<html><body>Tagged</body></html>",
+        content_type="text/html",
+        headers={"ETag": '"v1"'},
+    )
+
+
+class TestDefaultClientResponse(LocalServerTestCase):
+    routes = [web.get("/latin", latin_page)]
+
+    def test_body_decoded_with_page_charset(self):
+        async def fetch():
+            client = DefaultClient()
+            response = await client.get_request(self.base_url + "/latin", None)
+            await client.close()
+            return response
+
+        response = self.loop.run_until_complete(fetch())
+        self.assertIsNone(response.raw_response)
+        self.assertIsInstance(response.content, bytes)
+        self.assertEqual(response.encoding, "iso8859-1")
+        self.assertIn("Café", response.text)
+        self.assertIs(response.text, response.body)
+
+
+class TestResponse(unittest.TestCase):
+    def test_detect_encoding(self):
+        html = b'<html><head><meta charset="windows-1252"></head></html>'
+        self.assertEqual(detect_encoding({}, html), "cp1252")
+        self.assertEqual(
+            detect_encoding({"Content-Type": "text/html; charset=utf-8"}, html),
+            "utf-8",
+        )
+        self.assertEqual(detect_encoding(None, b"\xef\xbb\xbf<html>"), "utf-8")
+        self.assertEqual(
+            detect_encoding({"Content-Type": "text/html; charset=bogus"}, b""), "utf-8"
+        )
+
+    def test_decodes_lazily(self):
+        response = Response()
+        response.content = "<p>Ålesund</p>".encode("utf-8")
+        self.assertIsNone(response._text)
+        self.assertEqual(response.text, "<p>Ålesund</p>")
+        self.assertIs(response.text, response.text)
+
+        response.body = "<p>Plain</p>"
+        self.assertEqual(response.content, b"<p>Plain</p>")
+
+
+BIG_PAGE = b"<html><body>" + b"<p>filler</p>" * 10000 + b"</body></html>"
+requested = []
+
+
+async def big_page(request):
+    requested.append((request.method, request.path))
+    range_header = request.headers.get("Range")
+    if range_header:
+        start, end = range_header[len("bytes=") :].split("-")
+        return web.Response(
+            status=206,
+            body=BIG_PAGE[int(start) : int(end) + 1],
+            content_type="text/html",
+            headers={
+                "Content-Range": "bytes {}-{}/{}".format(start, end, len(BIG_PAGE))
+            },
+        )
+    return web.Response(body=BIG_PAGE, content_type="text/html")
+
+
+async def pdf_file(request):
+    requested.append((request.method, request.path))
+    return web.Response(body=b"%PDF" * 1000, content_type="application/pdf")
+
+
+async def endless_page(request):
+    response = web.StreamResponse(headers={"Content-Type": "text/html"})
+    await response.prepare(request)
+    while True:
+        await response.write(b"<p>more</p>" * 100)
+        await asyncio.sleep(0)
+
+
+class TestBodyRules(LocalServerTestCase):
+    routes = [
+        web.get("/big", big_page),
+        web.get("/file.pdf", pdf_file),
+        web.get("/endless", endless_page),
+    ]
+
+    def setUp(self):
+        super().setUp()
+        requested.clear()
+
+    def fetch(self, path, body_rules):
+        async def fetch():
+            client = DefaultClient(body_rules=body_rules)
+            response = await client.get_request(self.base_url + path, None)
+            await client.close()
+            return response
+
+        return self.loop.run_until_complete(fetch())
+
+    def test_truncates_large_bodies(self):
+        response = self.fetch("/big", BodyRules(max_size=1000))
+        self.assertTrue(response.partial)
+        self.assertEqual(response.content, BIG_PAGE[:1000])
+
+        response = self.fetch("/big", BodyRules(max_size=None))
+        self.assertFalse(response.partial)
+        self.assertEqual(len(response.content), len(BIG_PAGE))
+
+    def test_aborts_endless_bodies(self):
+        response = self.fetch("/endless", BodyRules(max_size=50000))
+        self.assertTrue(response.partial)
+        self.assertEqual(len(response.content), 50000)
+
+    def test_skips_disallowed_content_types(self):
+        response = self.fetch("/file.pdf", BodyRules())
+        self.assertEqual(response.status, 200)
+        self.assertTrue(response.partial)
+        self.assertIsNone(response.content)
+
+    def test_head_probe_skips_get(self):
+        response = self.fetch("/file.pdf", BodyRules(probe="head"))
+        self.assertIsNone(response.content)
+        self.assertEqual(requested, [("HEAD", "/file.pdf")])
+
+        response = self.fetch("/big", BodyRules(max_size=1000, probe="head"))
+        self.assertIsNone(response.content)
+        self.assertTrue(response.partial)
+
+    def test_range_probe(self):
+        response = self.fetch("/big", BodyRules(max_size=1000, probe="range"))
+        self.assertEqual(response.status, 206)
+        self.assertTrue(response.partial)
+        self.assertEqual(response.content, BIG_PAGE[:1000])
+
+
+class TestCachingClient(LocalServerTestCase):
+    routes = [web.get("/", slow_page), web.get("/tagged", tagged_page)]
+
+    def test_revalidates_cached_pages(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache = HttpCache(os.path.join(directory.name, "cache.db"))
+
+        async def fetch_twice(url):
+            client = CachingClient(DefaultClient(), cache)
+            first = await client.get_request(url, None)
+            second = await client.get_request(url, None)
+            await client._client.close()
+            client._executor.shutdown(wait=True)
+            return first, second, client.stats
+
+        first, second, stats = self.loop.run_until_complete(
+            fetch_twice(self.base_url + "/tagged")
+        )
+        self.assertFalse(first.not_modified)
+        self.assertTrue(second.not_modified)
+        self.assertEqual(second.status, 200)
+        self.assertEqual(second.body, first.body)
+        self.assertEqual(stats["not_modified"], 1)
+
+        first, second, stats = self.loop.run_until_complete(
+            fetch_twice(self.base_url + "/")
+        )
+        self.assertFalse(second.not_modified)
+        self.assertEqual(stats["stored"], 0)
+        cache.close()
+
+    def test_sends_validators_with_caller_headers(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache = HttpCache(os.path.join(directory.name, "cache.db"))
+        response = Response()
+        response.url = self.base_url + "/tagged"
+        response.status = 200
+        response.headers = {"ETag": '"a"'}
+        cache.store(response.url, response, b"cached")
+
+        class RecordingClient(AbstractClient):
+            def __init__(self):
+                self.headers = []
+
+            async def get_request(self, url, proxy_manager, headers=None):
+                self.headers.append(headers)
+                return None
+
+            async def close(self):
+                pass
+
+        async def fetch():
+            client = CachingClient(RecordingClient(), cache)
+            await client.get_request(response.url, None, headers={"X-Test": "1"})
+            await client.get_request(self.base_url + "/", None)
+            recorded = client._client.headers
+            await client.close()
+            return recorded
+
+        recorded = self.loop.run_until_complete(fetch())
+        self.assertEqual(recorded, [{"X-Test": "1", "If-None-Match": '"a"'}, None])
+
+
+class TestHttpCache(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        cache = HttpCache(os.path.join(directory.name, "cache.db"), max_size=300)
+        response = Response()
+        response.status = 200
+        response.headers = {"ETag": '"a"'}
+        for i in range(3):
+            response.url = "http://www.example.com/{}".format(i)
+            cache.store(response.url, response, os.urandom(100))
+            cache.touch("http://www.example.com/0")
+        self.assertLessEqual(cache.size, 300)
+        self.assertIsNotNone(cache.get("http://www.example.com/0"))
+        self.assertIsNone(cache.get("http://www.example.com/1"))
+        cache.close()
+
+
+class StubResolver(AbstractResolver):
+    """Answers from a table of hosts, counting the lookups made."""
+
+    def __init__(self, addresses, ttl=None, delay=0.0):
+        self.addresses = addresses
+        self.ttl = ttl
+        self.delay = delay
+        self.calls = []
+
+    async def resolve(self, host, port=0, family=socket.AF_INET):
+        self.calls.append(host)
+        await asyncio.sleep(self.delay)
+        if host not in self.addresses:
+            raise OSError(socket.EAI_NONAME, "Name or service not known")
+        return [
+            {
+                "hostname": host,
+                "host": self.addresses[host],
+                "port": port,
+                "family": socket.AF_INET,
+                "proto": 0,
+                "flags": socket.AI_NUMERICHOST,
+                "ttl": self.ttl,
+            }
+        ]
+
+    async def close(self):
+        pass
+
+
+class TestCachingResolver(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.clock = FakeClock()
+
+    def test_caches_answers_for_their_ttl(self):
+        stub = StubResolver({"a.test": "10.0.0.1"}, ttl=60)
+        resolver = CachingResolver(stub, ttl=300.0, clock=self.clock)
+
+        async def lookups():
+            first = await resolver.resolve("a.test", 80)
+            second = await resolver.resolve("a.test", 443)
+            self.clock.now += 61.0
+            await resolver.resolve("a.test", 80)
+            return first, second
+
+        first, second = self.loop.run_until_complete(lookups())
+        self.assertEqual(first[0]["host"], "10.0.0.1")
+        self.assertEqual((first[0]["port"], second[0]["port"]), (80, 443))
+        self.assertEqual(stub.calls, ["a.test", "a.test"])
+        self.assertEqual(resolver.snapshot()["hit_rate"], 1 / 3)
+
+    def test_caches_failures(self):
+        stub = StubResolver({})
+        resolver = CachingResolver(stub, negative_ttl=30.0, clock=self.clock)
+        for _ in range(2):
+            with self.assertRaises(OSError):
+                self.loop.run_until_complete(resolver.resolve("missing.test", 80))
+        self.clock.now += 31.0
+        with self.assertRaises(OSError):
+            self.loop.run_until_complete(resolver.resolve("missing.test", 80))
+        self.assertEqual(len(stub.calls), 2)
+        self.assertEqual(resolver.negative_hits, 1)
+
+    def test_prefetch_is_shared_with_requests(self):
+        stub = StubResolver({"a.test": "10.0.0.1"}, delay=0.01)
+        resolver = CachingResolver(stub, max_concurrent=1)
+
+        async def lookups():
+            resolver.prefetch("a.test", socket.AF_INET)
+            resolver.prefetch("a.test", socket.AF_INET)
+            resolver.prefetch("10.0.0.2", socket.AF_INET)
+            return await asyncio.gather(
+                resolver.resolve("a.test", 80), resolver.resolve("a.test", 80)
+            )
+
+        answers = self.loop.run_until_complete(lookups())
+        self.assertEqual([answer[0]["port"] for answer in answers], [80, 80])
+        self.assertEqual(stub.calls, ["a.test"])
+        self.assertEqual(resolver.snapshot()["prefetches"], 1)
+
+
+class TestDefaultClientResolver(LocalServerTestCase):
+    def test_connects_through_the_resolver(self):
+        stub = StubResolver({"site.test": "127.0.0.1"})
+        port = self.base_url.rpartition(":")[2]
+
+        async def fetch():
+            client = DefaultClient(resolver=CachingResolver(stub))
+            response = await client.get_request(
+                "http://site.test:{}/".format(port), None
+            )
+            await client.close()
+            return response, client.dns_stats()
+
+        response, stats = self.loop.run_until_complete(fetch())
+        self.assertEqual(response.status, 200)
+        self.assertEqual(stub.calls, ["site.test"])
+        self.assertEqual(stats["resolutions"], 1)
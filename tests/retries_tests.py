@@ -0,0 +1,196 @@
+import unittest
+import asyncio
+import threading
+
+from aiohttp import ClientConnectionError, web
+
+from scrapio.crawlers import BaseCrawler
+from scrapio.requests.response import Response
+from scrapio.retries.retry import RetryPolicy, SimpleAttempts, parse_retry_after
+from scrapio.structures.queues import WorkQueue
+from tests.structures_tests import FakeClock
+
+
+def response(status: int, headers=None) -> Response:
+    resp = Response()
+    resp.status = status
+    resp.headers = headers or {}
+    return resp
+
+
+class TestSimpleAttempts(unittest.TestCase):
+    def test_counts_attempts_per_url(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        retries = SimpleAttempts(3)
+        url = "http://www.example.com/"
+        results = [loop.run_until_complete(retries.should_retry(url)) for _ in range(3)]
+        self.assertEqual(results, [True, True, False])
+        loop.run_until_complete(retries.on_success(url))
+        self.assertEqual(retries.retry_counter, {})
+
+
+class TestRetryPolicy(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.clock = FakeClock()
+
+    def delay(self, policy, url, **kwargs):
+        return self.loop.run_until_complete(policy.retry_delay(url, **kwargs))
+
+    def test_exponential_backoff_until_max_retries(self):
+        policy = RetryPolicy(
+            max_retries=4, backoff=1.0, max_backoff=5.0, jitter=False, clock=self.clock
+        )
+        url = "http://www.example.com/"
+        delays = [self.delay(policy, url, response=response(503)) for _ in range(5)]
+        self.assertEqual(delays, [1.0, 2.0, 4.0, 5.0, None])
+        self.assertEqual(policy.stats["gave_up"], 1)
+
+    def test_jitter_scales_the_backoff(self):
+        policy = RetryPolicy(backoff=2.0, random_source=lambda: 0.25)
+        self.assertEqual(self.delay(policy, "http://www.example.com/"), 0.5)
+
+    def test_classifies_statuses_and_exceptions(self):
+        policy = RetryPolicy()
+        self.assertTrue(policy.is_retryable(response(429)))
+        self.assertFalse(policy.is_retryable(response(404)))
+        url = "http://www.example.com/"
+        self.assertIsNotNone(self.delay(policy, url, exception=ClientConnectionError()))
+        self.assertIsNone(self.delay(policy, url, exception=ValueError()))
+
+    def test_honours_retry_after(self):
+        policy = RetryPolicy(jitter=False, max_retry_after=60.0)
+        url = "http://www.example.com/"
+        resp = response(429, {"Retry-After": "30"})
+        self.assertEqual(self.delay(policy, url, response=resp), 30.0)
+        resp = response(429, {"Retry-After": "3600"})
+        self.assertEqual(self.delay(policy, url, response=resp), 60.0)
+        self.assertEqual(
+            parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT", now=1445412470.0), 10.0
+        )
+        self.assertIsNone(parse_retry_after("soon"))
+
+    def test_circuit_breaker_opens_and_lets_one_probe_through(self):
+        policy = RetryPolicy(
+            max_retries=10,
+            jitter=False,
+            breaker_threshold=3,
+            breaker_cooldown=30.0,
+            clock=self.clock,
+        )
+        host = "www.example.com"
+        for page in range(2):
+            self.delay(policy, "http://{}/{}".format(host, page))
+        self.assertEqual(policy.blocked_for(host), 0.0)
+        # The failure which opens the breaker waits for the cooldown.
+        self.assertEqual(self.delay(policy, "http://{}/2".format(host)), 30.0)
+        self.assertEqual(policy.blocked_for(host), 30.0)
+        self.clock.now += 30.0
+        self.assertEqual(policy.blocked_for(host), 0.0)
+        self.assertEqual(policy.blocked_for(host), 30.0)
+        self.loop.run_until_complete(policy.on_success("http://{}/3".format(host)))
+        self.assertEqual(policy.blocked_for(host), 0.0)
+        self.assertEqual(policy.stats["breaker_opened"], 1)
+
+    def test_tracked_urls_are_bounded(self):
+        policy = RetryPolicy(max_tracked=10, breaker_threshold=None)
+        for page in range(100):
+            self.delay(policy, "http://www.example{}.com/".format(page))
+        self.assertEqual(len(policy._attempts), 10)
+        self.assertEqual(len(policy._hosts), 10)
+
+
+class TestRetryLater(unittest.TestCase):
+    def test_requeues_seen_urls_after_delay(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        url = "http://www.example.com/"
+
+        async def run():
+            queue = WorkQueue(None, url)
+            job = await queue.get_job()
+            queue.retry_later(job, 0.05)
+            queue.task_done(job)
+            self.assertEqual(queue.unfinished(), 1)
+            self.assertEqual(queue.qsize(), 0)
+            started = loop.time()
+            retried = await queue.get_job()
+            waited = loop.time() - started
+            queue.task_done(retried)
+            await asyncio.wait_for(queue.join(), 1)
+            return retried, waited
+
+        retried, waited = loop.run_until_complete(run())
+        self.assertEqual(retried, url)
+        self.assertGreaterEqual(waited, 0.04)
+
+
+def serve_flaky(ready: threading.Event, failures: int, ports: list) -> None:
+    # Binds an ephemeral port and appends it to ports.
+    attempts = {}
+
+    async def page(request):
+        path = request.path
+        attempts[path] = attempts.get(path, 0) + 1
+        if attempts[path] <= failures:
+            raise web.HTTPServiceUnavailable(headers={"Retry-After": "0"})
+        links = '<a href="/b">b</a>' if path == "/a" else ""
+        return web.Response(
+            text="<html><body>{}</body></html>".format(links), content_type="text/html"
+        )
+
+    loop = asyncio.new_event_loop()
+    app = web.Application()
+    app.router.add_get("/a", page)
+    app.router.add_get("/b", page)
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    loop.run_until_complete(site.start())
+    ports.append(site._server.sockets[0].getsockname()[1])
+    ready.set()
+    loop.run_forever()
+
+
+class RecordingCrawler(BaseCrawler):
+    def parse_result(self, response):
+        return str(response.url)
+
+    async def save_results(self, result):
+        self.saved.append(result)
+
+
+class TestCrawlerRetries(unittest.TestCase):
+    def test_retries_unavailable_pages(self):
+        ports = []
+        ready = threading.Event()
+        threading.Thread(
+            target=serve_flaky, args=(ready, 2, ports), daemon=True
+        ).start()
+        ready.wait()
+        port = ports[0]
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+
+        async def crawl():
+            crawler = RecordingCrawler(
+                "http://127.0.0.1:{}/a".format(port),
+                follow_robots=False,
+                retry_handler=RetryPolicy(max_retries=3, backoff=0.01),
+            )
+            crawler.saved = []
+            await crawler._crawl(2)
+            await crawler._close()
+            return crawler
+
+        crawler = loop.run_until_complete(asyncio.wait_for(crawl(), 10))
+        self.assertEqual(
+            sorted(crawler.saved),
+            [
+                "http://127.0.0.1:{}/a".format(port),
+                "http://127.0.0.1:{}/b".format(port),
+            ],
+        )
+        self.assertEqual(crawler.retry_handler.stats["retried"], 4)
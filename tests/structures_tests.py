@@ -1,9 +1,31 @@
 import unittest
 import asyncio
+import gzip
+import os
+import random
+import tempfile
+import threading
 from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
 
+from aiohttp import web
+
+from scrapio.crawlers import BaseCrawler
+from scrapio.structures.budgets import CrawlBudget, TrapFilter
+from scrapio.structures.concurrency import AIMDLimit, ConcurrencyController
+from scrapio.parsing.links import Link
+from scrapio.structures.frontier import HostFrontier, PriorityFrontier, SQLiteFrontier
 from scrapio.structures.proxies import AbstractProxyManager, RoundRobinProxy
-from scrapio.structures.filtering import URLFilter
+from scrapio.structures.filtering import URLFilter, compile_substrings
+from scrapio.structures.queues import WorkQueue
+from scrapio.structures.rate_limiter import CompositeLimiter, HostLimiter, RateLimiter
+from scrapio.structures.robots import RobotsCache, RobotsRules
+from scrapio.structures.sitemaps import SitemapParser, Seeder, read_seed_file
+from scrapio.structures.scoring import (
+    FreshnessScorer,
+    FunctionScorer,
+    OPICScorer,
+)
 
 
 class TestRoundRobinProxy(unittest.TestCase):
@@ -76,3 +98,888 @@ class TestURLFiltering(unittest.TestCase):
             "www.example2.com", "http://www.example2.com/product-101"
         )
         self.assertFalse(can_crawl)
+
+    def test_start_urls_are_reduced_to_hosts(self):
+        test_filter = URLFilter(["http://www.example.com/start"], None, False)
+        self.assertTrue(
+            test_filter.can_crawl("www.example.com", "http://www.example.com/a")
+        )
+        self.assertFalse(test_filter.can_crawl("example.com", "http://example.com/a"))
+
+    def test_compiled_substrings_match_any(self):
+        rng = random.Random(7)
+        alphabet = "abc/-"
+        rules = [
+            "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 5)))
+            for _ in range(40)
+        ]
+        pattern = compile_substrings(rules)
+        for _ in range(500):
+            url = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+            self.assertEqual(
+                bool(pattern.search(url)), any(rule in url for rule in rules), url
+            )
+        self.assertIsNone(compile_substrings([]))
+        self.assertTrue(compile_substrings(["", "x"]).search("abc"))
+
+
+class TestRobotsRules(unittest.TestCase):
+    robots_txt = (
+        "User-agent: other\n"
+        "Disallow: /\n"
+        "\n"
+        "User-agent: *\n"
+        "Allow: /private/open\n"
+        "Disallow: /private\n"
+        "Disallow: /tmp/\n"
+        "Disallow: /search?q=\n"
+        "Allow: /tmp/public\n"
+    )
+
+    def test_matches_robot_file_parser(self):
+        parser = RobotFileParser()
+        parser.parse(self.robots_txt.splitlines())
+        rules = RobotsRules(parser)
+        paths = [
+            "/",
+            "/private",
+            "/private/open/page",
+            "/private-2",
+            "/tmp",
+            "/tmp/public",
+            "/tmp/x",
+            "/search?q=x",
+            "/search",
+            "/caf%C3%A9",
+        ]
+        for path in paths:
+            url = "http://www.example.com" + path
+            for agent in ("*", "other"):
+                self.assertEqual(
+                    rules.can_fetch(agent, url), parser.can_fetch(agent, url), url
+                )
+
+    def test_unread_and_disallowed_files(self):
+        self.assertFalse(RobotsRules(RobotFileParser()).can_fetch("*", "http://a/"))
+        parser = RobotFileParser()
+        parser.parse([])
+        self.assertTrue(RobotsRules(parser).can_fetch("*", "http://a/"))
+
+
+class TestSQLiteFrontier(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "frontier.db")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_first_in_first_out_across_batches(self):
+        frontier = SQLiteFrontier(self.path, hot_size=3, batch_size=4)
+        urls = ["http://www.example.com/{}".format(i) for i in range(10)]
+        for url in urls:
+            frontier.push(url)
+        self.assertEqual(len(frontier), 10)
+        popped = [frontier.pop() for _ in range(10)]
+        self.assertEqual(popped, urls)
+        self.assertIsNone(frontier.pop())
+        frontier.close()
+
+    def test_restore_resumes_from_checkpoint(self):
+        frontier = SQLiteFrontier(self.path, hot_size=2, batch_size=2)
+        for i in range(5):
+            frontier.push("http://www.example.com/{}".format(i))
+        first, second = frontier.pop(), frontier.pop()
+        frontier.done(first)
+        frontier.checkpoint({"page_count": 5})
+        frontier.pop()
+        frontier.close()
+
+        frontier = SQLiteFrontier(self.path, hot_size=2, batch_size=2)
+        frontier.push("http://www.example.com/seed")
+        self.assertEqual(frontier.restore(), {"page_count": 5})
+        remaining = []
+        while len(frontier):
+            remaining.append(frontier.pop())
+        self.assertEqual(remaining[0], second)
+        self.assertEqual(len(remaining), 4)
+        self.assertNotIn("http://www.example.com/seed", remaining)
+        frontier.close()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestHostFrontier(unittest.TestCase):
+    def test_interleaves_hosts(self):
+        frontier = HostFrontier()
+        for i in range(3):
+            frontier.push("http://a.com/{}".format(i))
+        frontier.push("http://b.com/0")
+        popped = [frontier.pop() for _ in range(4)]
+        self.assertEqual(popped[:2], ["http://a.com/0", "http://b.com/0"])
+        self.assertEqual(len(frontier), 0)
+
+    def test_enforces_delay_and_concurrency(self):
+        clock = FakeClock()
+        frontier = HostFrontier(delay=2.0, max_per_host=1, clock=clock)
+        frontier.push("http://a.com/0")
+        frontier.push("http://a.com/1")
+        frontier.push("http://b.com/0")
+        self.assertEqual(frontier.pop(), "http://a.com/0")
+        self.assertEqual(frontier.pop(), "http://b.com/0")
+        self.assertIsNone(frontier.pop())
+        self.assertIsNone(frontier.ready_in())
+
+        frontier.done("http://a.com/0")
+        self.assertEqual(frontier.ready_in(), 2.0)
+        self.assertIsNone(frontier.pop())
+        clock.now += 2.0
+        self.assertEqual(frontier.pop(), "http://a.com/1")
+
+
+class TestPriorityFrontier(unittest.TestCase):
+    def crawl(self, frontier, site, seed):
+        # Crawls site, a dict of page to the pages it links to.
+        frontier.push(seed)
+        order = []
+        while len(frontier):
+            page = frontier.pop()
+            order.append(page)
+            for link in site.get(page, []):
+                if link in order or link in frontier._scores:
+                    frontier.link_seen(link, page)
+                else:
+                    frontier.push_link(link, page)
+            frontier.done(page)
+        return order
+
+    def test_breadth_first_by_default(self):
+        site = {"a": ["b", "c"], "b": ["d"], "c": ["e"], "d": ["f"]}
+        order = self.crawl(PriorityFrontier(), site, "a")
+        self.assertEqual(order, ["a", "b", "c", "d", "e", "f"])
+
+    def test_opic_prefers_pages_with_many_links(self):
+        site = {
+            "seed": ["hub1", "hub2", "hub3", "lonely"],
+            "hub1": ["popular", "x"],
+            "hub2": ["popular", "y"],
+            "hub3": ["popular", "z"],
+        }
+        order = self.crawl(PriorityFrontier(OPICScorer()), site, "seed")
+        # Found after the lonely page, but linked to by every hub.
+        self.assertEqual(order[:5], ["seed", "hub1", "hub2", "hub3", "popular"])
+        self.assertEqual(set(order[6:]), {"x", "y", "z"})
+
+    def test_freshness_prefers_recent_dates(self):
+        frontier = PriorityFrontier(FreshnessScorer())
+        for url in [
+            "http://a.com/about",
+            "http://a.com/2019/05/01/old",
+            "http://a.com/news/2023-10-18-new",
+            "http://a.com/2021/06/mid",
+        ]:
+            frontier.push(url)
+        self.assertEqual(
+            [frontier.pop() for _ in range(4)],
+            [
+                "http://a.com/news/2023-10-18-new",
+                "http://a.com/2021/06/mid",
+                "http://a.com/2019/05/01/old",
+                "http://a.com/about",
+            ],
+        )
+
+    def test_scores_with_anchor_text_under_a_budget(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        scorer = FunctionScorer(
+            lambda url, parent, depth, anchor: 1.0
+            if "price" in (anchor or "")
+            else 0.0,
+            uses_anchor=True,
+        )
+        queue = WorkQueue(3, "http://a.com/", frontier=PriorityFrontier(scorer))
+        self.assertTrue(queue.wants_anchors)
+
+        async def crawl():
+            crawled = []
+            while queue.unfinished():
+                url = await queue.get_job()
+                crawled.append(url)
+                if url == "http://a.com/":
+                    for i in range(5):
+                        await queue.put_url(
+                            Link("http://a.com/{}".format(i), "info"), url
+                        )
+                    await queue.put_url(Link("http://a.com/deals", "Best prices"), url)
+                    await queue.put_url(Link("http://a.com/sale", "price list"), url)
+                queue.task_done(url)
+            return crawled
+
+        crawled = loop.run_until_complete(crawl())
+        self.assertEqual(
+            crawled, ["http://a.com/", "http://a.com/deals", "http://a.com/sale"]
+        )
+
+
+class TestWorkQueue(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_restores_seen_urls(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "frontier.db")
+            queue = WorkQueue(
+                None, "http://www.example.com/", frontier=SQLiteFrontier(path)
+            )
+            job = self.loop.run_until_complete(queue.get_job())
+            self.loop.run_until_complete(queue.put_url("http://www.example.com/a"))
+            queue.task_done(job)
+            queue.checkpoint()
+            queue.close()
+
+            queue = WorkQueue(
+                None, "http://www.example.com/", frontier=SQLiteFrontier(path)
+            )
+            self.assertTrue(queue.restore())
+            self.assertEqual(queue.qsize(), 1)
+            self.loop.run_until_complete(queue.put_url("http://www.example.com/a"))
+            self.assertEqual(queue.qsize(), 1)
+            job = self.loop.run_until_complete(queue.get_job())
+            self.assertEqual(job, "http://www.example.com/a")
+            queue.task_done(job)
+            self.loop.run_until_complete(queue.join())
+            queue.close()
+
+    def test_checkpoints_seen_urls_and_depths_incrementally(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "frontier.db")
+            frontier = SQLiteFrontier(path)
+            queue = WorkQueue(None, "http://a.com/", frontier=frontier, max_depth=3)
+            job = self.loop.run_until_complete(queue.get_job())
+            self.loop.run_until_complete(queue.put_urls(["http://a.com/1"], job))
+            queue.checkpoint()
+            self.loop.run_until_complete(queue.put_urls(["http://a.com/2"], job))
+            queue.task_done(job)
+            queue.checkpoint()
+            rows = frontier._conn.execute("SELECT url FROM seen").fetchall()
+            self.assertEqual(
+                sorted(url for url, in rows),
+                ["http://a.com/", "http://a.com/1", "http://a.com/2"],
+            )
+            queue.close()
+
+            queue = WorkQueue(
+                None, "http://a.com/", frontier=SQLiteFrontier(path), max_depth=3
+            )
+            self.assertTrue(queue.restore())
+            self.assertEqual(queue.qsize(), 2)
+            self.assertEqual(queue.depth("http://a.com/2"), 1)
+            self.loop.run_until_complete(queue.put_url("http://a.com/1"))
+            self.assertEqual(queue.qsize(), 2)
+            queue.close()
+
+    def test_waits_for_host_delay(self):
+        queue = WorkQueue(
+            None,
+            ["http://a.com/0", "http://a.com/1"],
+            frontier=HostFrontier(delay=0.05),
+        )
+
+        async def take_two():
+            first = await queue.get_job()
+            start = self.loop.time()
+            second = await queue.get_job()
+            return first, second, self.loop.time() - start
+
+        first, second, waited = self.loop.run_until_complete(take_two())
+        self.assertEqual((first, second), ("http://a.com/0", "http://a.com/1"))
+        self.assertGreaterEqual(waited, 0.04)
+
+    def test_drops_urls_beyond_max_depth(self):
+        queue = WorkQueue(None, "http://a.com/", max_depth=1)
+
+        async def crawl():
+            crawled = []
+            while queue.qsize():
+                url = await queue.get_job()
+                crawled.append((url, queue.depth(url)))
+                await queue.put_url(url + "x/", url)
+                queue.task_done(url)
+            return crawled
+
+        crawled = self.loop.run_until_complete(crawl())
+        self.assertEqual(crawled, [("http://a.com/", 0), ("http://a.com/x/", 1)])
+        self.assertEqual(queue.dropped["depth"], 1)
+
+    def test_only_counts_queued_urls_against_max_crawl_size(self):
+        queue = WorkQueue(
+            3,
+            "http://a.com/",
+            budget=CrawlBudget(host_budget=1),
+            trap_filter=TrapFilter(),
+        )
+        urls = [
+            "http://b.com/1",
+            "http://b.com/2",
+            "http://a.com/a/a/a/a",
+            "http://c.com/",
+        ]
+        for url in urls:
+            self.loop.run_until_complete(queue.put_url(url))
+        self.assertEqual(queue.qsize(), 3)
+        self.assertEqual(queue.dropped["budget"], 1)
+        self.assertEqual(queue.dropped["trap"], 1)
+
+    def test_retries_keep_their_opic_cash(self):
+        frontier = PriorityFrontier(OPICScorer())
+        queue = WorkQueue(None, "http://a/", frontier=frontier)
+
+        async def retry():
+            seed = await queue.get_job()
+            await queue.put_urls(["http://a/x", "http://a/y"], seed)
+            queue.task_done(seed)
+            job = await queue.get_job()
+            queue.retry_later(job, 0.01)
+            queue.task_done(job)
+            await asyncio.sleep(0.05)
+            return job
+
+        job = self.loop.run_until_complete(retry())
+        self.assertEqual(frontier._scores[job], 0.5)
+
+    def test_put_urls_matches_put_url(self):
+        def make_queues():
+            return [
+                WorkQueue(None, "http://a.com/"),
+                WorkQueue(
+                    4,
+                    "http://a.com/",
+                    max_depth=2,
+                    budget=CrawlBudget(host_budget=3),
+                    trap_filter=TrapFilter(),
+                ),
+                WorkQueue(None, "http://a.com/", frontier=PriorityFrontier()),
+            ]
+
+        links = [
+            Link("http://a.com/1", "one"),
+            "http://a.com/",
+            "http://b.com/1",
+            "http://a.com/1",
+            "http://a.com/a/a/a/a",
+            "http://b.com/2",
+            "http://b.com/3",
+            "http://b.com/4",
+            "http://c.com/",
+        ]
+
+        async def crawl(queue, bulk):
+            crawled = []
+            while queue.qsize():
+                url = await queue.get_job()
+                crawled.append((url, queue.depth(url)))
+                if bulk:
+                    await queue.put_urls(iter(links), url)
+                else:
+                    for link in links:
+                        await queue.put_url(link, url)
+                queue.task_done(url)
+            return crawled
+
+        for single, bulk in zip(make_queues(), make_queues()):
+            self.assertEqual(
+                self.loop.run_until_complete(crawl(single, False)),
+                self.loop.run_until_complete(crawl(bulk, True)),
+            )
+            self.assertEqual(single.dropped, bulk.dropped)
+            self.assertEqual(single._page_count, bulk._page_count)
+
+    def test_put_urls_counts_dropped_repeats_once(self):
+        queue = WorkQueue(None, "http://a.com/", trap_filter=TrapFilter())
+        trap = "http://a.com/a/a/a/a"
+        queued = self.loop.run_until_complete(
+            queue.put_urls([trap, "http://a.com/1", trap])
+        )
+        self.assertEqual(queued, 1)
+        self.assertEqual(queue.dropped["trap"], 1)
+
+
+class TestCrawlBudget(unittest.TestCase):
+    def test_host_and_path_budgets(self):
+        budget = CrawlBudget(
+            host_budget=3, host_budgets={"b.com": 1}, path_budgets={r"[?&]page=": 1}
+        )
+        allowed = [
+            budget.allow(url)
+            for url in [
+                "http://a.com/1",
+                "http://a.com/list?page=2",
+                "http://a.com/list?page=3",
+                "http://a.com/2",
+                "http://a.com/3",
+                "http://b.com/1",
+                "http://b.com/2",
+            ]
+        ]
+        self.assertEqual(allowed, [True, True, False, True, False, True, False])
+        restored = CrawlBudget(host_budget=3)
+        restored.restore(budget.state())
+        self.assertFalse(restored.allow("http://a.com/4"))
+
+    def test_trap_filter(self):
+        traps = TrapFilter(max_length=100, max_repeats=2, max_query_params=3)
+        self.assertFalse(traps.is_trap("http://a.com/blog/2023/10/post?a=1&b=2"))
+        self.assertTrue(traps.is_trap("http://a.com/" + "x" * 100))
+        self.assertTrue(traps.is_trap("http://a.com/cal/next/next/next/"))
+        self.assertTrue(traps.is_trap("http://a.com/?a=1&b=2&c=3&d=4"))
+
+
+class TestRateLimiters(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def release_order(self, limiter, urls):
+        released = []
+
+        async def wait(index, url):
+            await limiter.limited(url)
+            released.append((index, self.loop.time()))
+
+        async def run():
+            start = self.loop.time()
+            await asyncio.gather(*[wait(i, url) for i, url in enumerate(urls)])
+            return [(i, t - start) for i, t in released]
+
+        return self.loop.run_until_complete(run())
+
+    def test_rate_limiter_spaces_requests_in_order(self):
+        released = self.release_order(RateLimiter(100), ["http://a.com/"] * 5)
+        self.assertEqual([i for i, _ in released], [0, 1, 2, 3, 4])
+        self.assertGreaterEqual(released[-1][1], 0.035)
+
+    def test_rate_limiter_allows_burst(self):
+        released = self.release_order(RateLimiter(10, burst=3), ["http://a.com/"] * 3)
+        self.assertLess(released[-1][1], 0.05)
+
+    def test_host_limiter_only_limits_listed_hosts(self):
+        limiter = HostLimiter({"http://a.com": 20})
+        released = self.release_order(
+            limiter, ["http://a.com/1", "http://a.com/2", "http://b.com/1"]
+        )
+        self.assertEqual(released[0][0], 0)
+        self.assertEqual(released[1][0], 2)
+        self.assertGreaterEqual(released[-1][1], 0.04)
+
+    def test_composite_limiter_applies_both_limits(self):
+        limiter = CompositeLimiter(RateLimiter(1000), HostLimiter({"a.com": 20}))
+        released = self.release_order(limiter, ["http://a.com/1", "http://a.com/2"])
+        self.assertGreaterEqual(released[-1][1], 0.04)
+
+    def test_rate_can_be_changed(self):
+        limiter = RateLimiter(1)
+        limiter.set_rate(100)
+        released = self.release_order(limiter, ["http://a.com/"] * 3)
+        self.assertLess(released[-1][1], 0.1)
+
+
+class FakeRobotsClient:
+    def __init__(self, status=200, body="User-agent: *\nDisallow: /private\n"):
+        self.status = status
+        self.body = body
+        self.requested = []
+
+    async def get_request(self, url, proxy_manager):
+        self.requested.append(url)
+        await asyncio.sleep(0.01)
+
+        class FakeResponse:
+            status = self.status
+            body = self.body
+
+        return FakeResponse()
+
+
+class TestRobotsCache(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def test_concurrent_requests_share_one_fetch(self):
+        client = FakeRobotsClient()
+        url_filter = URLFilter(["a.com"], None, True)
+
+        async def check(*urls):
+            return await asyncio.gather(
+                *[url_filter.allowed_by_robots(url, client) for url in urls]
+            )
+
+        allowed = self.loop.run_until_complete(
+            check(*["http://a.com/{}".format(i) for i in range(5)])
+        )
+        (blocked,) = self.loop.run_until_complete(check("http://a.com/private/1"))
+        self.assertEqual(allowed, [True] * 5)
+        self.assertFalse(blocked)
+        self.assertEqual(client.requested, ["http://a.com/robots.txt"])
+
+    def test_expired_entries_are_fetched_again(self):
+        client = FakeRobotsClient()
+        cache = RobotsCache(ttl=0.01)
+        self.loop.run_until_complete(cache.fetch("a.com", "http", client))
+        self.loop.run_until_complete(asyncio.sleep(0.02))
+        self.loop.run_until_complete(cache.fetch("a.com", "http", client))
+        self.assertEqual(len(client.requested), 2)
+
+    def test_forbidden_robots_disallows_everything(self):
+        cache = RobotsCache()
+        parser = self.loop.run_until_complete(
+            cache.fetch("a.com", "https", FakeRobotsClient(status=403))
+        )
+        self.assertFalse(parser.can_fetch("*", "https://a.com/"))
+
+    def test_cache_persists_across_runs(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "robots.json")
+        cache = RobotsCache(path=path)
+        self.loop.run_until_complete(cache.fetch("a.com", "http", FakeRobotsClient()))
+        cache.save()
+
+        client = FakeRobotsClient()
+        parser = self.loop.run_until_complete(
+            RobotsCache(path=path).fetch("a.com", "http", client)
+        )
+        self.assertEqual(client.requested, [])
+        self.assertFalse(parser.can_fetch("*", "http://a.com/private"))
+
+    def test_crawl_delay_is_reported(self):
+        delays = []
+        cache = RobotsCache()
+        cache.on_crawl_delay = lambda host, delay: delays.append((host, delay))
+        client = FakeRobotsClient(body="User-agent: *\nCrawl-delay: 2\n")
+        self.loop.run_until_complete(cache.fetch("a.com", "http", client))
+        self.assertEqual(delays, [("a.com", 2.0)])
+
+
+class TestAIMDLimit(unittest.TestCase):
+    def test_grows_additively_and_backs_off(self):
+        clock = FakeClock()
+        limit = AIMDLimit(initial=4, max_limit=10, clock=clock)
+        for _ in range(5):
+            limit.on_success(0.1)
+        self.assertEqual(limit.limit, 5)
+        limit.on_failure()
+        self.assertEqual(limit.limit, 2)
+        # Further failures within the same round trip are not counted again.
+        limit.on_failure()
+        self.assertEqual(limit.limit, 2)
+        clock.now += 1
+        limit.on_failure()
+        self.assertEqual(limit.limit, 1)
+
+    def test_only_grows_when_saturated(self):
+        limit = AIMDLimit(initial=4, clock=FakeClock())
+        for _ in range(20):
+            limit.on_success(0.1, saturated=False)
+        self.assertEqual(limit.limit, 4)
+
+    def test_backs_off_when_latency_rises(self):
+        clock = FakeClock()
+        limit = AIMDLimit(initial=8, clock=clock)
+        limit.on_success(0.1)
+        for _ in range(10):
+            clock.now += 1
+            limit.on_success(1.0)
+        self.assertLess(limit.limit, 8)
+
+
+class FakeStatusResponse:
+    def __init__(self, status):
+        self.status = status
+
+
+class TestConcurrencyController(unittest.TestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+
+    def test_host_limit_bounds_requests_in_flight(self):
+        controller = ConcurrencyController(per_host=True, host_initial=2, host_max=2)
+        in_flight = []
+        peak = []
+
+        async def fetch():
+            in_flight.append(1)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.pop()
+            return FakeStatusResponse(200)
+
+        async def run():
+            await asyncio.gather(
+                *[controller.run("http://a.com/{}".format(i), fetch) for i in range(6)]
+            )
+
+        self.loop.run_until_complete(run())
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(controller.stats()["host_limits"], {"a.com": 2})
+
+    def test_throttled_responses_shrink_limit(self):
+        controller = ConcurrencyController(initial=16)
+
+        async def throttled():
+            return FakeStatusResponse(429)
+
+        self.loop.run_until_complete(controller.run("http://a.com/", throttled))
+        self.assertEqual(controller.limit, 8)
+
+    def test_slow_host_does_not_hold_up_others(self):
+        async def page(request):
+            if request.host.startswith("127.0.0.1"):
+                await asyncio.sleep(0.2)
+            return web.Response(text="<html></html>", content_type="text/html")
+
+        class Recorder(BaseCrawler):
+            def parse_result(self, response):
+                return urlparse(str(response.url)).hostname
+
+            async def save_results(self, result):
+                self.saved.append(result)
+
+        async def crawl():
+            app = web.Application()
+            app.router.add_get("/{n}", page)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            port = site._server.sockets[0].getsockname()[1]
+            urls = ["http://127.0.0.1:{}/{}".format(port, n) for n in range(3)]
+            urls += ["http://localhost:{}/{}".format(port, n) for n in range(6)]
+            crawler = Recorder(
+                urls,
+                follow_robots=False,
+                concurrency=ConcurrencyController(
+                    initial=2, max_limit=2, per_host=True, host_initial=1, host_max=1
+                ),
+            )
+            crawler.saved = []
+            try:
+                await crawler._crawl(8)
+                await crawler._close()
+            finally:
+                await runner.cleanup()
+            return crawler.saved
+
+        saved = self.loop.run_until_complete(asyncio.wait_for(crawl(), 10))
+        # The slow host's queued requests leave the second global slot free,
+        # so the fast host finishes before the slow host's second page.
+        self.assertEqual(len(saved), 9)
+        self.assertNotIn("localhost", saved[7:])
+
+
+SITEMAP = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+<url><loc>http://a.com/1</loc><lastmod>2023-10-18</lastmod></url>
+<url><loc> http://a.com/2 </loc></url>
+</urlset>"""
+
+SITEMAP_INDEX = b"""<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+<sitemap><loc>http://a.com/pages.xml.gz</loc></sitemap>
+</sitemapindex>"""
+
+FEEDS = [
+    b"""<rss version="2.0"><channel><link>http://a.com/</link>
+<item><link>http://a.com/post</link><pubDate>Wed, 18 Oct 2023 07:28:00 GMT</pubDate></item>
+</channel></rss>""",
+    b"""<feed xmlns="http://www.w3.org/2005/Atom"><entry>
+<link rel="alternate" href="http://a.com/entry"/><updated>2023-10-18T07:28:00Z</updated>
+</entry></feed>""",
+]
+
+
+def parse_in_chunks(document: bytes, size: int = 7):
+    parser = SitemapParser()
+    entries = []
+    for start in range(0, len(document), size):
+        entries.extend(parser.feed(document[start : start + size]))
+    return entries + parser.close()
+
+
+class TestSitemapParser(unittest.TestCase):
+    def test_parses_gzipped_sitemaps_in_chunks(self):
+        expected = [
+            ("url", "http://a.com/1", 1697587200.0),
+            ("url", "http://a.com/2", None),
+        ]
+        self.assertEqual(parse_in_chunks(SITEMAP), expected)
+        self.assertEqual(parse_in_chunks(gzip.compress(SITEMAP)), expected)
+        self.assertEqual(
+            parse_in_chunks(SITEMAP_INDEX),
+            [("sitemap", "http://a.com/pages.xml.gz", None)],
+        )
+
+    def test_parses_feeds(self):
+        self.assertEqual(
+            [parse_in_chunks(feed) for feed in FEEDS],
+            [
+                [("url", "http://a.com/post", 1697614080.0)],
+                [("url", "http://a.com/entry", 1697614080.0)],
+            ],
+        )
+
+    def test_reads_seed_files_lazily(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "seeds.txt.gz")
+            with gzip.open(path, "wt") as f:
+                f.write("# seeds\nhttp://a.com/1\n\nhttp://a.com/2\n")
+            urls = read_seed_file(path)
+            self.assertEqual(next(urls), "http://a.com/1")
+            self.assertEqual(list(urls), ["http://a.com/2"])
+
+
+class TestSeeder(unittest.TestCase):
+    def test_waits_for_room_in_the_queue(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        url_filter = URLFilter(["a.com"], None, False)
+        seeder = Seeder(robots=False, max_queued=2)
+
+        async def seed():
+            queue = WorkQueue(None, [])
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, "seeds.txt")
+                with open(path, "w") as f:
+                    f.write("\n".join("http://a.com/{}".format(n) for n in range(5)))
+                seeder.seed_files = [path]
+                seeding = asyncio.ensure_future(seeder.run(queue, None, url_filter, []))
+                await asyncio.sleep(0.01)
+                sizes = [queue.qsize()]
+                crawled = []
+                while not seeding.done() or queue.qsize():
+                    url = await queue.get_job()
+                    crawled.append(url)
+                    queue.task_done(url)
+                    await asyncio.sleep(0)
+                    sizes.append(queue.qsize())
+                await seeding
+            return sizes, crawled
+
+        sizes, crawled = loop.run_until_complete(asyncio.wait_for(seed(), 5))
+        self.assertEqual(max(sizes), 2)
+        self.assertEqual(crawled, ["http://a.com/{}".format(n) for n in range(5)])
+
+    def test_streams_sitemap_entries_into_the_queue(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        url_filter = URLFilter(["a.com"], None, False)
+        seeder = Seeder(["http://a.com/sitemap.xml"], robots=False, max_queued=1)
+        chunks = [b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">']
+        chunks.extend(
+            "<url><loc>http://a.com/{}</loc></url>".format(n).encode() for n in range(4)
+        )
+        chunks.append(b"</urlset>")
+
+        class ChunkedClient:
+            def __init__(self):
+                self.read = 0
+
+            async def iter_body(self, url, proxy_manager):
+                for chunk in chunks:
+                    self.read += 1
+                    yield chunk
+
+        async def seed():
+            client = ChunkedClient()
+            queue = WorkQueue(None, [])
+            seeding = asyncio.ensure_future(seeder.run(queue, client, url_filter, []))
+            await asyncio.sleep(0.01)
+            read = client.read
+            url = await queue.get_job()
+            queue.task_done(url)
+            await asyncio.sleep(0.01)
+            seeding.cancel()
+            return read, queue.qsize()
+
+        read, size = loop.run_until_complete(asyncio.wait_for(seed(), 5))
+        self.assertLess(read, len(chunks))
+        self.assertEqual(size, 1)
+
+    def test_crawls_sitemap_urls_from_robots(self):
+        bases = []
+        ready = threading.Event()
+        threading.Thread(
+            target=serve_sitemaps, args=(ready, bases), daemon=True
+        ).start()
+        ready.wait()
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        base = bases[0]
+
+        class Recorder(BaseCrawler):
+            def parse_result(self, response):
+                return str(response.url)
+
+            async def save_results(self, result):
+                self.saved.append(result)
+
+        async def crawl():
+            crawler = Recorder(base + "/", seeder=Seeder())
+            crawler.saved = []
+            await crawler._crawl(2)
+            await crawler._close()
+            return crawler
+
+        crawler = loop.run_until_complete(asyncio.wait_for(crawl(), 10))
+        self.assertEqual(
+            sorted(crawler.saved), [base + "/", base + "/deep/1", base + "/deep/2"]
+        )
+
+
+def serve_sitemaps(ready: threading.Event, bases: list) -> None:
+    # Binds an ephemeral port and appends the site's base URL to bases.
+    async def robots(request):
+        return web.Response(
+            text="User-agent: *\nSitemap: {}/index.xml\n".format(bases[0])
+        )
+
+    async def index(request):
+        body = SITEMAP_INDEX.replace(b"http://a.com", bases[0].encode())
+        return web.Response(body=body, content_type="application/xml")
+
+    async def gzipped(request):
+        pages = SITEMAP.replace(b"http://a.com/", bases[0].encode() + b"/deep/")
+        return web.Response(
+            body=gzip.compress(pages), content_type="application/octet-stream"
+        )
+
+    async def page(request):
+        return web.Response(text="<html></html>", content_type="text/html")
+
+    loop = asyncio.new_event_loop()
+    app = web.Application()
+    app.router.add_get("/robots.txt", robots)
+    app.router.add_get("/index.xml", index)
+    app.router.add_get("/pages.xml.gz", gzipped)
+    app.router.add_get("/", page)
+    app.router.add_get("/deep/{n}", page)
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    loop.run_until_complete(site.start())
+    bases.append("http://127.0.0.1:{}".format(site._server.sockets[0].getsockname()[1]))
+    ready.set()
+    loop.run_forever()
@@ -1,4 +1,7 @@
 import unittest
+from scrapio.url_set.bloom_container import BloomContainer
+from scrapio.url_set.fingerprint_container import FingerprintContainer
+from scrapio.url_set.set_container import SetContainer
 from scrapio.url_set.trie_container import TrieContainer
 
 
@@ -13,3 +16,74 @@ class TestTrieContainer(unittest.TestCase):
         self.assertTrue("https://google.com/edmund/martin" in container)
         self.assertFalse("https://google.com/edmund/martin/something" in container)
         self.assertFalse("https://google.com" in container)
+
+
+class TestFingerprintContainer(unittest.TestCase):
+    def test_correctly_checks_for_url(self):
+        for bits in (64, 128):
+            container = FingerprintContainer(fingerprint_bits=bits, initial_capacity=4)
+            urls = ["https://google.com/page/{}".format(i) for i in range(100)]
+            for url in urls:
+                container.put(url)
+            container.put(urls[0])
+
+            self.assertEqual(len(container), 100)
+            for url in urls:
+                self.assertTrue(url in container)
+            self.assertFalse("https://google.com/page/100" in container)
+
+
+class TestBloomContainer(unittest.TestCase):
+    def test_correctly_checks_for_url(self):
+        container = BloomContainer(initial_capacity=50, error_rate=0.01)
+        urls = ["https://google.com/page/{}".format(i) for i in range(500)]
+        for url in urls:
+            container.put(url)
+
+        for url in urls:
+            self.assertTrue(url in container)
+        false_positives = sum(
+            "https://john.co.uk/page/{}".format(i) in container for i in range(2000)
+        )
+        self.assertLess(false_positives, 40)
+
+
+class TestAddMany(unittest.TestCase):
+    def test_returns_new_urls_once_in_order(self):
+        containers = [
+            SetContainer(),
+            TrieContainer(),
+            FingerprintContainer(initial_capacity=4),
+            BloomContainer(initial_capacity=50),
+        ]
+        for container in containers:
+            container.put("https://google.com/a")
+            batch = [
+                "https://google.com/b",
+                "https://google.com/a",
+                "https://google.com/c",
+                "https://google.com/b",
+            ]
+            self.assertEqual(
+                container.contains_many(batch),
+                ["https://google.com/b", "https://google.com/c"],
+            )
+            self.assertFalse("https://google.com/b" in container)
+            self.assertEqual(
+                container.add_many(batch),
+                ["https://google.com/b", "https://google.com/c"],
+            )
+            self.assertTrue("https://google.com/c" in container)
+            self.assertEqual(container.add_many(batch), [])
+
+    def test_trie_put_is_idempotent(self):
+        container = TrieContainer()
+        container.put("https://google.com/edmund/martin")
+        container.put("https://google.com/edmund/martin")
+        container.put("https://google.com/edmund")
+        self.assertEqual(
+            container.add_many(
+                ["https://google.com/edmund", "https://google.com/edmund/x"]
+            ),
+            ["https://google.com/edmund/x"],
+        )
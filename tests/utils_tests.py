@@ -0,0 +1,86 @@
+import unittest
+from urllib.parse import urlsplit
+
+from scrapio.utils.urls import URLCanonicalizer, normalize_netloc, url_host
+
+
+class TestURLCanonicalizer(unittest.TestCase):
+    def test_variants_share_a_canonical_form(self):
+        canonicalizer = URLCanonicalizer()
+        variants = [
+            "http://www.example.com/a/b?x=1&y=2",
+            "HTTP://WWW.Example.com:80/a/b?y=2&x=1",
+            "http://www.example.com./a/./c/../b?x=1&&y=2#top",
+            "http://www.example.com/%61/b?%78=1&y=2",
+        ]
+        self.assertEqual(
+            {canonicalizer.canonicalize(url) for url in variants},
+            {"http://www.example.com/a/b?x=1&y=2"},
+        )
+        self.assertEqual(
+            canonicalizer.canonicalize("https://example.com:443"),
+            "https://example.com/",
+        )
+        self.assertEqual(
+            canonicalizer.canonicalize("http://example.com/a b?q=%2f"),
+            "http://example.com/a%20b?q=%2F",
+        )
+        self.assertIsNone(canonicalizer.canonicalize("mailto:someone@example.com"))
+
+    def test_options(self):
+        canonicalizer = URLCanonicalizer(
+            defragment=False, sort_query=False, drop_params=["utm_source"]
+        )
+        self.assertEqual(
+            canonicalizer.canonicalize("http://example.com/?b=1&utm_source=x&a=2#f"),
+            "http://example.com/?b=1&a=2#f",
+        )
+
+    def test_resolves_a_page_of_links(self):
+        canonicalizer = URLCanonicalizer(max_cached=4)
+        hrefs = [
+            "/About",
+            " other.html ",
+            "../up",
+            "?page=2",
+            "#section",
+            "//cdn.example.com/x",
+            "https://Example.com/",
+            "javascript:void(0)",
+        ]
+        expected = [
+            ("http://example.com/About", "example.com"),
+            ("http://example.com/dir/other.html", "example.com"),
+            ("http://example.com/up", "example.com"),
+            ("http://example.com/dir/page?page=2", "example.com"),
+            ("http://example.com/dir/page?a=1", "example.com"),
+            ("http://cdn.example.com/x", "cdn.example.com"),
+            ("https://example.com/", "example.com"),
+            None,
+        ]
+        base = "http://example.com/dir/page?a=1"
+        self.assertEqual(canonicalizer.resolve_many(base, hrefs), expected)
+        # Served from the cache the second time round.
+        self.assertEqual(canonicalizer.resolve_many(base, hrefs), expected)
+        self.assertLessEqual(len(canonicalizer._resolved), 4)
+        self.assertEqual(
+            canonicalizer.resolve_many("http://example.com/other/page", ["a", "/a"]),
+            [
+                ("http://example.com/other/a", "example.com"),
+                ("http://example.com/a", "example.com"),
+            ],
+        )
+
+    def test_normalize_netloc(self):
+        self.assertEqual(normalize_netloc("User@Host.COM:8080"), "User@host.com:8080")
+        self.assertEqual(normalize_netloc("[::1]:443", "https"), "[::1]")
+        self.assertEqual(normalize_netloc("bücher.de"), "xn--bcher-kva.de")
+
+    def test_url_host_matches_urlsplit(self):
+        for url in [
+            "http://example.com",
+            "http://example.com:8080/a?b#c",
+            "https://user@example.com?x=/y",
+            "example.com/path",
+        ]:
+            self.assertEqual(url_host(url), urlsplit(url).netloc)